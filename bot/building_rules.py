@@ -0,0 +1,83 @@
+"""Building signatures in the village points stream.
+
+Every rule is a set of point deltas (optionally mapped to the building level
+they indicate) plus guards on the village points after the change. The
+BuildingTracker cog diffs each world snapshot once and matches all rules in
+the same pass (cpu_jobs.match_rules), so a new detector is one entry in RULES:
+its subscription table is created on load and it shows up in /toggle-trackers.
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from cpu_jobs import pack
+
+ASSET_URL = "https://dsnl.innogamescdn.com/asset/415a0ab7/graphic"
+
+
+@dataclass(frozen=True)
+class BuildingRule:
+    # Tracker id: subscription key, outbox source and /toggle-trackers button.
+    tracker: str
+    label: str
+    table: str
+    # Point delta -> building level it indicates (None when the level is not shown).
+    deltas: Dict[int, Optional[int]]
+    # `{player}` is replaced by the owner link, or "Barbarendorp".
+    description: str
+    thumbnail: str
+    color: str = "green"
+    barbarian_description: Optional[str] = None
+    # Field title for the level; rules without one show the village points instead.
+    level_field: Optional[str] = None
+    min_points: int = 0
+    max_points: Optional[int] = None
+
+
+RULES = (
+    BuildingRule(
+        tracker="academy",
+        label="Adelshoeve",
+        table="academytracker_channels_v2",
+        deltas={-512: None},
+        description="{player} heeft een adelshoeve afgebroken",
+        thumbnail=f"{ASSET_URL}/big_buildings/snob1.png",
+        color="red",
+    ),
+    BuildingRule(
+        tracker="wall",
+        label="Muur",
+        table="walltracker_channels_maps_v2",
+        deltas={-256: None},
+        description="Dorp van {player} is gecleard (Muur 20>0)",
+        barbarian_description="Barbarendorp is gecleard (Muur 20>0)",
+        thumbnail=f"{ASSET_URL}/big_buildings/wall3.png",
+        color="red",
+    ),
+    BuildingRule(
+        tracker="tower",
+        label="Uitkijktoren",
+        table="towertracker_channels_v2",
+        deltas={155: 18, 186: 19, 224: 20},
+        description="{player} heeft een uitkijktoren gebouwd",
+        thumbnail=f"{ASSET_URL}/big_buildings/watchtower3.png",
+        level_field="Uitkijktoren level",
+        min_points=1200,
+    ),
+)
+
+RULES_BY_TRACKER = {rule.tracker: rule for rule in RULES}
+
+
+def pack_signatures(rules) -> bytes:
+    """Flatten rules into packed (rule_index, delta, min_points, max_points, level) rows; -1 means none."""
+    rows = []
+    for index, rule in enumerate(rules):
+        for delta, level in rule.deltas.items():
+            rows.extend((
+                index,
+                delta,
+                rule.min_points,
+                -1 if rule.max_points is None else rule.max_points,
+                -1 if level is None else level,
+            ))
+    return pack(rows)
@@ -0,0 +1,108 @@
+"""In-memory caches of this process, measured on demand by *memory caches.
+
+Services and cogs register each long-lived cache once, under a name and the
+owner that fills it. Sizes are only computed when asked for, in a thread, by
+walking the cache's object graph.
+"""
+import asyncio
+import sys
+import threading
+from collections import deque
+from dataclasses import dataclass
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import asyncpg
+
+# Objects visited per cache before its size is reported as a lower bound.
+DEEP_SIZE_LIMIT = 2_000_000
+
+# Never followed: shared runtime objects that would pull the whole process into one cache.
+SKIP_TYPES = (
+    type, ModuleType, FunctionType, BuiltinFunctionType, MethodType,
+    asyncio.AbstractEventLoop, asyncio.Future, asyncpg.Pool, asyncpg.Connection,
+    threading.Thread,
+)
+
+
+@dataclass
+class CacheEntry:
+    name: str
+    owner: str
+    source: Callable[[], Any]
+    # False for caches whose values point into a large shared graph (Discord models).
+    deep: bool = True
+
+
+@dataclass
+class CacheSize:
+    name: str
+    owner: str
+    entries: Optional[int]
+    bytes: int
+    truncated: bool = False
+
+
+def deep_size(root: Any, limit: int = DEEP_SIZE_LIMIT) -> Tuple[int, bool]:
+    """Bytes held by `root` and everything it references once; (size, hit_limit)."""
+    seen = set()
+    stack = [root]
+    total = 0
+    while stack:
+        if len(seen) >= limit:
+            return total, True
+
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, SKIP_TYPES):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+
+        # list() copies in one step, so the event loop cannot resize the container mid-walk.
+        if isinstance(obj, dict):
+            for key, value in list(obj.items()):
+                stack.append(key)
+                stack.append(value)
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            stack.extend(list(obj))
+        elif isinstance(obj, asyncpg.Record):
+            stack.extend(obj.values())
+        else:
+            attributes = getattr(obj, "__dict__", None)
+            if attributes is not None:
+                stack.append(attributes)
+            for slot in getattr(type(obj), "__slots__", ()):
+                if hasattr(obj, slot):
+                    stack.append(getattr(obj, slot))
+    return total, False
+
+
+class CacheRegistry:
+    def __init__(self):
+        self._caches: Dict[str, CacheEntry] = {}
+
+    def register(self, name: str, cache: Any, owner: str, deep: bool = True) -> None:
+        """Register a container, or a callable returning it for attributes that get replaced."""
+        source = cache if callable(cache) else (lambda: cache)
+        self._caches[name] = CacheEntry(name, owner, source, deep)
+
+    def unregister_owner(self, owner: str) -> None:
+        """Drop everything a cog registered; called from its cog_unload."""
+        for name in [name for name, entry in self._caches.items() if entry.owner == owner]:
+            del self._caches[name]
+
+    def measure(self) -> List[CacheSize]:
+        sizes = []
+        for entry in list(self._caches.values()):
+            cache = entry.source()
+            entries = len(cache) if hasattr(cache, "__len__") else None
+            if entry.deep:
+                size, truncated = deep_size(cache)
+            else:
+                size, truncated = sys.getsizeof(cache), False
+            sizes.append(CacheSize(entry.name, entry.owner, entries, size, truncated))
+        return sorted(sizes, key=lambda s: s.bytes, reverse=True)
+
+    async def measure_async(self) -> List[CacheSize]:
+        """measure() in a thread; the walk over large caches takes seconds."""
+        return await asyncio.to_thread(self.measure)
@@ -6,7 +6,6 @@ import subprocess
 import time
 import discord
 from discord.ext import commands
-from playwright.async_api import async_playwright
 
 async def ensure_chromium_installed():
         os.environ.setdefault("PLAYWRIGHT_BROWSERS_PATH", "/tmp/playwright")
@@ -35,6 +34,10 @@ class ReportScreenshotCog(commands.Cog):
         def __init__(self, bot):
             self.bot = bot
             self._last_screenshot_per_channel: dict[int, float] = {}
+            bot.caches.register("AttackReports.last_screenshot_per_channel", self._last_screenshot_per_channel, owner="AttackReports")
+
+        async def cog_unload(self):
+            self.bot.caches.unregister_owner("AttackReports")
 
         @commands.Cog.listener()
         async def on_message(self, message: discord.Message):
@@ -60,12 +63,14 @@ class ReportScreenshotCog(commands.Cog):
             if screenshot_file is None:
                 return
 
-            await message.channel.send(
-                content="",
-                file=screenshot_file,
-                reference=message,
-                mention_author=False,
-            )
+            # A reply to a user, so it shares the interaction lane.
+            async with self.bot.rest_budget.lane("interaction"):
+                await message.channel.send(
+                    content="",
+                    file=screenshot_file,
+                    reference=message,
+                    mention_author=False,
+                )
 
         def _extract_report_urls(self, content: str) -> list[str]:
             pattern = re.compile(
@@ -75,6 +80,9 @@ class ReportScreenshotCog(commands.Cog):
 
         async def _create_report_screenshot(self, url: str) -> discord.File | None:
                     try:
+                        # Playwright is heavy; only import it once a report link is actually posted.
+                        from playwright.async_api import async_playwright
+
                         await ensure_chromium_installed()
         
                         async with async_playwright() as p:
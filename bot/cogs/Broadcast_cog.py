@@ -19,7 +19,8 @@ class BroadcastCog(commands.Cog):
             channel = guild.system_channel
             if channel:
                 try:
-                    await channel.send(embed=embed)
+                    async with self.bot.rest_budget.lane("broadcast"):
+                        await channel.send(embed=embed)
                     successful_sends += 1
                 except discord.Forbidden:
                     pass
@@ -0,0 +1,282 @@
+import discord
+from discord.ext import commands, tasks
+from discord import app_commands
+import asyncpg
+import asyncio
+import time
+from urllib.parse import unquote_plus
+import logging
+from typing import List, Optional
+from main import create_embed
+from pg_listener import refresh_channel
+from cpu_jobs import match_rules, pack, unpack
+from event_queue import OutboxEvent
+from building_rules import RULES, RULES_BY_TRACKER, BuildingRule, pack_signatures
+from spatial import SpatialIndex, parse_regions
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+# With a healthy NOTIFY connection the 5-minute loop only rescans worlds that
+# have not been woken up by a refresh for this long.
+FALLBACK_SCAN_SECONDS = 1800
+
+class BuildingTracker(commands.Cog):
+    """Detects building changes (wall, academy, watchtower, ...) from village point deltas.
+
+    One scan per world snapshot matches every rule in building_rules.RULES.
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.db: asyncpg.Pool = bot.db
+
+        # Worlds with at least one subscription for any rule.
+        self.tracked_worlds: set[str] = set()
+        # world -> packed (village_ids, points) arrays of the last scan
+        self.previous_village_points: dict[str, tuple[bytes, bytes]] = {}
+        self.signatures = pack_signatures(RULES)
+
+        self.loop_initialized: bool = False
+        self._world_locks: dict[str, asyncio.Lock] = {}
+        self._last_scan: dict[str, float] = {}
+        self._listening: dict[str, str] = {}
+
+        bot.caches.register("BuildingTracker.previous_village_points", self.previous_village_points, owner="BuildingTracker")
+        bot.caches.register("BuildingTracker.last_scan", self._last_scan, owner="BuildingTracker")
+
+    async def cog_load(self) -> None:
+        for rule in RULES:
+            await self.db.execute(f"""
+                CREATE TABLE IF NOT EXISTS {rule.table} (
+                    guild_id BIGINT NOT NULL,
+                    channel_id BIGINT NOT NULL,
+                    world TEXT NOT NULL,
+                    PRIMARY KEY (guild_id, channel_id, world)
+                );
+            """)
+            # Optional region filter (`K45,400|400-450|450`); NULL means the whole world.
+            await self.db.execute(f"ALTER TABLE {rule.table} ADD COLUMN IF NOT EXISTS regions TEXT;")
+
+        self.bot.subscriptions.subscribe(self._on_subscriptions, *(rule.table for rule in RULES))
+        await self.sync_listeners()
+
+        logger.info(f"[BuildingTracker] Loaded with tracked worlds: {self.tracked_worlds}")
+
+    async def cog_unload(self) -> None:
+        if self.building_tracking.is_running():
+            self.building_tracking.cancel()
+
+        for channel in list(self._listening):
+            await self.bot.pg_listener.unlisten(channel, self._on_village_refresh)
+        self._listening.clear()
+
+        self.bot.subscriptions.unsubscribe(self._on_subscriptions)
+        self.bot.caches.unregister_owner("BuildingTracker")
+        logger.info("[BuildingTracker] Unloaded")
+
+    def load_tracked_worlds(self) -> None:
+        self.tracked_worlds = set().union(*(self.bot.subscriptions.worlds(rule.table) for rule in RULES))
+
+    async def sync_listeners(self) -> None:
+        """Recompute the tracked worlds and LISTEN on the village refresh channel of each."""
+        self.load_tracked_worlds()
+
+        wanted = {refresh_channel("village_data_v3", world): world for world in self.tracked_worlds}
+
+        for channel in set(self._listening) - set(wanted):
+            await self.bot.pg_listener.unlisten(channel, self._on_village_refresh)
+            self.previous_village_points.pop(self._listening.pop(channel), None)
+
+        for channel, world in wanted.items():
+            if channel not in self._listening:
+                await self.bot.pg_listener.listen(channel, self._on_village_refresh)
+                self._listening[channel] = world
+
+    async def _on_subscriptions(self, table: str, worlds: set[str]) -> None:
+        await self.sync_listeners()
+
+    async def _on_village_refresh(self, channel: str, payload: str) -> None:
+        world = self._listening.get(channel)
+        if world is None or world not in self.tracked_worlds or not self.bot.is_ready():
+            return
+        await self.scan_world(world)
+
+    @commands.Cog.listener()
+    async def on_ready(self) -> None:
+        if self.loop_initialized:
+            return
+
+        if not self.building_tracking.is_running():
+            self.building_tracking.start()
+            logger.info("[BuildingTracker] Background building_tracking loop started.")
+
+        self.loop_initialized = True
+
+    @tasks.loop(minutes=5)
+    async def building_tracking(self) -> None:
+        """Fallback scan for worlds whose refresh notification was missed."""
+        await self.sync_listeners()
+        if not self.tracked_worlds:
+            return
+
+        stale_after = FALLBACK_SCAN_SECONDS if self.bot.pg_listener.connected else 0
+        now = time.monotonic()
+
+        for world in list(self.tracked_worlds):
+            if now - self._last_scan.get(world, 0.0) < stale_after:
+                continue
+            await self.scan_world(world)
+
+    @building_tracking.before_loop
+    async def before_building_tracking(self) -> None:
+        await self.bot.wait_until_ready()
+
+    async def scan_world(self, world: str) -> None:
+        """Match all building rules against one village_data_v3 snapshot."""
+        lock = self._world_locks.setdefault(world, asyncio.Lock())
+        async with lock:
+            try:
+                if not await self.bot.leases.acquire("buildings", world):
+                    # Another process owns this world; our cache would be stale by the time we get it back.
+                    self.previous_village_points.pop(world, None)
+                    return
+
+                villages = await self.db.fetch("""
+                    SELECT village_id, name, x, y, player_id, points
+                    FROM village_data_v3
+                    WHERE world = $1;
+                """, world)
+
+                ids = pack(v["village_id"] for v in villages)
+                points = pack(v["points"] for v in villages)
+
+                previous = self.previous_village_points.get(world)
+                self.previous_village_points[world] = (ids, points)
+
+                index = await self.bot.spatial.put(world, villages)
+
+                if previous is not None:
+                    matches = unpack(await self.bot.cpu_pool.run(
+                        "match_rules", match_rules, *previous, ids, points, self.signatures
+                    ))
+                    if matches:
+                        await self.notify_matches(world, index, matches)
+
+                self._last_scan[world] = time.monotonic()
+                print(f"[BuildingTracker {world.upper()}] - Scan completed.")
+
+            except Exception as e:
+                logger.error(f"Error processing building tracking for world `{world}`: {e}")
+
+    async def notify_matches(self, world: str, index: SpatialIndex, matches) -> None:
+        """Queue one message per match for every channel subscribed to its rule.
+
+        Region filters are resolved through the spatial index before any embed is built.
+        """
+        subscriptions = {rule.tracker: self.bot.subscriptions.rows(rule.table, world) for rule in RULES}
+
+        in_region = {}
+
+        def recipients(rule: BuildingRule, village_index: int) -> List[int]:
+            channels = []
+            for row in subscriptions[rule.tracker]:
+                regions = row["regions"]
+                if regions is not None:
+                    if regions not in in_region:
+                        in_region[regions] = index.in_regions(parse_regions(regions)[1])
+                    if village_index not in in_region[regions]:
+                        continue
+                channels.append(row["channel_id"])
+            return channels
+
+        matched = []
+        for i in range(0, len(matches), 4):
+            rule = RULES[matches[i + 2]]
+            channels = recipients(rule, matches[i])
+            if channels:
+                matched.append((index.villages[matches[i]], rule, matches[i + 3], channels))
+        if not matched:
+            return
+
+        player_ids = list({village["player_id"] for village, _, _, _ in matched if village["player_id"] != 0})
+        names = {row["player_id"]: unquote_plus(row["name"]) for row in await self.db.fetch("""
+            SELECT player_id, name
+            FROM player_data_v3
+            WHERE world = $1 AND player_id = ANY($2::BIGINT[]);
+        """, world, player_ids) if row["name"]}
+
+        events = []
+        for village, rule, level, channels in matched:
+            embed = self.build_embed(world, rule, village, level, names)
+            events.extend(OutboxEvent(channel_id, embed, rule.tracker) for channel_id in channels)
+
+        await self.bot.events.append(events)
+
+    def build_embed(self, world: str, rule: BuildingRule, village, level: int, names: dict) -> discord.Embed:
+        player_id = village["player_id"]
+        village_name = unquote_plus(village["name"])
+        village_link = f"https://{world}.tribalwars.nl/game.php?screen=info_village&id={village['village_id']}"
+
+        if player_id == 0:
+            description = rule.barbarian_description or rule.description.format(player="Barbarendorp")
+        else:
+            owner_name = names.get(player_id, "Onbekend")
+            player_link = f"[{owner_name}](https://{world}.tribalwars.nl/game.php?screen=info_player&id={player_id})"
+            description = rule.description.format(player=player_link)
+
+        embed = create_embed(description=description)
+        embed.color = discord.Color.red() if rule.color == "red" else discord.Color.green()
+        embed.add_field(name="Dorp", value=f"```{village_name} ({village['x']}|{village['y']})```", inline=True)
+        if rule.level_field and level >= 0:
+            embed.add_field(name=rule.level_field, value=f"```{level}```", inline=True)
+        else:
+            embed.add_field(name="Punten", value=f"```{village['points']}```", inline=True)
+        embed.add_field(name="Link", value=f"[Dorp bekijken]({village_link})", inline=True)
+        embed.set_thumbnail(url=rule.thumbnail)
+        return embed
+
+    @app_commands.command(name="tracker-regio", description="Beperk een gebouwentracker in dit kanaal tot continenten of coördinaatvakken.")
+    @app_commands.describe(
+        tracker="Welke tracker",
+        wereld="Wereld van de tracker",
+        regio="Bv. `K45, K46` of `400|400-450|450`; leeg voor de hele wereld"
+    )
+    @app_commands.choices(tracker=[app_commands.Choice(name=rule.label, value=rule.tracker) for rule in RULES])
+    async def tracker_regio(
+        self,
+        interaction: discord.Interaction,
+        tracker: app_commands.Choice[str],
+        wereld: str,
+        regio: Optional[str] = None
+    ):
+        rule = RULES_BY_TRACKER[tracker.value]
+        wereld = wereld.strip().lower()
+
+        regions = None
+        if regio and regio.strip():
+            try:
+                regions, _ = parse_regions(regio)
+            except ValueError as e:
+                await interaction.response.send_message(str(e), ephemeral=True)
+                return
+
+        result = await self.db.execute(f"""
+            UPDATE {rule.table}
+            SET regions = $4
+            WHERE guild_id = $1 AND channel_id = $2 AND world = $3;
+        """, interaction.guild_id, interaction.channel_id, wereld, regions)
+
+        if result.endswith(" 0"):
+            await interaction.response.send_message(
+                f"De {rule.label.lower()} tracker staat niet aan voor `{wereld}` in dit kanaal.", ephemeral=True
+            )
+            return
+
+        scope = f"regio `{regions}`" if regions else "de hele wereld"
+        await interaction.response.send_message(
+            f"De {rule.label.lower()} tracker voor `{wereld}` meldt nu alleen {scope}.", ephemeral=True
+        )
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(BuildingTracker(bot))
@@ -3,6 +3,7 @@ from discord import app_commands
 from discord.ext import commands
 import asyncpg
 import os
+from world_registry import PLAYER_DATA
 
 class CasualRangesCog(commands.Cog):
     def __init__(self, bot):
@@ -13,12 +14,6 @@ class CasualRangesCog(commands.Cog):
         """Connect to the PostgreSQL database."""
         return self.db
 
-    async def fetch_worlds(self):
-        """Fetch active worlds from the playerdata_worlds table."""
-        conn = await self.get_database_connection()
-        query = "SELECT world FROM playerdata_worlds"
-        return await conn.fetch(query)
-
     async def fetch_accounts(self, world: str):
         """Fetch active accounts on the selected world."""
         conn = await self.get_database_connection()
@@ -83,12 +78,12 @@ class CasualRangesCog(commands.Cog):
     @casualrange_command.autocomplete("wereld")
     async def wereld_autocomplete(self, interaction: discord.Interaction, current: str):
         """Autocomplete for world selection."""
-        worlds = await self.fetch_worlds()
+        worlds = self.bot.world_registry.all(PLAYER_DATA)
         return [
-            app_commands.Choice(name=w["world"], value=w["world"]) 
+            app_commands.Choice(name=w, value=w) 
             for w in worlds
-            if w["world"].lower().startswith("nlp")
-            and current.lower() in w["world"].lower()
+            if w.lower().startswith("nlp")
+            and current.lower() in w.lower()
         ][:25]
 
     @casualrange_command.autocomplete("account")
@@ -0,0 +1,132 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+from datetime import date, datetime, timedelta
+from typing import Optional
+import pytz
+from main import create_embed
+from conquer_rollups import tribe_stats, war_summary
+from fuzzy_index import TRIBE, format_suggestions
+from world_registry import PLAYER_DATA
+
+PERIODS = {
+    "vandaag": 0,
+    "7d": 6,
+    "30d": 29,
+    "alles": None,
+}
+
+class ConquerStatsCog(commands.Cog):
+    """Conquer statistics answered from the conquer_rollup_* tables."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.db = bot.db
+
+    def period_start(self, periode: str) -> date:
+        today = datetime.now(pytz.timezone("Europe/Amsterdam")).date()
+        days = PERIODS[periode]
+        return date(2000, 1, 1) if days is None else today - timedelta(days=days)
+
+    async def get_tribe(self, world: str, tag: str):
+        return await self.db.fetchrow("""
+            SELECT tribe_id, tag
+            FROM ally_data_v3
+            WHERE world = $1 AND LOWER(tag) = LOWER($2);
+        """, world, tag)
+
+    @app_commands.command(name="conquer-stats", description="Toon de conquer-statistieken van een stam.")
+    @app_commands.describe(wereld="Selecteer de wereld", stam="Tag van de stam", periode="Periode")
+    @app_commands.choices(periode=[
+        app_commands.Choice(name="Vandaag", value="vandaag"),
+        app_commands.Choice(name="Laatste 7 dagen", value="7d"),
+        app_commands.Choice(name="Laatste 30 dagen", value="30d"),
+        app_commands.Choice(name="Alles", value="alles"),
+    ])
+    async def conquer_stats(
+        self,
+        interaction: discord.Interaction,
+        wereld: str,
+        stam: str,
+        periode: Optional[app_commands.Choice[str]] = None
+    ):
+        periode_value = periode.value if periode else "7d"
+        tribe = await self.get_tribe(wereld, stam)
+        if tribe is None:
+            # Building a cold name index can outlast the interaction deadline.
+            await interaction.response.defer(ephemeral=True)
+            suggestions = await self.bot.names.suggest(wereld, stam, TRIBE)
+            await interaction.followup.send(
+                f"Stam `{stam}` niet gevonden op `{wereld}`.{format_suggestions(suggestions)}", ephemeral=True
+            )
+            return
+
+        stats = await tribe_stats(self.db, wereld, tribe["tribe_id"], self.period_start(periode_value))
+
+        embed = create_embed(title=f"Conquers {tribe['tag']} ({periode.name if periode else 'Laatste 7 dagen'})")
+        embed.add_field(name="Gewonnen", value=f"```{stats['gains']}```", inline=True)
+        embed.add_field(name="Verloren", value=f"```{stats['losses']}```", inline=True)
+        embed.add_field(name="Saldo", value=f"```{stats['gains'] - stats['losses']:+}```", inline=True)
+        embed.add_field(name="Barbarendorpen", value=f"```{stats['barbs']}```", inline=True)
+        embed.add_field(name="Intern", value=f"```{stats['internals']}```", inline=True)
+        embed.add_field(
+            name="Punten",
+            value=f"```+{stats['points_gained']:,} / -{stats['points_lost']:,}```".replace(",", "."),
+            inline=True
+        )
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command(name="tribe-war", description="Vergelijk de conquers tussen twee stammen.")
+    @app_commands.describe(wereld="Selecteer de wereld", stam_a="Tag van de eerste stam", stam_b="Tag van de tweede stam", periode="Periode")
+    @app_commands.choices(periode=[
+        app_commands.Choice(name="Vandaag", value="vandaag"),
+        app_commands.Choice(name="Laatste 7 dagen", value="7d"),
+        app_commands.Choice(name="Laatste 30 dagen", value="30d"),
+        app_commands.Choice(name="Alles", value="alles"),
+    ])
+    async def tribe_war(
+        self,
+        interaction: discord.Interaction,
+        wereld: str,
+        stam_a: str,
+        stam_b: str,
+        periode: Optional[app_commands.Choice[str]] = None
+    ):
+        periode_value = periode.value if periode else "alles"
+        tribe_a = await self.get_tribe(wereld, stam_a)
+        tribe_b = await self.get_tribe(wereld, stam_b)
+        missing = [tag for tag, tribe in ((stam_a, tribe_a), (stam_b, tribe_b)) if tribe is None]
+        if missing:
+            await interaction.response.defer(ephemeral=True)
+            suggestions = await self.bot.names.suggest(wereld, missing[0], TRIBE)
+            await interaction.followup.send(
+                f"Stam `{missing[0]}` niet gevonden op `{wereld}`.{format_suggestions(suggestions)}", ephemeral=True
+            )
+            return
+
+        summary = await war_summary(
+            self.db, wereld, tribe_a["tribe_id"], tribe_b["tribe_id"], self.period_start(periode_value)
+        )
+
+        embed = create_embed(
+            title=f"{tribe_a['tag']} vs {tribe_b['tag']} ({periode.name if periode else 'Alles'})",
+            description=(
+                f"**{tribe_a['tag']}** nam **{summary['a_conquers']}** dorpen in van **{tribe_b['tag']}** "
+                f"({summary['a_points']:,} punten)\n"
+                f"**{tribe_b['tag']}** nam **{summary['b_conquers']}** dorpen in van **{tribe_a['tag']}** "
+                f"({summary['b_points']:,} punten)"
+            ).replace(",", ".")
+        )
+        embed.add_field(name="Saldo", value=f"```{tribe_a['tag']} {summary['a_conquers'] - summary['b_conquers']:+}```", inline=False)
+        await interaction.response.send_message(embed=embed)
+
+    @conquer_stats.autocomplete("wereld")
+    @tribe_war.autocomplete("wereld")
+    async def wereld_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [
+            app_commands.Choice(name=w, value=w)
+            for w in self.bot.world_registry.matching(current, PLAYER_DATA)
+        ]
+
+async def setup(bot):
+    await bot.add_cog(ConquerStatsCog(bot))
@@ -3,15 +3,99 @@ import aiohttp
 import asyncpg
 import asyncio
 from discord.ext import commands, tasks
+from discord import app_commands
 from datetime import datetime
-import re
+import time
 import pytz
 import logging
+from dataclasses import dataclass, field
 from typing import Optional
+from pg_listener import refresh_channel
+from db_maintenance import delete_in_batches
+from conquer_rollups import install_conquer_rollups
+from membership import CHANGE_RETENTION_DAYS, install_membership_log
+from event_queue import OutboxEvent
+from cpu_jobs import parse_conquer_file, unpack
+from upstream import world_url
+from fuzzy_index import TRIBE, format_suggestions
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+DETECTION_MODES = ("http", "snapshot")
+
+# Snapshot-mode worlds are scanned when village_data_v3 is refreshed; the loop
+# only rescans them when no refresh notification arrived for this long.
+SNAPSHOT_FALLBACK_SECONDS = 300
+
+# get_conquer_extended is consumed while it downloads, so bound the gaps between
+# reads instead of the whole (possibly day-long) response.
+STREAM_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=20)
+
+# Number of villages listed by name in a digest message.
+DIGEST_NOTABLE_VILLAGES = 5
+
+# A subscription is only removed once its tribe has been missing from ally_data_v3
+# for this long, i.e. over several daily cleanups; a partial refresh never counts.
+MISSING_TRIBE_GRACE_DAYS = 3
+
+# get_conquer_extended only reaches back this far; older gaps are caught up from map/conquer.txt.gz.
+INTERFACE_MAX_AGE = 84600
+
+# Joins the catch-up stage to village points and the tribe each owner had at the
+# conquer time (the membership log first, else player_data_v3).
+CATCHUP_INSERT_SQL = """
+    INSERT INTO conquer_data_v2 (
+        world, village_id, unix_timestamp,
+        new_owner_id, new_owner_tribe_id,
+        old_owner_id, old_owner_tribe_id,
+        points
+    )
+    SELECT $1, s.village_id, s.unix_timestamp, s.new_owner_id, nt.tribe_id, s.old_owner_id, ot.tribe_id, v.points
+    FROM (SELECT DISTINCT * FROM conquer_catchup_stage) s
+    JOIN village_data_v3 v ON v.world = $1 AND v.village_id = s.village_id
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(
+            (SELECT c.old_tribe_id FROM tribe_membership_changes_v1 c
+             WHERE c.world = $1 AND c.player_id = s.new_owner_id AND c.changed_at > to_timestamp(s.unix_timestamp)
+             ORDER BY c.changed_at LIMIT 1),
+            (SELECT p.tribe_id FROM player_data_v3 p WHERE p.world = $1 AND p.player_id = s.new_owner_id)
+        ) AS tribe_id
+    ) nt
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(
+            (SELECT c.old_tribe_id FROM tribe_membership_changes_v1 c
+             WHERE c.world = $1 AND c.player_id = s.old_owner_id AND c.changed_at > to_timestamp(s.unix_timestamp)
+             ORDER BY c.changed_at LIMIT 1),
+            (SELECT p.tribe_id FROM player_data_v3 p WHERE p.world = $1 AND p.player_id = s.old_owner_id)
+        ) AS tribe_id
+    ) ot
+    ON CONFLICT DO NOTHING
+    RETURNING village_id, unix_timestamp, new_owner_id, new_owner_tribe_id, old_owner_id, old_owner_tribe_id;
+"""
+
+def subscribed_since(tracking_channels) -> int:
+    """Start of the oldest subscription; earlier conquers concern none of them."""
+    return min((t["starting_unix_timestamp"] for t in tracking_channels), default=0)
+
+def conquer_receipt(guild_id, channel_id, world, village_id, unix_timestamp, old_owner_id, new_owner_id) -> dict:
+    """conquer_messages_v2 row written by the outbox once the message is delivered."""
+    return {
+        "guild_id": guild_id,
+        "channel_id": channel_id,
+        "world": world,
+        "village_id": village_id,
+        "unix_timestamp": unix_timestamp,
+        "old_owner_id": old_owner_id,
+        "new_owner_id": new_owner_id,
+    }
+
+@dataclass
+class NotificationBatch:
+    """Notifications of one scan cycle, appended to the outbox together."""
+    events: list = field(default_factory=list)
+    digests: dict = field(default_factory=dict)
+
 class ConquerTracker(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
@@ -19,6 +103,11 @@ class ConquerTracker(commands.Cog):
         self.session: Optional[aiohttp.ClientSession] = None
 
         self.loop_initialized: bool = False
+        self._world_locks: dict[str, asyncio.Lock] = {}
+        self._last_snapshot_scan: dict[str, float] = {}
+        self._listening: dict[str, str] = {}
+
+        bot.caches.register("ConquerTracker.last_snapshot_scan", self._last_snapshot_scan, owner="ConquerTracker")
 
     async def create_tables(self):
         await self.db.execute("""
@@ -66,22 +155,85 @@ class ConquerTracker(commands.Cog):
             );
         """)
 
+        # Digest subscriptions get one summary per scan cycle instead of an embed per conquer.
+        await self.db.execute("""
+            ALTER TABLE conquer_settings_v2
+            ADD COLUMN IF NOT EXISTS digest BOOLEAN NOT NULL DEFAULT FALSE;
+        """)
+
+        await self.db.execute("""
+            ALTER TABLE conquer_settings_v2
+            ADD COLUMN IF NOT EXISTS catchup_mode TEXT NOT NULL DEFAULT 'summary';
+        """)
+
+        # Set by the cleanup while the tribe is missing from ally_data_v3.
+        await self.db.execute("""
+            ALTER TABLE conquer_settings_v2
+            ADD COLUMN IF NOT EXISTS missing_since TIMESTAMPTZ;
+        """)
+
+        await self.db.execute("""
+            ALTER TABLE conquer_world_state_v2
+            ADD COLUMN IF NOT EXISTS detection_mode TEXT NOT NULL DEFAULT 'http';
+        """)
+
+        # Conquers stored by the HTTP scan that still wait for their digest summary.
+        await self.db.execute("""
+            CREATE TABLE IF NOT EXISTS conquer_digest_pending_v1 (
+                guild_id BIGINT NOT NULL,
+                channel_id BIGINT NOT NULL,
+                world TEXT NOT NULL,
+                tribe_id BIGINT NOT NULL,
+                village_id BIGINT NOT NULL,
+                unix_timestamp BIGINT NOT NULL,
+                new_owner_id BIGINT NOT NULL,
+                new_owner_tribe_id BIGINT NOT NULL,
+                old_owner_id BIGINT NOT NULL,
+                old_owner_tribe_id BIGINT NOT NULL,
+                PRIMARY KEY (guild_id, channel_id, world, tribe_id, village_id, unix_timestamp, new_owner_id, old_owner_id)
+            );
+        """)
+
+        await self.db.execute("""
+            CREATE TABLE IF NOT EXISTS conquer_lastowners_v3 (
+                world TEXT NOT NULL,
+                village_id BIGINT NOT NULL,
+                player_id BIGINT NOT NULL,
+                tribe_id BIGINT NOT NULL,
+                PRIMARY KEY (world, village_id)
+            );
+        """)
+
+        await install_conquer_rollups(self.db)
+        await install_membership_log(self.db)
+
     async def cog_load(self):
         await self.create_tables()
+        self.bot.subscriptions.subscribe(self._on_subscriptions, "conquer_settings_v2")
 
         if self.session is None or self.session.closed:
             timeout = aiohttp.ClientTimeout(total=20)
             self.session = aiohttp.ClientSession(timeout=timeout)
 
+        self.bot.update_scheduler.register("conquer", min_interval=30, max_interval=300)
+
         logger.info("[ConquerTracker] Loaded")
 
     async def cog_unload(self):
         if self.check_conquers.is_running():
             self.check_conquers.cancel()
+        if self.cleanup_conquers.is_running():
+            self.cleanup_conquers.cancel()
 
         if self.session and not self.session.closed:
             await self.session.close()
 
+        for channel in list(self._listening):
+            await self.bot.pg_listener.unlisten(channel, self._on_village_refresh)
+        self._listening.clear()
+
+        self.bot.subscriptions.unsubscribe(self._on_subscriptions)
+        self.bot.caches.unregister_owner("ConquerTracker")
         logger.info("[ConquerTracker] Unloaded")
 
     @commands.Cog.listener()
@@ -89,13 +241,24 @@ class ConquerTracker(commands.Cog):
         if self.loop_initialized:
             return
 
-        rows = await self.db.fetch("SELECT 1 FROM conquer_settings_v2 LIMIT 1;")
-        if rows and not self.check_conquers.is_running():
+        if self.bot.subscriptions.rows("conquer_settings_v2") and not self.check_conquers.is_running():
             self.check_conquers.start()
             logger.info("[ConquerTracker] Background check_conquers loop started via on_ready.")
 
+        if not self.cleanup_conquers.is_running():
+            self.cleanup_conquers.start()
+
         self.loop_initialized = True
 
+    async def _on_subscriptions(self, table: str, worlds: set[str]) -> None:
+        """Start or stop check_conquers as subscriptions come and go, in any process."""
+        subscribed = bool(self.bot.subscriptions.rows("conquer_settings_v2"))
+        if subscribed and self.bot.is_ready() and not self.check_conquers.is_running():
+            self.check_conquers.start()
+            logger.info("[ConquerTracker] Background check_conquers loop started via subscription change.")
+        elif not subscribed and self.check_conquers.is_running():
+            self.check_conquers.cancel()
+
     async def get_tribe_id(self, world: str, tribe_tag: str):
         return await self.db.fetchrow("""
             SELECT tribe_id, tag
@@ -110,15 +273,49 @@ class ConquerTracker(commands.Cog):
         tribe_tag = tribe_tag.strip()
         await self.toggle_tracking(ctx.guild.id, ctx.channel.id, world, tribe_tag)
 
+    @commands.command(name="conquermode")
+    @commands.is_owner()
+    async def conquermode(self, ctx: commands.Context, world: str, mode: str):
+        world = world.strip().lower()
+        mode = mode.strip().lower()
+        if mode not in DETECTION_MODES:
+            await ctx.send(f"Onbekende modus `{mode}`. Kies uit: {', '.join(DETECTION_MODES)}.")
+            return
+
+        await self.set_detection_mode(world, mode)
+        await ctx.send(f"Veroveringen op `{world}` worden nu gedetecteerd via `{mode}`.")
+
+    async def set_detection_mode(self, world: str, mode: str) -> None:
+        now_ts = int(datetime.utcnow().timestamp())
+
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                # Either way, start from "now": a stale baseline or `since` would
+                # report conquers the other mode already handled.
+                await conn.execute("""
+                    INSERT INTO conquer_world_state_v2 (world, last_since, detection_mode)
+                    VALUES ($1, $2, $3)
+                    ON CONFLICT (world) DO UPDATE
+                    SET last_since = EXCLUDED.last_since,
+                        detection_mode = EXCLUDED.detection_mode;
+                """, world, now_ts, mode)
+
+                await conn.execute("DELETE FROM conquer_lastowners_v3 WHERE world = $1;", world)
+                if mode == "snapshot":
+                    await self._ensure_baseline_from_village_data(conn, world)
+
+        self._last_snapshot_scan.pop(world, None)
+
     async def toggle_tracking(self, guild_id: int, channel_id: int, world: str, tribe_tag: str):
         tribe_data = await self.get_tribe_id(world, tribe_tag)
         channel = self.bot.get_channel(channel_id)
 
         if not tribe_data:
             if channel:
+                suggestions = await self.bot.names.suggest(world, tribe_tag, TRIBE)
                 await channel.send(
                     f"Stammen tag `{tribe_tag}` niet gevonden op wereld `{world}`. "
-                    f"Gebruik de exacte tag zoals ingame."
+                    f"Gebruik de exacte tag zoals ingame.{format_suggestions(suggestions)}"
                 )
             return None
 
@@ -141,10 +338,6 @@ class ConquerTracker(commands.Cog):
                     f"Tracken van veroveringen voor stam `{exact_tag}` op `{world}` uitgeschakeld."
                 )
 
-            any_left = await self.db.fetchval("SELECT 1 FROM conquer_settings_v2 LIMIT 1;")
-            if not any_left and self.check_conquers.is_running():
-                self.check_conquers.cancel()
-
             return False
 
         now_ts = int(datetime.utcnow().timestamp())
@@ -166,10 +359,6 @@ class ConquerTracker(commands.Cog):
                 f"Tracken van veroveringen voor stam `{exact_tag}` op `{world}` aangezet."
             )
 
-        if self.bot.is_ready() and not self.check_conquers.is_running():
-            self.check_conquers.start()
-            logger.info("[ConquerTracker] Background check_conquers loop started via toggle.")
-
         return True
 
     async def _get_since_for_world(self, world: str) -> int:
@@ -199,15 +388,260 @@ class ConquerTracker(commands.Cog):
             ON CONFLICT (world) DO UPDATE SET last_since = EXCLUDED.last_since;
         """, world, since)
 
-    @tasks.loop(minutes=1)
+    async def _get_modes(self) -> dict[str, str]:
+        rows = await self.db.fetch("SELECT world, detection_mode FROM conquer_world_state_v2;")
+        return {row["world"]: row["detection_mode"] for row in rows}
+
+    async def sync_listeners(self, snapshot_worlds: set[str]) -> None:
+        """LISTEN on the village refresh channel of every snapshot-mode world."""
+        wanted = {refresh_channel("village_data_v3", world): world for world in snapshot_worlds}
+
+        for channel in set(self._listening) - set(wanted):
+            await self.bot.pg_listener.unlisten(channel, self._on_village_refresh)
+            del self._listening[channel]
+
+        for channel, world in wanted.items():
+            if channel not in self._listening:
+                await self.bot.pg_listener.listen(channel, self._on_village_refresh)
+                self._listening[channel] = world
+
+    async def _on_village_refresh(self, channel: str, payload: str) -> None:
+        world = self._listening.get(channel)
+        if world is None or not self.bot.is_ready():
+            return
+        await self.scan_snapshot_world(world)
+
+    async def _ensure_baseline_from_village_data(self, conn: asyncpg.Connection, world: str) -> None:
+        await conn.execute("""
+            INSERT INTO conquer_lastowners_v3 (world, village_id, player_id, tribe_id)
+            SELECT world, village_id, player_id, COALESCE(tribe_id, 0)
+            FROM village_data_v3
+            WHERE world = $1
+            ON CONFLICT (world, village_id) DO UPDATE
+            SET player_id = EXCLUDED.player_id,
+                tribe_id = EXCLUDED.tribe_id;
+        """, world)
+
+    async def _merge_lastowners(self, conn: asyncpg.Connection, world: str, changed: list) -> None:
+        """Write changed (village_id, player_id, tribe_id) rows back with one COPY and one merge."""
+        await conn.execute("""
+            CREATE TEMP TABLE conquer_lastowners_stage (
+                village_id BIGINT NOT NULL,
+                player_id BIGINT NOT NULL,
+                tribe_id BIGINT NOT NULL
+            ) ON COMMIT DROP;
+        """)
+
+        await conn.copy_records_to_table(
+            "conquer_lastowners_stage",
+            records=changed,
+            columns=["village_id", "player_id", "tribe_id"],
+        )
+
+        await conn.execute("""
+            INSERT INTO conquer_lastowners_v3 (world, village_id, player_id, tribe_id)
+            SELECT $1, village_id, player_id, tribe_id
+            FROM conquer_lastowners_stage
+            ON CONFLICT (world, village_id) DO UPDATE
+            SET player_id = EXCLUDED.player_id,
+                tribe_id = EXCLUDED.tribe_id;
+        """, world)
+
+    async def scan_snapshot_world(self, world: str) -> None:
+        """Detect conquers by diffing village_data_v3 owners against the last snapshot."""
+        lock = self._world_locks.setdefault(world, asyncio.Lock())
+        async with lock:
+            try:
+                if not await self.bot.leases.acquire("conquer", world):
+                    return
+
+                current = await self.db.fetch("""
+                    SELECT village_id, player_id, tribe_id, points
+                    FROM village_data_v3
+                    WHERE world = $1;
+                """, world)
+                if not current:
+                    return
+
+                previous_rows = await self.db.fetch("""
+                    SELECT village_id, player_id, tribe_id
+                    FROM conquer_lastowners_v3
+                    WHERE world = $1;
+                """, world)
+
+                tracking_channels = self.bot.subscriptions.rows("conquer_settings_v2", world)
+
+                async with self.db.acquire() as conn:
+                    async with conn.transaction():
+                        if not previous_rows:
+                            await self._ensure_baseline_from_village_data(conn, world)
+                            self._last_snapshot_scan[world] = time.monotonic()
+                            print(f"[ConquerTracker {world.upper()}] - Snapshot baseline created.")
+                            return
+
+                        previous = {r[0]: (r[1], r[2]) for r in previous_rows}
+
+                        changed = [
+                            (r[0], r[1], r[2] or 0)
+                            for r in current
+                            if previous.get(r[0]) != (r[1], r[2] or 0)
+                        ]
+                        conquers = [
+                            (r[0], r[1], r[2] or 0, r[3], *previous[r[0]])
+                            for r in current
+                            if r[0] in previous and previous[r[0]][0] != r[1]
+                        ]
+
+                        now_ts = int(datetime.utcnow().timestamp())
+
+                        if conquers:
+                            # One statement, so the statement-level rollup trigger runs once per scan.
+                            vids, new_pids, new_tids, points, old_pids, old_tids = zip(*conquers)
+                            await conn.execute("""
+                                INSERT INTO conquer_data_v2 (
+                                    world, village_id, unix_timestamp,
+                                    new_owner_id, new_owner_tribe_id,
+                                    old_owner_id, old_owner_tribe_id,
+                                    points
+                                )
+                                SELECT $1, v, $2, np, nt, op, ot, pts
+                                FROM unnest(
+                                    $3::BIGINT[], $4::BIGINT[], $5::BIGINT[],
+                                    $6::BIGINT[], $7::BIGINT[], $8::INT[]
+                                ) AS u(v, np, nt, op, ot, pts)
+                                ON CONFLICT DO NOTHING;
+                            """, world, now_ts, list(vids), list(new_pids), list(new_tids),
+                                list(old_pids), list(old_tids), list(points))
+
+                        if changed:
+                            await self._merge_lastowners(conn, world, changed)
+
+                        # Queued in the same transaction: a conquer is never stored without its notifications.
+                        batch = NotificationBatch()
+                        for vid, new_pid, new_tid, points, old_pid, old_tid in conquers:
+                            await self.route_conquer(
+                                world, tracking_channels, batch,
+                                vid, now_ts, new_pid, new_tid, old_pid, old_tid
+                            )
+                        await self.flush_notifications(world, batch, conn)
+
+                self._last_snapshot_scan[world] = time.monotonic()
+
+                if not conquers:
+                    print(f"[ConquerTracker {world.upper()}] - 0 new conquers found.")
+                    return
+
+                print(f"[ConquerTracker {world.upper()}] - {len(conquers)} new conquers found.")
+
+            except Exception as e:
+                print(f"[ConquerTracker {world.upper()}] snapshot scan fout: {e}")
+
+    async def catch_up_world(self, world, tracking_channels, since, body: Optional[bytes] = None) -> bool:
+        """Bulk-load every conquer since `since` from map/conquer.txt.gz (or a recorded `body`).
+
+        The file is parsed in the CPU pool, COPY'd into a stage table and merged
+        into conquer_data_v2 with one INSERT ... ON CONFLICT DO NOTHING, whose
+        RETURNING rows are the conquers that were not stored yet. Subscriptions
+        get those replayed one by one or as one summary, per their catchup_mode.
+        """
+        started = time.perf_counter()
+
+        if body is None:
+            if self.session is None or self.session.closed:
+                self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=20))
+            url = world_url(world, "map/conquer.txt.gz")
+            try:
+                async with self.session.get(url, timeout=STREAM_TIMEOUT) as response:
+                    if response.status != 200:
+                        print(f"[ConquerTracker {world.upper()}] HTTP {response.status} bij ophalen conquer.txt.gz")
+                        return False
+                    body = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"[ConquerTracker {world.upper()}] catch-up download fout: {e}")
+                return False
+
+        values = unpack(await self.bot.cpu_pool.run("parse_conquer_file", parse_conquer_file, body, since))
+        records = list(zip(values[0::4], values[1::4], values[2::4], values[3::4]))
+
+        # Digest and summary subscriptions both get one message per subscription.
+        channels = [{**dict(t), "digest": t["digest"] or t["catchup_mode"] == "summary"} for t in tracking_channels]
+
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("""
+                    CREATE TEMP TABLE conquer_catchup_stage (
+                        village_id BIGINT NOT NULL,
+                        unix_timestamp BIGINT NOT NULL,
+                        new_owner_id BIGINT NOT NULL,
+                        old_owner_id BIGINT NOT NULL
+                    ) ON COMMIT DROP;
+                """)
+                await conn.copy_records_to_table(
+                    "conquer_catchup_stage",
+                    records=records,
+                    columns=["village_id", "unix_timestamp", "new_owner_id", "old_owner_id"],
+                )
+                stored = await conn.fetch(CATCHUP_INSERT_SQL, world)
+
+                batch = NotificationBatch()
+                for r in sorted(stored, key=lambda r: r["unix_timestamp"]):
+                    await self.route_conquer(
+                        world, channels, batch,
+                        r["village_id"], r["unix_timestamp"],
+                        r["new_owner_id"], r["new_owner_tribe_id"], r["old_owner_id"], r["old_owner_tribe_id"]
+                    )
+                await self.flush_notifications(world, batch, conn)
+
+                # Continue from the newest conquer actually read, however old the file is;
+                # the interface covers the rest and dedups the overlap.
+                newest = max(values[1::4], default=since - 1)
+                await conn.execute("""
+                    INSERT INTO conquer_world_state_v2 (world, last_since)
+                    VALUES ($1, $2)
+                    ON CONFLICT (world) DO UPDATE SET last_since = EXCLUDED.last_since;
+                """, world, max(since, newest + 1))
+
+        elapsed = time.perf_counter() - started
+        self.bot.metrics.histogram("conquer.catchup").observe(elapsed)
+        print(
+            f"[ConquerTracker {world.upper()}] - Catch-up: {len(records)} conquers read, {len(stored)} new, "
+            f"{elapsed:.2f}s ({len(records) / max(elapsed, 1e-6):.0f}/s)."
+        )
+        return True
+
+    @commands.command(name="conquercatchup")
+    @commands.is_owner()
+    async def conquercatchup(self, ctx: commands.Context, world: str, path: Optional[str] = None):
+        """Haal gemiste veroveringen in vanaf conquer.txt.gz of een opgeslagen bestand."""
+        world = world.strip().lower()
+        tracking_channels = self.bot.subscriptions.rows("conquer_settings_v2", world)
+
+        body = None
+        if path is not None:
+            try:
+                with open(path, "rb") as f:
+                    body = f.read()
+            except OSError as e:
+                await ctx.send(f"Bestand `{path}` kan niet gelezen worden: {e}")
+                return
+
+        if not await self.bot.leases.acquire("conquer", world):
+            await ctx.send(f"`{world}` wordt door een ander proces gescand.")
+            return
+
+        lock = self._world_locks.setdefault(world, asyncio.Lock())
+        async with lock:
+            since = max(await self._get_since_for_world(world), subscribed_since(tracking_channels))
+            ok = await self.catch_up_world(world, tracking_channels, since, body)
+
+        await ctx.send(f"Catch-up voor `{world}` {'afgerond' if ok else 'mislukt'}.")
+
+    @tasks.loop(seconds=15)
     async def check_conquers(self):
         if not self.bot.is_ready():
             return
 
-        tracking_data = await self.db.fetch("""
-            SELECT guild_id, channel_id, world, tribe_id
-            FROM conquer_settings_v2;
-        """)
+        tracking_data = self.bot.subscriptions.rows("conquer_settings_v2")
         if not tracking_data:
             return
 
@@ -217,84 +651,80 @@ class ConquerTracker(commands.Cog):
             timeout = aiohttp.ClientTimeout(total=20)
             self.session = aiohttp.ClientSession(timeout=timeout)
 
+        scheduler = self.bot.update_scheduler
+
+        modes = await self._get_modes()
+        snapshot_worlds = {w for w in worlds if modes.get(w) == "snapshot"}
+        await self.sync_listeners(snapshot_worlds)
+
         for world in worlds:
+            if world in snapshot_worlds:
+                last_scan = self._last_snapshot_scan.get(world, 0.0)
+                if time.monotonic() - last_scan >= SNAPSHOT_FALLBACK_SECONDS:
+                    await self.scan_snapshot_world(world)
+                continue
+
+            if not scheduler.is_due(world, "conquer"):
+                continue
+
             try:
-                since = await self._get_since_for_world(world)
-                
+                if not await self.bot.leases.acquire("conquer", world):
+                    continue
+
+                tracking_channels = [t for t in tracking_data if t["world"] == world]
+                # last_since stays behind while a world has no subscriptions; never catch up past them.
+                since = max(await self._get_since_for_world(world), subscribed_since(tracking_channels))
+
                 now_ts = int(datetime.utcnow().timestamp())
-                min_since = now_ts - 84600
+                min_since = now_ts - INTERFACE_MAX_AGE
                 if since < min_since:
-                    since = min_since
-                
-                url = f"https://{world}.tribalwars.nl/interface.php?func=get_conquer_extended&since={since}"
+                    # After a long outage the interface no longer has everything; bulk-load the gap.
+                    if await self.catch_up_world(world, tracking_channels, since):
+                        since = await self._get_since_for_world(world)
+                    # A stale conquer.txt.gz can leave part of the gap; the interface takes what it still has.
+                    since = max(since, min_since)
+
+                url = world_url(world, f"interface.php?func=get_conquer_extended&since={since}")
+
+                max_ts_seen = since
+                seen_count = 0
+                stored_count = 0
 
                 try:
-                    async with self.session.get(url) as response:
+                    async with self.session.get(url, timeout=STREAM_TIMEOUT) as response:
                         if response.status != 200:
                             print(f"[ConquerTracker {world.upper()}] HTTP {response.status} bij ophalen conquers")
+                            scheduler.record(world, "conquer", changed=False)
                             continue
-                        raw_data = await response.text()
+
+                        async for village_id, unix_timestamp, new_owner_id, old_owner_id in self._iter_conquers(response):
+                            seen_count += 1
+                            if unix_timestamp > max_ts_seen:
+                                max_ts_seen = unix_timestamp
+
+                            stored = await self.ingest_conquer(
+                                world, tracking_channels,
+                                village_id, unix_timestamp, new_owner_id, old_owner_id
+                            )
+                            if stored:
+                                stored_count += 1
                 except asyncio.TimeoutError:
                     print(f"[ConquerTracker {world.upper()}] timeout bij ophalen conquers")
+                    scheduler.record(world, "conquer", changed=False)
                     continue
                 except aiohttp.ClientError as e:
                     print(f"[ConquerTracker {world.upper()}] aiohttp fout: {e}")
+                    scheduler.record(world, "conquer", changed=False)
                     continue
+                finally:
+                    # Also sends what a crash or restart left in conquer_digest_pending_v1.
+                    await self.flush_pending_digests(world)
 
-                conquers = [e.split(",") for e in re.split(r"\s+", raw_data.strip()) if e]
-                if not conquers:
+                scheduler.record(world, "conquer", changed=seen_count > 0)
+                if seen_count == 0:
                     print(f"[ConquerTracker {world.upper()}] - 0 new conquers found.")
                     continue
 
-                max_ts_seen = since
-                stored_count = 0
-
-                tracking_channels = [t for t in tracking_data if t["world"] == world]
-                if not tracking_channels:
-                    continue
-
-                for conquer in conquers:
-                    if len(conquer) < 4:
-                        continue
-
-                    village_id, unix_timestamp, new_owner_id, old_owner_id = map(int, conquer[:4])
-                    if unix_timestamp > max_ts_seen:
-                        max_ts_seen = unix_timestamp
-
-                    stored = await self.store_conquer(world, village_id, unix_timestamp, new_owner_id, old_owner_id)
-                    if not stored:
-                        continue
-
-                    stored_count += 1
-
-                    players = await self.db.fetch("""
-                        SELECT player_id, tribe_id
-                        FROM player_data_v3
-                        WHERE world = $1 AND player_id = ANY($2::BIGINT[]);
-                    """, world, [new_owner_id, old_owner_id])
-
-                    new_owner_tribe_id = next((p["tribe_id"] for p in players if p["player_id"] == new_owner_id), None)
-                    old_owner_tribe_id = next((p["tribe_id"] for p in players if p["player_id"] == old_owner_id), None)
-
-                    relevant = [
-                        t for t in tracking_channels
-                        if t["tribe_id"] in (new_owner_tribe_id, old_owner_tribe_id)
-                    ]
-                    if not relevant:
-                        continue
-
-                    for t in relevant:
-                        await self.process_conquer(
-                            guild_id=t["guild_id"],
-                            channel_id=t["channel_id"],
-                            world=world,
-                            tracked_tribe_id=t["tribe_id"],
-                            village_id=village_id,
-                            unix_timestamp=unix_timestamp,
-                            new_owner_id=new_owner_id,
-                            old_owner_id=old_owner_id,
-                        )
-
                 await self._set_since_for_world(world, int(max_ts_seen) + 1)
 
                 if stored_count == 0:
@@ -305,11 +735,416 @@ class ConquerTracker(commands.Cog):
             except Exception as e:
                 print(f"[ConquerTracker {world.upper()}] scan fout: {e}")
 
+    @staticmethod
+    async def _iter_conquers(response: aiohttp.ClientResponse):
+        """Yield (village_id, unix_timestamp, new_owner_id, old_owner_id) per line as it arrives."""
+        async for line in response.content:
+            for entry in line.split():
+                fields = entry.split(b",", 4)
+                if len(fields) < 4:
+                    continue
+                try:
+                    yield int(fields[0]), int(fields[1]), int(fields[2]), int(fields[3])
+                except ValueError:
+                    continue
+
+    async def ingest_conquer(
+        self,
+        world,
+        tracking_channels,
+        village_id,
+        unix_timestamp,
+        new_owner_id,
+        old_owner_id
+    ):
+        details = await self.conquer_details(world, village_id, unix_timestamp, new_owner_id, old_owner_id)
+        if details is None:
+            return False
+
+        new_owner_tribe_id, old_owner_tribe_id, points = details
+
+        # Build this conquer's messages first so they are queued in the transaction that stores it.
+        conquer_batch = NotificationBatch()
+        await self.route_conquer(
+            world, tracking_channels, conquer_batch,
+            village_id, unix_timestamp,
+            new_owner_id, new_owner_tribe_id, old_owner_id, old_owner_tribe_id
+        )
+
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                await self.store_conquer(
+                    conn, world, village_id, unix_timestamp,
+                    new_owner_id, new_owner_tribe_id, old_owner_id, old_owner_tribe_id, points
+                )
+                await self.bot.events.append(conquer_batch.events, conn)
+                await self.hold_for_digest(conn, world, conquer_batch.digests)
+
+        return True
+
+    async def hold_for_digest(self, conn, world, digests):
+        """Keep a conquer for its digest summaries, in the transaction that stores it."""
+        rows = [
+            (guild_id, channel_id, world, tribe_id, *conquer)
+            for (guild_id, channel_id, tribe_id), conquers in digests.items()
+            for conquer in conquers
+        ]
+        if not rows:
+            return
+        await conn.executemany("""
+            INSERT INTO conquer_digest_pending_v1 (
+                guild_id, channel_id, world, tribe_id,
+                village_id, unix_timestamp, new_owner_id, new_owner_tribe_id, old_owner_id, old_owner_tribe_id
+            )
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+            ON CONFLICT DO NOTHING;
+        """, rows)
+
+    async def flush_pending_digests(self, world):
+        """Turn the held conquers into summaries; they leave the table in the transaction that queues them."""
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                rows = await conn.fetch("""
+                    DELETE FROM conquer_digest_pending_v1
+                    WHERE world = $1
+                    RETURNING guild_id, channel_id, tribe_id,
+                              village_id, unix_timestamp, new_owner_id, new_owner_tribe_id, old_owner_id, old_owner_tribe_id;
+                """, world)
+                if not rows:
+                    return
+
+                batch = NotificationBatch()
+                for r in rows:
+                    batch.digests.setdefault((r["guild_id"], r["channel_id"], r["tribe_id"]), []).append((
+                        r["village_id"], r["unix_timestamp"], r["new_owner_id"],
+                        r["new_owner_tribe_id"], r["old_owner_id"], r["old_owner_tribe_id"]
+                    ))
+                await self.flush_notifications(world, batch, conn)
+
+    async def route_conquer(
+        self,
+        world,
+        tracking_channels,
+        batch,
+        village_id,
+        unix_timestamp,
+        new_owner_id,
+        new_owner_tribe_id,
+        old_owner_id,
+        old_owner_tribe_id
+    ):
+        """Build the message for every relevant subscription, or hold the conquer for its digest."""
+        if not {new_owner_tribe_id, old_owner_tribe_id} & {t["tribe_id"] for t in tracking_channels}:
+            return
+
+        for t in tracking_channels:
+            if t["tribe_id"] not in (new_owner_tribe_id, old_owner_tribe_id):
+                continue
+            if unix_timestamp < t["starting_unix_timestamp"]:
+                continue
+
+            if t["digest"]:
+                key = (t["guild_id"], t["channel_id"], t["tribe_id"])
+                batch.digests.setdefault(key, []).append(
+                    (village_id, unix_timestamp, new_owner_id, new_owner_tribe_id or 0, old_owner_id, old_owner_tribe_id or 0)
+                )
+                continue
+
+            event = await self.process_conquer(
+                guild_id=t["guild_id"],
+                channel_id=t["channel_id"],
+                world=world,
+                tracked_tribe_id=t["tribe_id"],
+                village_id=village_id,
+                unix_timestamp=unix_timestamp,
+                new_owner_id=new_owner_id,
+                new_owner_tribe_id=new_owner_tribe_id,
+                old_owner_id=old_owner_id,
+                old_owner_tribe_id=old_owner_tribe_id,
+            )
+            if event is not None:
+                batch.events.append(event)
+
+    async def flush_notifications(self, world, batch, conn=None):
+        """Append the batch to the outbox, with one summary per digest subscription."""
+        if batch.digests:
+            await self.build_digests(world, batch)
+
+        await self.bot.events.append(batch.events, conn)
+        batch.events.clear()
+
+    async def build_digests(self, world, batch):
+        conquers = [c for items in batch.digests.values() for c in items]
+        village_ids = list({c[0] for c in conquers})
+        player_ids = list({c[2] for c in conquers} | {c[4] for c in conquers})
+        tribe_ids = list({c[3] for c in conquers} | {c[5] for c in conquers})
+
+        villages = {r["village_id"]: r for r in await self.db.fetch("""
+            SELECT village_id, name, x, y, points
+            FROM village_data_v3
+            WHERE world = $1 AND village_id = ANY($2::BIGINT[]);
+        """, world, village_ids)}
+        players = {r["player_id"]: r["name"] for r in await self.db.fetch("""
+            SELECT player_id, name
+            FROM player_data_v3
+            WHERE world = $1 AND player_id = ANY($2::BIGINT[]);
+        """, world, player_ids)}
+        tags = {r["tribe_id"]: r["tag"] for r in await self.db.fetch("""
+            SELECT tribe_id, tag
+            FROM ally_data_v3
+            WHERE world = $1 AND tribe_id = ANY($2::BIGINT[]);
+        """, world, tribe_ids)}
+
+        for (guild_id, channel_id, tribe_id), items in batch.digests.items():
+            try:
+                event = await self.build_digest(guild_id, channel_id, world, tribe_id, items, villages, players, tags)
+            except Exception as e:
+                logger.error(f"[ConquerTracker {world.upper()}] digest voor kanaal {channel_id} mislukt: {e}")
+                continue
+            if event is not None:
+                batch.events.append(event)
+
+        batch.digests.clear()
+
+    async def build_digest(self, guild_id, channel_id, world, tribe_id, items, villages, players, tags):
+        sent = await self.db.fetch("""
+            SELECT village_id, unix_timestamp, old_owner_id, new_owner_id
+            FROM conquer_messages_v2
+            WHERE guild_id = $1 AND channel_id = $2 AND world = $3
+              AND village_id = ANY($4::BIGINT[]);
+        """, guild_id, channel_id, world, [c[0] for c in items])
+        sent_keys = {(r["village_id"], r["unix_timestamp"], r["new_owner_id"], r["old_owner_id"]) for r in sent}
+        items = [c for c in items if (c[0], c[1], c[2], c[4]) not in sent_keys]
+        if not items:
+            return None
+
+        gains = [c for c in items if c[3] == tribe_id and c[5] != tribe_id]
+        losses = [c for c in items if c[5] == tribe_id and c[3] != tribe_id]
+        internals = len(items) - len(gains) - len(losses)
+        barbs = sum(1 for c in gains if c[4] == 0)
+
+        def village_points(c):
+            village = villages.get(c[0])
+            return village["points"] if village else 0
+
+        def player_name(player_id, fallback):
+            return players.get(player_id, fallback)
+
+        lines = []
+        for c in sorted(gains + losses, key=village_points, reverse=True)[:DIGEST_NOTABLE_VILLAGES]:
+            village_id, _, new_owner_id, new_tribe_id, old_owner_id, old_tribe_id = c
+            village = villages.get(village_id)
+            name = f"{village['name']} ({village['x']}|{village['y']})" if village else str(village_id)
+            sign = "+" if new_tribe_id == tribe_id else "-"
+            new_owner = player_name(new_owner_id, "Onbekend")
+            old_owner = player_name(old_owner_id, "Barbarendorp")
+            if sign == "-" and new_tribe_id in tags:
+                new_owner = f"{new_owner} (`{tags[new_tribe_id]}`)"
+            lines.append(
+                f"`{sign}` [{name}](https://{world}.tribalwars.nl/game.php?screen=info_village&id={village_id}) "
+                f"{village_points(c)} ptn - {new_owner} van {old_owner}"
+            )
+
+        timezone = pytz.timezone("Europe/Amsterdam")
+        first = datetime.utcfromtimestamp(min(c[1] for c in items)).replace(tzinfo=pytz.utc).astimezone(timezone)
+        last = datetime.utcfromtimestamp(max(c[1] for c in items)).replace(tzinfo=pytz.utc).astimezone(timezone)
+
+        balance = len(gains) - len(losses)
+        embed = discord.Embed(
+            title=f"Veroveringen {tags.get(tribe_id, tribe_id)} op {world}",
+            description=(
+                f"**+{len(gains)}** gewonnen ({barbs} barbarendorpen)\n"
+                f"**-{len(losses)}** verloren\n"
+                f"**{internals}** intern\n"
+                f"Saldo: **{balance:+}**"
+            ),
+            color=discord.Color.green() if balance >= 0 else discord.Color.red()
+        )
+        if lines:
+            embed.add_field(name="Opvallende dorpen", value="\n".join(lines)[:1024], inline=False)
+        embed.set_footer(text=f"Tijdvak: {first.strftime('%Y-%m-%d %H:%M')} - {last.strftime('%H:%M')}")
+
+        first_ts = min(c[1] for c in items)
+        last_ts = max(c[1] for c in items)
+        return OutboxEvent(
+            channel_id, embed, "conquer",
+            dedup_key=f"conquer-digest:{guild_id}:{channel_id}:{world}:{tribe_id}:{first_ts}:{last_ts}:{len(items)}",
+            receipt=[
+                conquer_receipt(guild_id, channel_id, world, c[0], c[1], c[4], c[2])
+                for c in items
+            ]
+        )
+
+    @app_commands.command(name="conquer-digest", description="Bundel de veroveringen van een stam in dit kanaal per scan in één bericht.")
+    @app_commands.describe(wereld="Wereld van de tracker", stam="Tag van de gevolgde stam", aan="Samenvatting aan of uit")
+    async def conquer_digest(self, interaction: discord.Interaction, wereld: str, stam: str, aan: bool):
+        wereld = wereld.strip().lower()
+        tribe_data = await self.get_tribe_id(wereld, stam.strip())
+        if not tribe_data:
+            # Building a cold name index can outlast the interaction deadline.
+            await interaction.response.defer(ephemeral=True)
+            suggestions = await self.bot.names.suggest(wereld, stam, TRIBE)
+            await interaction.followup.send(
+                f"Stammen tag `{stam}` niet gevonden op wereld `{wereld}`.{format_suggestions(suggestions)}", ephemeral=True
+            )
+            return
+
+        tribe_id, exact_tag = tribe_data
+        result = await self.db.execute("""
+            UPDATE conquer_settings_v2
+            SET digest = $5
+            WHERE guild_id = $1 AND channel_id = $2 AND world = $3 AND tribe_id = $4;
+        """, interaction.guild_id, interaction.channel_id, wereld, tribe_id, aan)
+
+        if result.endswith(" 0"):
+            await interaction.response.send_message(
+                f"Stam `{exact_tag}` op `{wereld}` wordt niet getrackt in dit kanaal.", ephemeral=True
+            )
+            return
+
+        status = "als samenvatting per scan" if aan else "per verovering"
+        await interaction.response.send_message(
+            f"Veroveringen van `{exact_tag}` op `{wereld}` worden nu {status} geplaatst.", ephemeral=True
+        )
+
+    @app_commands.command(name="conquer-catchup", description="Kies hoe gemiste veroveringen na een storing in dit kanaal geplaatst worden.")
+    @app_commands.describe(wereld="Wereld van de tracker", stam="Tag van de gevolgde stam", modus="Samenvatting of elke verovering apart")
+    @app_commands.choices(modus=[
+        app_commands.Choice(name="Samenvatting", value="summary"),
+        app_commands.Choice(name="Elke verovering apart", value="replay"),
+    ])
+    async def conquer_catchup(self, interaction: discord.Interaction, wereld: str, stam: str, modus: app_commands.Choice[str]):
+        wereld = wereld.strip().lower()
+        tribe_data = await self.get_tribe_id(wereld, stam.strip())
+        if not tribe_data:
+            await interaction.response.defer(ephemeral=True)
+            suggestions = await self.bot.names.suggest(wereld, stam, TRIBE)
+            await interaction.followup.send(
+                f"Stammen tag `{stam}` niet gevonden op wereld `{wereld}`.{format_suggestions(suggestions)}", ephemeral=True
+            )
+            return
+
+        tribe_id, exact_tag = tribe_data
+        result = await self.db.execute("""
+            UPDATE conquer_settings_v2
+            SET catchup_mode = $5
+            WHERE guild_id = $1 AND channel_id = $2 AND world = $3 AND tribe_id = $4;
+        """, interaction.guild_id, interaction.channel_id, wereld, tribe_id, modus.value)
+
+        if result.endswith(" 0"):
+            await interaction.response.send_message(
+                f"Stam `{exact_tag}` op `{wereld}` wordt niet getrackt in dit kanaal.", ephemeral=True
+            )
+            return
+
+        await interaction.response.send_message(
+            f"Gemiste veroveringen van `{exact_tag}` op `{wereld}` worden na een storing geplaatst als: {modus.name.lower()}.",
+            ephemeral=True
+        )
+
     @check_conquers.before_loop
     async def before_check_conquers(self):
         await self.bot.wait_until_ready()
 
-    async def store_conquer(self, world, village_id, unix_timestamp, new_owner_id, old_owner_id):
+    @tasks.loop(hours=24)
+    async def cleanup_conquers(self):
+        """Verwijder verweesde berichten, abonnementen op opgeheven stammen en ongebruikte baselines."""
+        if not await self.bot.leases.acquire("conquer-cleanup", "*"):
+            return
+
+        try:
+            settings = await self.remove_disbanded_subscriptions()
+
+            messages = await delete_in_batches(self.db, "conquer_messages_v2", """
+                NOT EXISTS (
+                    SELECT 1 FROM conquer_settings_v2 s
+                    WHERE s.guild_id = t.guild_id AND s.channel_id = t.channel_id AND s.world = t.world
+                )
+            """)
+
+            # Held for a digest subscription that has since been removed.
+            await delete_in_batches(self.db, "conquer_digest_pending_v1", """
+                NOT EXISTS (
+                    SELECT 1 FROM conquer_settings_v2 s
+                    WHERE s.guild_id = t.guild_id AND s.channel_id = t.channel_id
+                      AND s.world = t.world AND s.tribe_id = t.tribe_id
+                )
+            """)
+
+            baselines = await delete_in_batches(self.db, "conquer_lastowners_v3", """
+                NOT EXISTS (SELECT 1 FROM conquer_settings_v2 s WHERE s.world = t.world)
+            """)
+
+            changes = await delete_in_batches(self.db, "tribe_membership_changes_v1", f"""
+                t.changed_at < NOW() - INTERVAL '{CHANGE_RETENTION_DAYS} days'
+            """)
+
+            print(
+                f"[ConquerTracker] - Cleanup removed {settings} subscriptions, "
+                f"{messages} messages, {baselines} baseline rows and {changes} membership changes."
+            )
+        except Exception as e:
+            logger.exception(f"Error during ConquerTracker cleanup: {e}")
+
+    async def remove_disbanded_subscriptions(self) -> int:
+        """Remove subscriptions whose tribe stayed missing for MISSING_TRIBE_GRACE_DAYS, telling their channel.
+
+        Tribes are never re-created under the same id, so such a subscription can
+        never match again. Worlds without ally data are skipped, and a tribe that
+        shows up again in any cleanup starts its grace period over.
+        """
+        tribe_missing = """
+            EXISTS (SELECT 1 FROM ally_data_v3 a WHERE a.world = s.world)
+            AND NOT EXISTS (
+                SELECT 1 FROM ally_data_v3 a
+                WHERE a.world = s.world AND a.tribe_id = s.tribe_id
+            )
+        """
+
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(f"""
+                    UPDATE conquer_settings_v2 s
+                    SET missing_since = NULL
+                    WHERE missing_since IS NOT NULL AND NOT ({tribe_missing});
+                """)
+                await conn.execute(f"""
+                    UPDATE conquer_settings_v2 s
+                    SET missing_since = NOW()
+                    WHERE missing_since IS NULL AND {tribe_missing};
+                """)
+                removed = await conn.fetch(f"""
+                    DELETE FROM conquer_settings_v2 s
+                    WHERE missing_since < NOW() - INTERVAL '{MISSING_TRIBE_GRACE_DAYS} days'
+                      AND {tribe_missing}
+                    RETURNING channel_id, world, tribe_id;
+                """)
+
+                await self.bot.events.append([
+                    OutboxEvent(
+                        r["channel_id"],
+                        discord.Embed(
+                            description=(
+                                f"Stam `{r['tribe_id']}` bestaat al minstens {MISSING_TRIBE_GRACE_DAYS} dagen niet meer op "
+                                f"`{r['world']}`. Tracken van veroveringen voor deze stam is gestopt."
+                            ),
+                            color=discord.Color.orange()
+                        ),
+                        "conquer"
+                    )
+                    for r in removed
+                ], conn)
+
+        for r in removed:
+            logger.info(f"[ConquerTracker {r['world'].upper()}] Subscription on disbanded tribe {r['tribe_id']} removed in channel {r['channel_id']}")
+        return len(removed)
+
+    @cleanup_conquers.before_loop
+    async def before_cleanup_conquers(self):
+        await self.bot.wait_until_ready()
+
+    async def conquer_details(self, world, village_id, unix_timestamp, new_owner_id, old_owner_id):
+        """(new_owner_tribe_id, old_owner_tribe_id, points) of a conquer that is not stored yet, else None."""
         exists = await self.db.fetchval("""
             SELECT 1
             FROM conquer_data_v2
@@ -317,13 +1152,7 @@ class ConquerTracker(commands.Cog):
               AND new_owner_id = $4 AND old_owner_id = $5;
         """, world, village_id, unix_timestamp, new_owner_id, old_owner_id)
         if exists:
-            return False
-
-        players = await self.db.fetch("""
-            SELECT player_id, tribe_id
-            FROM player_data_v3
-            WHERE world = $1 AND player_id = ANY($2::BIGINT[]);
-        """, world, [new_owner_id, old_owner_id])
+            return None
 
         village = await self.db.fetchrow("""
             SELECT points
@@ -331,12 +1160,27 @@ class ConquerTracker(commands.Cog):
             WHERE world = $1 AND village_id = $2;
         """, world, village_id)
         if not village:
-            return False
+            return None
 
-        new_owner_tribe_id = next((p["tribe_id"] for p in players if p["player_id"] == new_owner_id), None)
-        old_owner_tribe_id = next((p["tribe_id"] for p in players if p["player_id"] == old_owner_id), None)
+        # Tribes at conquer time: player_data_v3 may already have been refreshed since.
+        new_owner_tribe_id = await self.bot.membership.tribe_at(world, new_owner_id, unix_timestamp)
+        old_owner_tribe_id = await self.bot.membership.tribe_at(world, old_owner_id, unix_timestamp)
 
-        await self.db.execute("""
+        return new_owner_tribe_id, old_owner_tribe_id, int(village["points"])
+
+    async def store_conquer(
+        self,
+        conn,
+        world,
+        village_id,
+        unix_timestamp,
+        new_owner_id,
+        new_owner_tribe_id,
+        old_owner_id,
+        old_owner_tribe_id,
+        points
+    ):
+        await conn.execute("""
             INSERT INTO conquer_data_v2 (
                 world, village_id, unix_timestamp,
                 new_owner_id, new_owner_tribe_id,
@@ -344,9 +1188,7 @@ class ConquerTracker(commands.Cog):
                 points
             )
             VALUES ($1, $2, $3, $4, $5, $6, $7, $8);
-        """, world, village_id, unix_timestamp, new_owner_id, new_owner_tribe_id, old_owner_id, old_owner_tribe_id, int(village["points"]))
-
-        return True
+        """, world, village_id, unix_timestamp, new_owner_id, new_owner_tribe_id, old_owner_id, old_owner_tribe_id, points)
 
     async def process_conquer(
         self,
@@ -357,20 +1199,11 @@ class ConquerTracker(commands.Cog):
         village_id,
         unix_timestamp,
         new_owner_id,
-        old_owner_id
+        new_owner_tribe_id,
+        old_owner_id,
+        old_owner_tribe_id
     ):
-        conquer = await self.db.fetchrow("""
-            SELECT new_owner_tribe_id, old_owner_tribe_id
-            FROM conquer_data_v2
-            WHERE world = $1 AND village_id = $2 AND unix_timestamp = $3
-              AND new_owner_id = $4 AND old_owner_id = $5;
-        """, world, village_id, unix_timestamp, new_owner_id, old_owner_id)
-        if not conquer:
-            return
-
-        new_owner_tribe_id = conquer["new_owner_tribe_id"]
-        old_owner_tribe_id = conquer["old_owner_tribe_id"]
-
+        """Build the outbox event for one conquer in one subscribed channel."""
         tribes = await self.db.fetch("""
             SELECT tribe_id, tag
             FROM ally_data_v3
@@ -392,7 +1225,7 @@ class ConquerTracker(commands.Cog):
             WHERE world = $1 AND village_id = $2;
         """, world, village_id)
         if not village:
-            return
+            return None
 
         new_owner = next((p for p in players if p["player_id"] == new_owner_id), None)
         old_owner = next((p for p in players if p["player_id"] == old_owner_id), None)
@@ -403,16 +1236,6 @@ class ConquerTracker(commands.Cog):
         old_owner_link = f"[{old_owner_name}](https://{world}.tribalwars.nl/game.php?screen=info_player&id={old_owner_id})"
         village_link = f"[{village['name']} ({village['x']}|{village['y']})](https://{world}.tribalwars.nl/game.php?screen=info_village&id={village_id})"
 
-        exists = await self.db.fetchval("""
-            SELECT 1
-            FROM conquer_messages_v2
-            WHERE guild_id = $1 AND channel_id = $2 AND world = $3
-              AND village_id = $4 AND unix_timestamp = $5
-              AND old_owner_id = $6 AND new_owner_id = $7;
-        """, guild_id, channel_id, world, village_id, unix_timestamp, old_owner_id, new_owner_id)
-        if exists:
-            return
-
         color = discord.Color.default()
         description = ""
 
@@ -472,23 +1295,12 @@ class ConquerTracker(commands.Cog):
         )
         embed.set_footer(text=f"Tijdstip: {local_time}")
 
-        channel = self.bot.get_channel(channel_id)
-        if channel:
-            try:
-                await channel.send(embed=embed)
-            except discord.Forbidden:
-                return
-            except discord.HTTPException:
-                return
-
-        await self.db.execute("""
-            INSERT INTO conquer_messages_v2 (
-                guild_id, channel_id, world, village_id,
-                unix_timestamp, old_owner_id, new_owner_id
-            )
-            VALUES ($1, $2, $3, $4, $5, $6, $7)
-            ON CONFLICT DO NOTHING;
-        """, guild_id, channel_id, world, village_id, unix_timestamp, old_owner_id, new_owner_id)
+        receipt = conquer_receipt(guild_id, channel_id, world, village_id, unix_timestamp, old_owner_id, new_owner_id)
+        return OutboxEvent(
+            channel_id, embed, "conquer",
+            dedup_key="conquer:{guild_id}:{channel_id}:{world}:{village_id}:{unix_timestamp}:{old_owner_id}:{new_owner_id}".format(**receipt),
+            receipt=[receipt]
+        )
 
 
 async def setup(bot: commands.Bot):
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from discord.ext import commands, tasks
+
+from event_queue import EVENTS_CHANNEL
+from db_maintenance import delete_in_batches
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+class EventDelivery(commands.Cog):
+    """Drains the tracker_events_v1 outbox that every tracker appends its notifications to."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.loop_initialized: bool = False
+        self._drain_lock = asyncio.Lock()
+
+    async def cog_load(self) -> None:
+        await self.bot.pg_listener.listen(EVENTS_CHANNEL, self._on_events)
+        logger.info("[EventDelivery] Loaded")
+
+    async def cog_unload(self) -> None:
+        for loop in (self.deliver_events, self.prune_events):
+            if loop.is_running():
+                loop.cancel()
+
+        await self.bot.pg_listener.unlisten(EVENTS_CHANNEL, self._on_events)
+        logger.info("[EventDelivery] Unloaded")
+
+    @commands.Cog.listener()
+    async def on_ready(self) -> None:
+        if self.loop_initialized:
+            return
+
+        if not self.deliver_events.is_running():
+            self.deliver_events.start()
+            logger.info("[EventDelivery] Background deliver_events loop started.")
+
+        if not self.prune_events.is_running():
+            self.prune_events.start()
+
+        self.loop_initialized = True
+
+    async def _on_events(self, channel: str, payload: str) -> None:
+        if self.bot.is_ready():
+            await self.drain()
+
+    async def drain(self) -> None:
+        async with self._drain_lock:
+            batch_size = 50
+            while await self.bot.events.drain(batch_size) == batch_size:
+                pass
+
+    @tasks.loop(seconds=10)
+    async def deliver_events(self) -> None:
+        """Picks up retries that became due and events whose notification was missed."""
+        try:
+            await self.drain()
+        except Exception as e:
+            logger.error(f"[EventDelivery] Error delivering queued events: {e}")
+
+    @deliver_events.before_loop
+    async def before_deliver_events(self) -> None:
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(hours=1)
+    async def prune_events(self) -> None:
+        """Sent events are kept for a few days so their dedup keys outlive any conquer re-fetch."""
+        try:
+            removed = await delete_in_batches(self.bot.db, "tracker_events_v1", """
+                (t.status = 'sent' AND t.sent_at < NOW() - INTERVAL '3 days')
+                OR (t.status = 'dead' AND t.created_at < NOW() - INTERVAL '7 days')
+            """)
+            if removed:
+                logger.info(f"[EventDelivery] Pruned {removed} old events")
+        except Exception as e:
+            logger.error(f"[EventDelivery] Error pruning events: {e}")
+
+    @prune_events.before_loop
+    async def before_prune_events(self) -> None:
+        await self.bot.wait_until_ready()
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(EventDelivery(bot))
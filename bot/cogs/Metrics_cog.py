@@ -0,0 +1,78 @@
+from discord.ext import commands
+
+from memory_profiler import MemoryProfiler, format_bytes
+
+def code_block(lines) -> str:
+    return f"```{chr(10).join(lines)[:1990]}```"
+
+class MetricsCog(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.profiler = MemoryProfiler()
+
+    @commands.command(name="metrics")
+    @commands.is_owner()
+    async def metrics(self, ctx):
+        """Toon de interne metrics van dit proces (CPU-pool wachtrij en job-latency)."""
+        await ctx.send(f"```{self.bot.metrics.render()[:1990]}```")
+
+    @commands.group(name="memory", invoke_without_command=True)
+    @commands.is_owner()
+    async def memory(self, ctx):
+        """Geheugenprofiel: *memory start [frames], snapshot, caches, stop."""
+        status = "aan" if self.profiler.tracing else "uit"
+        await ctx.send(f"tracemalloc staat {status}. Gebruik `*memory start`, `*memory snapshot`, `*memory caches` of `*memory stop`.")
+
+    @memory.command(name="start")
+    @commands.is_owner()
+    async def memory_start(self, ctx, frames: int = 10):
+        """Start tracemalloc; meer frames geven een betere toewijzing maar kosten meer."""
+        self.profiler.start(max(1, min(frames, 50)))
+        await ctx.send("tracemalloc gestart. Neem een eerste `*memory snapshot` als nulmeting.")
+
+    @memory.command(name="stop")
+    @commands.is_owner()
+    async def memory_stop(self, ctx):
+        self.profiler.stop()
+        await ctx.send("tracemalloc gestopt en snapshots verwijderd.")
+
+    @memory.command(name="snapshot")
+    @commands.is_owner()
+    async def memory_snapshot(self, ctx):
+        """Neem een snapshot en toon het geheugen per cog, module en library, met de groei sinds de vorige."""
+        if not self.profiler.tracing:
+            await ctx.send("tracemalloc staat uit; start het met `*memory start`.")
+            return
+
+        async with ctx.typing():
+            taken, previous = await self.profiler.snapshot()
+
+        lines = ["Per eigenaar (groei sinds vorige snapshot):"]
+        lines += self.profiler.owner_diff(taken, previous)
+        await ctx.send(code_block(lines))
+
+        baseline = self.profiler.baseline
+        if baseline is not taken:
+            minutes = (taken.taken_at - baseline.taken_at) / 60
+            lines = [f"Grootste groei sinds de nulmeting ({minutes:.0f} min geleden):"]
+            lines += await self.profiler.top_growth(taken, baseline)
+            await ctx.send(code_block(lines))
+
+    @memory.command(name="caches")
+    @commands.is_owner()
+    async def memory_caches(self, ctx):
+        """Toon de omvang van elke geregistreerde in-memory cache."""
+        async with ctx.typing():
+            sizes = await self.bot.caches.measure_async()
+
+        lines = [
+            f"{s.name:<44} {'' if s.entries is None else s.entries:>8} "
+            f"{('>=' if s.truncated else '') + format_bytes(s.bytes):>12}"
+            for s in sizes
+        ]
+        total = sum(s.bytes for s in sizes)
+        lines.append(f"{'totaal':<44} {'':>8} {format_bytes(total):>12}")
+        await ctx.send(code_block(lines))
+
+async def setup(bot):
+    await bot.add_cog(MetricsCog(bot))
@@ -0,0 +1,81 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+from urllib.parse import unquote_plus
+from typing import Optional
+from main import create_embed
+from spatial import continent, parse_coords
+from world_registry import VILLAGE_DATA
+
+MAX_RADIUS = 50
+MAX_RESULTS = 25
+
+class NearbyBarbsCog(commands.Cog):
+    """Barbarian villages around a coordinate, answered from the spatial index."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.db = bot.db
+
+    @app_commands.command(name="nearby-barbs", description="Vind barbarendorpen in de buurt van een coördinaat.")
+    @app_commands.describe(
+        wereld="Selecteer de wereld",
+        coord="Coördinaat, bv. 500|500",
+        straal="Straal in velden (max 50)",
+        min_punten="Minimaal aantal punten"
+    )
+    async def nearby_barbs(
+        self,
+        interaction: discord.Interaction,
+        wereld: str,
+        coord: str,
+        straal: app_commands.Range[int, 1, MAX_RADIUS] = 10,
+        min_punten: Optional[int] = None
+    ):
+        wereld = wereld.strip().lower()
+        try:
+            x, y = parse_coords(coord)
+        except ValueError as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+            return
+
+        # A cold index loads the whole world, which can outlast the interaction deadline.
+        await interaction.response.defer()
+        index = await self.bot.spatial.get(wereld)
+        if index is None:
+            await interaction.followup.send(f"Geen dorpsdata gevonden voor `{wereld}`.", ephemeral=True)
+            return
+
+        barbs = [
+            (index.villages[i], distance)
+            for i, distance in index.in_radius(x, y, straal)
+            if index.villages[i]["player_id"] == 0
+            and (min_punten is None or index.villages[i]["points"] >= min_punten)
+        ]
+
+        if not barbs:
+            description = "*Geen barbarendorpen gevonden.*"
+        else:
+            description = "\n".join(
+                f"[{unquote_plus(v['name'])}](https://{wereld}.tribalwars.nl/game.php?screen=info_village&id={v['village_id']}) "
+                f"`{v['x']}|{v['y']}` - {distance:.1f} velden - " + f"{v['points']:,}".replace(",", ".") + " punten"
+                for v, distance in barbs[:MAX_RESULTS]
+            )
+            if len(barbs) > MAX_RESULTS:
+                description += f"\n\n*en nog {len(barbs) - MAX_RESULTS} andere*"
+
+        embed = create_embed(
+            title=f"Barbarendorpen binnen {straal} velden van {x}|{y} ({continent(x, y)})",
+            description=description
+        )
+        await interaction.followup.send(embed=embed)
+
+    @nearby_barbs.autocomplete("wereld")
+    async def wereld_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [
+            app_commands.Choice(name=w, value=w)
+            for w in self.bot.world_registry.matching(current, VILLAGE_DATA)
+        ]
+
+async def setup(bot):
+    await bot.add_cog(NearbyBarbsCog(bot))
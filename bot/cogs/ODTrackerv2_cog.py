@@ -3,12 +3,16 @@ from discord.ext import commands, tasks
 from discord import app_commands
 import asyncpg
 import logging
-import requests
 import aiohttp
-import asyncio
 from datetime import datetime
 from typing import Optional
 from main import create_embed
+from update_scheduler import parse_http_date
+from cpu_jobs import parse_kill_file, unpack
+from db_maintenance import delete_in_batches
+from event_queue import OutboxEvent
+from world_registry import OD_TRACKED
+from upstream import world_url
 
 logger = logging.getLogger(__name__)
 
@@ -18,14 +22,32 @@ KILL_TYPES = {
     "kill_sup": "ODS"
 }
 
+HISTORY_RETENTION_DAYS = 90
+
+OD_TOP_TYPES = {
+    "att": "ODA",
+    "def": "ODD",
+    "sup": "ODS",
+    "totaal": "OD totaal",
+}
+
 class ODTracker(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.db = self.bot.db
         self.loop_initialized = False
-        self._last_channel_send = {}
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._kill_fingerprints: dict[str, int] = {}
+
+        bot.caches.register("ODTracker.kill_fingerprints", self._kill_fingerprints, owner="ODTracker")
 
     async def cog_load(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
+
+        # map/kill_*.txt is regenerated periodically; learn when and poll just after.
+        self.bot.update_scheduler.register("od", min_interval=60, max_interval=1800)
+
         await self.db.execute("""
             CREATE TABLE IF NOT EXISTS odtracker_configs_v2 (
                 world TEXT PRIMARY KEY
@@ -62,152 +84,386 @@ class ODTracker(commands.Cog):
             );
         """)
 
-    async def initial_scan_world(self, world: str):
+        await self.create_history_tables()
+        self.bot.subscriptions.subscribe(self._on_subscriptions, "odtracker_configs_v2", "odtracker_enabled_tribes_v2")
+
+    async def _on_subscriptions(self, table: str, worlds: set[str]) -> None:
+        """Start or stop the OD loops as subscriptions come and go, in any process."""
+        subscribed = bool(self.bot.subscriptions.rows("odtracker_enabled_tribes_v2"))
+        for loop in (self.scan_od, self.cleanup_odtracker):
+            if subscribed and self.bot.is_ready() and not loop.is_running():
+                loop.start()
+            elif not subscribed and loop.is_running():
+                loop.cancel()
+
+    async def create_history_tables(self):
+        # Last seen kill totals, independent of the notification cooldowns in odtracker_data_v2.
+        await self.db.execute("""
+            CREATE TABLE IF NOT EXISTS odtracker_latest_v1 (
+                world TEXT NOT NULL,
+                player_id BIGINT NOT NULL,
+                kill_att BIGINT NOT NULL,
+                kill_def BIGINT NOT NULL,
+                kill_sup BIGINT NOT NULL,
+                PRIMARY KEY (world, player_id)
+            );
+        """)
+
+        # One row per player per scan in which a kill total went up, holding only the gains.
+        await self.db.execute("""
+            CREATE TABLE IF NOT EXISTS odtracker_history_v1 (
+                world TEXT NOT NULL,
+                player_id BIGINT NOT NULL,
+                scanned_at TIMESTAMPTZ NOT NULL,
+                tribe_id BIGINT NOT NULL,
+                d_att INT NOT NULL,
+                d_def INT NOT NULL,
+                d_sup INT NOT NULL,
+                PRIMARY KEY (world, player_id, scanned_at)
+            );
+        """)
+
+        # period is 'day' or 'week' (Europe/Amsterdam). Gains count for the tribe the
+        # player was in when they were made.
+        await self.db.execute("""
+            CREATE TABLE IF NOT EXISTS odtracker_rollup_players_v1 (
+                world TEXT NOT NULL,
+                period TEXT NOT NULL,
+                period_start DATE NOT NULL,
+                tribe_id BIGINT NOT NULL,
+                player_id BIGINT NOT NULL,
+                att BIGINT NOT NULL DEFAULT 0,
+                def BIGINT NOT NULL DEFAULT 0,
+                sup BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (world, period, period_start, tribe_id, player_id)
+            );
+        """)
+
+        await self.db.execute("""
+            CREATE TABLE IF NOT EXISTS odtracker_rollup_tribes_v1 (
+                world TEXT NOT NULL,
+                period TEXT NOT NULL,
+                period_start DATE NOT NULL,
+                tribe_id BIGINT NOT NULL,
+                att BIGINT NOT NULL DEFAULT 0,
+                def BIGINT NOT NULL DEFAULT 0,
+                sup BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (world, period, period_start, tribe_id)
+            );
+        """)
+
+    async def cog_unload(self):
+        for loop in (self.scan_od, self.cleanup_odtracker):
+            if loop.is_running():
+                loop.cancel()
+
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        self.bot.subscriptions.unsubscribe(self._on_subscriptions)
+        self.bot.caches.unregister_owner("ODTracker")
+
+    async def fetch_kill_files(self, world: str, headers: Optional[dict] = None):
+        """Fetch map/kill_*.txt for a world.
+
+        The first file is requested with `headers`; when it answers 304, or its
+        body is identical to the previous fetch, the world has not been regenerated
+        and (None, None) is returned. Otherwise all files are parsed and returned
+        together with kill_att's Last-Modified.
+        """
         results = {}
+        last_modified = None
+        conditional = headers is not None
 
         for kill_type in KILL_TYPES:
             try:
-                url = f"https://{world}.tribalwars.nl/map/{kill_type}.txt"
-                response = requests.get(url)
-                if response.status_code == 200:
-                    for line in response.text.strip().splitlines():
-                        _, player_id, kills = line.split(',')
-                        player_id = int(player_id)
-                        kills = int(kills)
-                        if player_id not in results:
-                            results[player_id] = {}
-                        results[player_id][kill_type] = kills
+                url = world_url(world, f"map/{kill_type}.txt")
+                async with self.session.get(url, headers=headers or {}) as response:
+                    if response.status == 304:
+                        return None, None
+                    if response.status != 200:
+                        logger.warning(f"HTTP {response.status} fetching {kill_type} for {world}")
+                        continue
+                    body = await response.read()
+
+                if conditional:
+                    last_modified = parse_http_date(response.headers.get("Last-Modified"))
+                    fingerprint = hash(body)
+                    if self._kill_fingerprints.get(world) == fingerprint:
+                        return None, None
+                    self._kill_fingerprints[world] = fingerprint
+
+                pairs = unpack(await self.bot.cpu_pool.run("parse_kill_file", parse_kill_file, body))
+                for i in range(0, len(pairs), 2):
+                    results.setdefault(pairs[i], {})[kill_type] = pairs[i + 1]
             except Exception as e:
                 logger.warning(f"Error fetching {kill_type} for {world}: {e}")
+            finally:
+                # Only the first request is conditional; the others must be complete.
+                headers = None
+                conditional = False
+
+        return results, last_modified
+
+    async def initial_scan_world(self, world: str):
+        results, _ = await self.fetch_kill_files(world)
 
         if results:
+            await self.record_history(world, results)
             await self.update_od_database(world, results)
 
     @tasks.loop(hours=24)
     async def cleanup_odtracker(self):
         """Verwijder spelers uit odtracker_data_v2 die niet meer bestaan in player_data_v3."""
-        async with self.db.acquire() as conn:
-            rows = await conn.fetch("SELECT world FROM odtracker_configs_v2")
-            for row in rows:
-                world = row["world"]
-
-                try:
-                    player_ids = await conn.fetch("""
-                        SELECT player_id FROM player_data_v3
-                        WHERE world = $1
-                    """, world)
-                    existing_ids = {r["player_id"] for r in player_ids}
+        if not await self.bot.leases.acquire("od-cleanup", "*"):
+            return
 
-                    tracked_ids = await conn.fetch("""
-                        SELECT player_id FROM odtracker_data_v2
-                        WHERE world = $1
-                    """, world)
-                    current_ids = {r["player_id"] for r in tracked_ids}
-
-                    to_delete = current_ids - existing_ids
-                    if to_delete:
-                        await conn.execute("""
-                            DELETE FROM odtracker_data_v2
-                            WHERE world = $1 AND player_id = ANY($2::bigint[])
-                        """, world, list(to_delete))
-                        print(f"[ODTracker {world.upper()}] - Cleanup removed {len(to_delete)} players.")
-                    else:
-                        print(f"[ODTracker {world.upper()}] - Cleanup: nothing to remove.")
-                except Exception as e:
-                    logger.exception(f"Error during ODTracker cleanup for {world}: {e}")
-
-    @tasks.loop(minutes=5)
-    async def scan_od(self):
         rows = await self.db.fetch("SELECT world FROM odtracker_configs_v2")
         for row in rows:
-            world = row['world']
-
-            results = {}
-            for kill_type in KILL_TYPES:
-                try:
-                    url = f"https://{world}.tribalwars.nl/map/{kill_type}.txt"
-                    response = requests.get(url)
-                    if response.status_code == 200:
-                        for line in response.text.strip().splitlines():
-                            _, player_id, kills = line.split(',')
-                            player_id = int(player_id)
-                            kills = int(kills)
-                            if player_id not in results:
-                                results[player_id] = {}
-                            results[player_id][kill_type] = kills
-                except Exception as e:
-                    logger.warning(f"Error fetching {kill_type} for {world}: {e}")
+            world = row["world"]
 
+            try:
+                # The EXISTS guard keeps an empty player_data_v3 (mid-import) from wiping the world.
+                removed = await delete_in_batches(self.db, "odtracker_data_v2", """
+                    t.world = $1
+                    AND EXISTS (SELECT 1 FROM player_data_v3 p WHERE p.world = $1)
+                    AND NOT EXISTS (
+                        SELECT 1 FROM player_data_v3 p
+                        WHERE p.world = t.world AND p.player_id = t.player_id
+                    )
+                """, world)
+
+                if removed:
+                    print(f"[ODTracker {world.upper()}] - Cleanup removed {removed} players.")
+                else:
+                    print(f"[ODTracker {world.upper()}] - Cleanup: nothing to remove.")
+            except Exception as e:
+                logger.exception(f"Error during ODTracker cleanup for {world}: {e}")
+
+        try:
+            # Kill counts of worlds that no channel tracks anymore.
+            removed = await delete_in_batches(self.db, "odtracker_data_v2", """
+                NOT EXISTS (SELECT 1 FROM odtracker_configs_v2 c WHERE c.world = t.world)
+                AND NOT EXISTS (SELECT 1 FROM odtracker_enabled_tribes_v2 e WHERE e.world = t.world)
+            """)
+            if removed:
+                print(f"[ODTracker] - Cleanup removed {removed} rows of untracked worlds.")
+        except Exception as e:
+            logger.exception(f"Error during ODTracker untracked world cleanup: {e}")
+
+        try:
+            # The rollups keep the totals; raw gains are only needed for recent questions.
+            removed = await delete_in_batches(self.db, "odtracker_history_v1", """
+                t.scanned_at < NOW() - make_interval(days => $1)
+            """, HISTORY_RETENTION_DAYS)
+            removed += await delete_in_batches(self.db, "odtracker_rollup_players_v1", """
+                t.period = 'day' AND t.period_start < CURRENT_DATE - $1::int
+            """, HISTORY_RETENTION_DAYS)
+            if removed:
+                print(f"[ODTracker] - Cleanup removed {removed} old history rows.")
+        except Exception as e:
+            logger.exception(f"Error during ODTracker history cleanup: {e}")
+
+    @tasks.loop(seconds=30)
+    async def scan_od(self):
+        scheduler = self.bot.update_scheduler
+
+        for world in sorted(self.bot.subscriptions.worlds("odtracker_configs_v2")):
+            if not scheduler.is_due(world, "od"):
+                continue
+
+            try:
+                owned = await self.bot.leases.acquire("od", world)
+            except Exception as e:
+                logger.warning(f"Lease check for {world} failed: {e}")
+                continue
+
+            if not owned:
+                self._kill_fingerprints.pop(world, None)
+                continue
+
+            results, last_modified = await self.fetch_kill_files(
+                world, headers=scheduler.request_headers(world, "od")
+            )
+            if results is None:
+                scheduler.record(world, "od", changed=False)
+                continue
+
+            scheduler.record(world, "od", changed=bool(results), last_modified=last_modified)
+
+            await self.record_history(world, results)
             await self.update_od_database(world, results)
             print(f"[ODTracker {world.upper()}] - Scan completed.")
 
-    async def update_od_database(self, world, results):
-        async with self.db.acquire() as conn:
-            for player_id, data in results.items():
-                previous = await conn.fetchrow("""
-                    SELECT kill_att, kill_def, kill_sup, cooldown_att, cooldown_def, cooldown_sup
-                    FROM odtracker_data_v2
-                    WHERE world = $1 AND player_id = $2
-                """, world, player_id)
-
-                increases = {}
-                for key in KILL_TYPES:
-                    new_val = data.get(key, 0)
-                    old_val = previous[key] if previous and previous[key] is not None else 0
-                    if new_val > old_val:
-                        increases[key] = {
-                            "delta": new_val - old_val,
-                            "old": old_val,
-                            "new": new_val
-                        }
-
-                if not increases:
-                    continue
+    async def record_history(self, world, results):
+        """Store the gains of this scan and add them to the day/week rollups, all server-side.
+
+        A kill file that failed to download leaves its column NULL, which keeps the
+        previous total instead of resetting it. Players seen for the first time
+        only get a baseline.
+        """
+        records = [
+            (player_id, data.get("kill_att"), data.get("kill_def"), data.get("kill_sup"))
+            for player_id, data in results.items()
+        ]
+
+        try:
+            async with self.db.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute("""
+                        CREATE TEMP TABLE od_scan (
+                            player_id BIGINT NOT NULL,
+                            kill_att BIGINT,
+                            kill_def BIGINT,
+                            kill_sup BIGINT
+                        ) ON COMMIT DROP;
+                    """)
+                    await conn.copy_records_to_table("od_scan", records=records)
+
+                    await conn.execute("""
+                        CREATE TEMP TABLE od_gain ON COMMIT DROP AS
+                        SELECT s.player_id,
+                               COALESCE(p.tribe_id, 0) AS tribe_id,
+                               GREATEST(COALESCE(s.kill_att - l.kill_att, 0), 0) AS d_att,
+                               GREATEST(COALESCE(s.kill_def - l.kill_def, 0), 0) AS d_def,
+                               GREATEST(COALESCE(s.kill_sup - l.kill_sup, 0), 0) AS d_sup
+                        FROM od_scan s
+                        JOIN odtracker_latest_v1 l ON l.world = $1 AND l.player_id = s.player_id
+                        LEFT JOIN player_data_v3 p ON p.world = $1 AND p.player_id = s.player_id
+                        WHERE s.kill_att > l.kill_att OR s.kill_def > l.kill_def OR s.kill_sup > l.kill_sup;
+                    """, world)
 
-                now = datetime.utcnow()
+                    await conn.execute("""
+                        INSERT INTO odtracker_latest_v1 (world, player_id, kill_att, kill_def, kill_sup)
+                        SELECT $1, s.player_id,
+                               COALESCE(s.kill_att, l.kill_att, 0),
+                               COALESCE(s.kill_def, l.kill_def, 0),
+                               COALESCE(s.kill_sup, l.kill_sup, 0)
+                        FROM od_scan s
+                        LEFT JOIN odtracker_latest_v1 l ON l.world = $1 AND l.player_id = s.player_id
+                        WHERE l.player_id IS NULL
+                           OR (s.kill_att, s.kill_def, s.kill_sup) IS DISTINCT FROM (l.kill_att, l.kill_def, l.kill_sup)
+                        ON CONFLICT (world, player_id) DO UPDATE SET
+                            kill_att = EXCLUDED.kill_att,
+                            kill_def = EXCLUDED.kill_def,
+                            kill_sup = EXCLUDED.kill_sup;
+                    """, world)
 
-                updated_kills = {"kill_att": None, "kill_def": None, "kill_sup": None}
-                updated_cooldowns = {"cooldown_att": None, "cooldown_def": None, "cooldown_sup": None}
+                    await conn.execute("""
+                        INSERT INTO odtracker_history_v1 (world, player_id, scanned_at, tribe_id, d_att, d_def, d_sup)
+                        SELECT $1, player_id, NOW(), tribe_id, d_att, d_def, d_sup
+                        FROM od_gain;
+                    """, world)
 
-                for key in list(increases.keys()):
-                    cooldown_field = f"cooldown_{key.split('_')[1]}"
-                    last_ts = previous[cooldown_field] if previous and previous[cooldown_field] is not None else None
-                    if not last_ts or (now - last_ts).total_seconds() >= 3600:
-                        updated_kills[key] = data.get(key, 0)
-                        updated_cooldowns[cooldown_field] = now
-                    else:
-                        increases.pop(key, None)
+                    await conn.execute("""
+                        WITH periods AS (
+                            SELECT 'day' AS period, (NOW() AT TIME ZONE 'Europe/Amsterdam')::date AS period_start
+                            UNION ALL
+                            SELECT 'week', date_trunc('week', NOW() AT TIME ZONE 'Europe/Amsterdam')::date
+                        )
+                        INSERT INTO odtracker_rollup_players_v1 (world, period, period_start, tribe_id, player_id, att, def, sup)
+                        SELECT $1, p.period, p.period_start, g.tribe_id, g.player_id, g.d_att, g.d_def, g.d_sup
+                        FROM od_gain g CROSS JOIN periods p
+                        ON CONFLICT (world, period, period_start, tribe_id, player_id) DO UPDATE SET
+                            att = odtracker_rollup_players_v1.att + EXCLUDED.att,
+                            def = odtracker_rollup_players_v1.def + EXCLUDED.def,
+                            sup = odtracker_rollup_players_v1.sup + EXCLUDED.sup;
+                    """, world)
 
-                if not increases:
-                    continue
+                    await conn.execute("""
+                        WITH periods AS (
+                            SELECT 'day' AS period, (NOW() AT TIME ZONE 'Europe/Amsterdam')::date AS period_start
+                            UNION ALL
+                            SELECT 'week', date_trunc('week', NOW() AT TIME ZONE 'Europe/Amsterdam')::date
+                        )
+                        INSERT INTO odtracker_rollup_tribes_v1 (world, period, period_start, tribe_id, att, def, sup)
+                        SELECT $1, p.period, p.period_start, g.tribe_id, SUM(g.d_att), SUM(g.d_def), SUM(g.d_sup)
+                        FROM od_gain g CROSS JOIN periods p
+                        WHERE g.tribe_id <> 0
+                        GROUP BY p.period, p.period_start, g.tribe_id
+                        ON CONFLICT (world, period, period_start, tribe_id) DO UPDATE SET
+                            att = odtracker_rollup_tribes_v1.att + EXCLUDED.att,
+                            def = odtracker_rollup_tribes_v1.def + EXCLUDED.def,
+                            sup = odtracker_rollup_tribes_v1.sup + EXCLUDED.sup;
+                    """, world)
+        except Exception as e:
+            logger.exception(f"Error recording OD history for {world}: {e}")
 
-                await conn.execute("""
-                    INSERT INTO odtracker_data_v2 (
-                        world, player_id, kill_att, kill_def, kill_sup,
-                        cooldown_att, cooldown_def, cooldown_sup
-                    )
-                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                    ON CONFLICT (world, player_id) DO UPDATE SET
-                        kill_att = COALESCE(EXCLUDED.kill_att, odtracker_data_v2.kill_att),
-                        kill_def = COALESCE(EXCLUDED.kill_def, odtracker_data_v2.kill_def),
-                        kill_sup = COALESCE(EXCLUDED.kill_sup, odtracker_data_v2.kill_sup),
-                        cooldown_att = COALESCE(EXCLUDED.cooldown_att, odtracker_data_v2.cooldown_att),
-                        cooldown_def = COALESCE(EXCLUDED.cooldown_def, odtracker_data_v2.cooldown_def),
-                        cooldown_sup = COALESCE(EXCLUDED.cooldown_sup, odtracker_data_v2.cooldown_sup)
-                """, world, player_id,
-                     updated_kills["kill_att"], updated_kills["kill_def"], updated_kills["kill_sup"],
-                     updated_cooldowns["cooldown_att"], updated_cooldowns["cooldown_def"], updated_cooldowns["cooldown_sup"])
-
-                await self.notify_increase(conn, world, player_id, increases)
-
-    async def notify_increase(self, conn, world, player_id, increases):
+    async def update_od_database(self, world, results):
+        """Store the increases of one scan and queue their messages in the same transaction."""
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                events = []
+                for player_id, data in results.items():
+                    events.extend(await self.record_increase(conn, world, player_id, data))
+                await self.bot.events.append(events, conn)
+
+    async def record_increase(self, conn, world, player_id, data):
+        """Advance a player's kills and cooldowns; returns the OutboxEvents for what increased."""
+        previous = await conn.fetchrow("""
+            SELECT kill_att, kill_def, kill_sup, cooldown_att, cooldown_def, cooldown_sup
+            FROM odtracker_data_v2
+            WHERE world = $1 AND player_id = $2
+        """, world, player_id)
+
+        increases = {}
+        for key in KILL_TYPES:
+            new_val = data.get(key, 0)
+            old_val = previous[key] if previous and previous[key] is not None else 0
+            if new_val > old_val:
+                increases[key] = {
+                    "delta": new_val - old_val,
+                    "old": old_val,
+                    "new": new_val
+                }
+
+        if not increases:
+            return []
+
+        now = datetime.utcnow()
+
+        updated_kills = {"kill_att": None, "kill_def": None, "kill_sup": None}
+        updated_cooldowns = {"cooldown_att": None, "cooldown_def": None, "cooldown_sup": None}
+
+        for key in list(increases.keys()):
+            cooldown_field = f"cooldown_{key.split('_')[1]}"
+            last_ts = previous[cooldown_field] if previous and previous[cooldown_field] is not None else None
+            if not last_ts or (now - last_ts).total_seconds() >= 3600:
+                updated_kills[key] = data.get(key, 0)
+                updated_cooldowns[cooldown_field] = now
+            else:
+                increases.pop(key, None)
+
+        if not increases:
+            return []
+
+        await conn.execute("""
+            INSERT INTO odtracker_data_v2 (
+                world, player_id, kill_att, kill_def, kill_sup,
+                cooldown_att, cooldown_def, cooldown_sup
+            )
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+            ON CONFLICT (world, player_id) DO UPDATE SET
+                kill_att = COALESCE(EXCLUDED.kill_att, odtracker_data_v2.kill_att),
+                kill_def = COALESCE(EXCLUDED.kill_def, odtracker_data_v2.kill_def),
+                kill_sup = COALESCE(EXCLUDED.kill_sup, odtracker_data_v2.kill_sup),
+                cooldown_att = COALESCE(EXCLUDED.cooldown_att, odtracker_data_v2.cooldown_att),
+                cooldown_def = COALESCE(EXCLUDED.cooldown_def, odtracker_data_v2.cooldown_def),
+                cooldown_sup = COALESCE(EXCLUDED.cooldown_sup, odtracker_data_v2.cooldown_sup)
+        """, world, player_id,
+             updated_kills["kill_att"], updated_kills["kill_def"], updated_kills["kill_sup"],
+             updated_cooldowns["cooldown_att"], updated_cooldowns["cooldown_def"], updated_cooldowns["cooldown_sup"])
+
+        return await self.increase_events(conn, world, player_id, increases)
+
+    async def increase_events(self, conn, world, player_id, increases):
         player = await conn.fetchrow("""
             SELECT name, tribe_id FROM player_data_v3
             WHERE world = $1 AND player_id = $2
         """, world, player_id)
         if not player:
-            return
-            
+            return []
+
         player_link = f"[{player['name']}](https://{world}.tribalwars.nl/game.php?screen=info_player&id={player_id})"
 
         tribe = await conn.fetchrow("""
@@ -216,17 +472,13 @@ class ODTracker(commands.Cog):
         """, world, player['tribe_id'])
         tribe_tag = tribe['tag'] if tribe else None
 
-        channels = await conn.fetch("""
-            SELECT channel_id, min_threshold
-            FROM odtracker_enabled_tribes_v2
-            WHERE world = $1 AND (tribe_tag = $2 OR tribe_tag = 'alltribes')
-        """, world, tribe_tag)
+        channels = [
+            row for row in self.bot.subscriptions.rows("odtracker_enabled_tribes_v2", world)
+            if row["tribe_tag"] in (tribe_tag, "alltribes")
+        ]
 
+        events = []
         for row in channels:
-            channel = self.bot.get_channel(row['channel_id'])
-            if not channel:
-                continue
-
             channel_min = row["min_threshold"]
 
             for key, data in increases.items():
@@ -251,26 +503,96 @@ class ODTracker(commands.Cog):
                 embed.add_field(name="Nieuwe score", value=f"```{new_val:,}```".replace(",", "."), inline=True)
                 embed.set_thumbnail(url="https://dsnl.innogamescdn.com/asset/415a0ab7/graphic/awards/progress/kills.png")
 
-                now_ts = datetime.utcnow().timestamp()
-                last_ts = self._last_channel_send.get(channel.id)
-                if last_ts is not None:
-                    diff = now_ts - last_ts
-                    if diff < 1.0:
-                        await asyncio.sleep(1.0 - diff)
-
-                self._last_channel_send[channel.id] = datetime.utcnow().timestamp()
-                try:
-                    await channel.send(embed=embed)
-                except discord.Forbidden:
-                    logger.warning(
-                        f"[ODTracker] Geen toegang tot kanaal {channel.id} in guild {channel.guild.id} (Forbidden). Bericht niet verstuurd."
-                    )
-                    continue
-                except discord.HTTPException as e:
-                    logger.warning(
-                        f"[ODTracker] HTTPException bij versturen naar kanaal {channel.id}: {e}"
-                    )
-                    continue
+                # A retried scan queues the same increase again; the key keeps it to one message.
+                events.append(OutboxEvent(
+                    row['channel_id'], embed, "od",
+                    dedup_key=f"od:{world}:{player_id}:{key}:{new_val}:{row['channel_id']}"
+                ))
+
+        return events
+
+    @app_commands.command(name="od-top", description="Toon de grootste OD-stijgers van vandaag of deze week.")
+    @app_commands.describe(
+        wereld="Selecteer de wereld",
+        type="Soort OD",
+        periode="Vandaag of deze week",
+        stam="Tag van de stam (leeg = stammen-ranking)"
+    )
+    @app_commands.choices(
+        type=[app_commands.Choice(name=label, value=key) for key, label in OD_TOP_TYPES.items()],
+        periode=[
+            app_commands.Choice(name="Vandaag", value="day"),
+            app_commands.Choice(name="Deze week", value="week"),
+        ]
+    )
+    async def od_top(
+        self,
+        interaction: discord.Interaction,
+        wereld: str,
+        type: app_commands.Choice[str],
+        periode: app_commands.Choice[str],
+        stam: Optional[str] = None
+    ):
+        """Answer from the day/week rollups; never touches the history table."""
+        column = "(r.att + r.def + r.sup)" if type.value == "totaal" else f"r.{type.value}"
+        period_start_sql = (
+            "(NOW() AT TIME ZONE 'Europe/Amsterdam')::date"
+            if periode.value == "day"
+            else "date_trunc('week', NOW() AT TIME ZONE 'Europe/Amsterdam')::date"
+        )
+
+        if stam:
+            tribe_id = await self.db.fetchval(
+                "SELECT tribe_id FROM ally_data_v3 WHERE world = $1 AND LOWER(tag) = LOWER($2);",
+                wereld, stam
+            )
+            if tribe_id is None:
+                await interaction.response.send_message(f"Stam `{stam}` niet gevonden op `{wereld}`.", ephemeral=True)
+                return
+
+            rows = await self.db.fetch(f"""
+                SELECT r.player_id AS id, COALESCE(p.name, r.player_id::text) AS name, {column} AS gain
+                FROM odtracker_rollup_players_v1 r
+                LEFT JOIN player_data_v3 p ON p.world = r.world AND p.player_id = r.player_id
+                WHERE r.world = $1 AND r.period = $2 AND r.period_start = {period_start_sql} AND r.tribe_id = $3
+                  AND {column} > 0
+                ORDER BY gain DESC
+                LIMIT 15;
+            """, wereld, periode.value, tribe_id)
+            title = f"Top {type.name} {stam} - {periode.name.lower()}"
+            link = "info_player"
+        else:
+            rows = await self.db.fetch(f"""
+                SELECT r.tribe_id AS id, COALESCE(a.tag, r.tribe_id::text) AS name, {column} AS gain
+                FROM odtracker_rollup_tribes_v1 r
+                LEFT JOIN ally_data_v3 a ON a.world = r.world AND a.tribe_id = r.tribe_id
+                WHERE r.world = $1 AND r.period = $2 AND r.period_start = {period_start_sql}
+                  AND {column} > 0
+                ORDER BY gain DESC
+                LIMIT 15;
+            """, wereld, periode.value)
+            title = f"Top {type.name} stammen - {periode.name.lower()}"
+            link = "info_ally"
+
+        if rows:
+            description = "\n".join(
+                f"**{i}.** [{r['name']}](https://{wereld}.tribalwars.nl/game.php?screen={link}&id={r['id']}) "
+                + f"+{r['gain']:,}".replace(",", ".")
+                for i, r in enumerate(rows, start=1)
+            )
+        else:
+            description = "*Nog geen OD-stijgingen in deze periode.*"
+
+        embed = create_embed(title=title, description=description)
+        embed.set_thumbnail(url="https://dsnl.innogamescdn.com/asset/415a0ab7/graphic/awards/progress/kills.png")
+        await interaction.response.send_message(embed=embed)
+
+    @od_top.autocomplete("wereld")
+    async def od_top_wereld_autocomplete(self, interaction: discord.Interaction, current: str):
+        return [
+            app_commands.Choice(name=w, value=w)
+            for w in self.bot.world_registry.matching(current, OD_TRACKED)
+        ]
 
     @scan_od.before_loop
     async def before_scan_od(self):
@@ -281,8 +603,7 @@ class ODTracker(commands.Cog):
         if self.loop_initialized:
             return
 
-        rows = await self.db.fetch("SELECT world FROM odtracker_configs_v2")
-        if rows and not self.scan_od.is_running():
+        if self.bot.subscriptions.worlds("odtracker_configs_v2") and not self.scan_od.is_running():
             self.scan_od.start()
             print("[ODTracker] Background scan loop started.")
 
@@ -293,6 +614,4 @@ class ODTracker(commands.Cog):
 
 
 async def setup(bot):
-    cog = ODTracker(bot)
-    await cog.cog_load()
-    await bot.add_cog(cog)
+    await bot.add_cog(ODTracker(bot))
@@ -6,6 +6,8 @@ import logging
 from typing import List, Tuple, Optional
 
 from main import create_embed
+from building_rules import RULES
+from world_registry import VILLAGE_DATA
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -30,22 +32,15 @@ class ToggleTrackers(commands.Cog):
     # ---------------------- Config ---------------------- #
 
     def _get_tracker_configs(self) -> dict:
-        return {
-            "academy": {
-                "label": "Adelshoeve",
-                "table": "academytracker_channels_v2",
-                "cog_name": "AcademyTracker",
-            },
-            "wall": {
-                "label": "Muur",
-                "table": "walltracker_channels_maps_v2",
-                "cog_name": "WallTracker",
-            },
-            "tower": {
-                "label": "Uitkijktoren",
-                "table": "towertracker_channels_v2",
-                "cog_name": "TowerTracker",
-            },
+        configs = {
+            rule.tracker: {
+                "label": rule.label,
+                "table": rule.table,
+                "cog_name": "BuildingTracker",
+            }
+            for rule in RULES
+        }
+        configs.update({
             "conquer": {
                 "label": "Veroveringen",
                 "table": "conquer_settings_v2",
@@ -56,7 +51,8 @@ class ToggleTrackers(commands.Cog):
                 "table": "odtracker_enabled_tribes_v2",
                 "cog_name": "ODTracker",
             },
-        }
+        })
+        return configs
 
     def _get_tracker_cog(self, tracker_id: str):
         cfg = self._get_tracker_configs()[tracker_id]
@@ -68,26 +64,13 @@ class ToggleTrackers(commands.Cog):
             return label.upper()
         return label.lower()
 
-    # ---------------------- Worlds (villagedata_worlds) ---------------------- #
+    # ---------------------- Worlds (world registry) ---------------------- #
 
-    async def _fetch_worlds_from_villagedata(self) -> List[str]:
-        rows = await self.db.fetch(
-            """
-            SELECT world
-            FROM villagedata_worlds
-            ORDER BY world;
-            """
-        )
-        worlds = [r["world"] for r in rows if r.get("world")]
-        worlds = [w for w in worlds if isinstance(w, str) and w.startswith("nl")]
-        return sorted(set(worlds))
+    def _fetch_worlds_from_villagedata(self) -> List[str]:
+        return [w for w in self.bot.world_registry.all(VILLAGE_DATA) if w.startswith("nl")]
 
-    async def _world_is_enabled_villagedata(self, world: str) -> bool:
-        exists = await self.db.fetchval(
-            "SELECT 1 FROM villagedata_worlds WHERE world = $1;",
-            world
-        )
-        return bool(exists)
+    def _world_is_enabled_villagedata(self, world: str) -> bool:
+        return self.bot.world_registry.has(world, VILLAGE_DATA)
 
     # ---------------------- Simple trackers DB helpers ---------------------- #
 
@@ -151,13 +134,6 @@ class ToggleTrackers(commands.Cog):
             guild_id, channel_id, world
         )
 
-        tracker_cog = self._get_tracker_cog(tracker_id)
-        if tracker_cog is not None and hasattr(tracker_cog, "tracked_worlds"):
-            try:
-                tracker_cog.tracked_worlds.add(world)
-            except Exception:
-                pass
-
     async def _disable_tracker_in_channel_simple(
         self,
         tracker_id: str,
@@ -176,24 +152,6 @@ class ToggleTrackers(commands.Cog):
             guild_id, channel_id, world
         )
 
-        still_exists = await self.db.fetchval(
-            f"""
-            SELECT 1
-            FROM {table}
-            WHERE world = $1
-            LIMIT 1;
-            """,
-            world
-        )
-
-        if not still_exists:
-            tracker_cog = self._get_tracker_cog(tracker_id)
-            if tracker_cog is not None and hasattr(tracker_cog, "tracked_worlds"):
-                try:
-                    tracker_cog.tracked_worlds.discard(world)
-                except Exception:
-                    pass
-
     # ---------------------- Conquer helpers ---------------------- #
 
     async def _conquer_world_is_enabled(self, world: str) -> bool:
@@ -274,14 +232,6 @@ class ToggleTrackers(commands.Cog):
             guild_id, channel_id, world, tribe_id
         )
 
-        conquer_cog = self._get_tracker_cog("conquer")
-        if conquer_cog is not None and hasattr(conquer_cog, "check_conquers"):
-            try:
-                if not conquer_cog.check_conquers.is_running():
-                    conquer_cog.check_conquers.start()
-            except Exception:
-                pass
-
     async def _conquer_disable(self, guild_id: int, channel_id: int, world: str, tribe_id: int) -> None:
         await self.db.execute(
             """
@@ -291,16 +241,6 @@ class ToggleTrackers(commands.Cog):
             guild_id, channel_id, world, tribe_id
         )
 
-        still_any = await self.db.fetchval("SELECT 1 FROM conquer_settings_v2 LIMIT 1;")
-        if not still_any:
-            conquer_cog = self._get_tracker_cog("conquer")
-            if conquer_cog is not None and hasattr(conquer_cog, "check_conquers"):
-                try:
-                    if conquer_cog.check_conquers.is_running():
-                        conquer_cog.check_conquers.cancel()
-                except Exception:
-                    pass
-
     # ---------------------- OD helpers ---------------------- #
 
     async def _od_fetch_tags_for_world(self, world: str, search: str = "") -> List[str]:
@@ -389,15 +329,6 @@ class ToggleTrackers(commands.Cog):
             guild_id, channel_id, world, tribe_tag, int(min_threshold)
         )
 
-        if od_cog is not None:
-            try:
-                if hasattr(od_cog, "scan_od") and not od_cog.scan_od.is_running():
-                    od_cog.scan_od.start()
-                if hasattr(od_cog, "cleanup_odtracker") and not od_cog.cleanup_odtracker.is_running():
-                    od_cog.cleanup_odtracker.start()
-            except Exception:
-                logger.exception("[ToggleTrackers] OD loops start failed")
-
     async def _od_disable(self, guild_id: int, channel_id: int, world: str, tribe_tag: str) -> None:
         await self.db.execute(
             """
@@ -423,20 +354,6 @@ class ToggleTrackers(commands.Cog):
                 world
             )
 
-        still_any = await self.db.fetchval(
-            "SELECT 1 FROM odtracker_enabled_tribes_v2 LIMIT 1;"
-        )
-        if not still_any:
-            od_cog = self._get_tracker_cog("od")
-            if od_cog is not None:
-                try:
-                    if hasattr(od_cog, "scan_od") and od_cog.scan_od.is_running():
-                        od_cog.scan_od.cancel()
-                    if hasattr(od_cog, "cleanup_odtracker") and od_cog.cleanup_odtracker.is_running():
-                        od_cog.cleanup_odtracker.cancel()
-                except Exception:
-                    logger.exception("[ToggleTrackers] OD loops stop failed")
-
     # ---------------------- Slash command ---------------------- #
 
     @app_commands.command(
@@ -503,11 +420,8 @@ class TrackerSelectView(BaseView):
 
         cfg = self.cog._get_tracker_configs()
 
-        self.add_item(TrackerButton(tracker_id="academy", label=cfg["academy"]["label"], style=discord.ButtonStyle.primary))
-        self.add_item(TrackerButton(tracker_id="wall", label=cfg["wall"]["label"], style=discord.ButtonStyle.primary))
-        self.add_item(TrackerButton(tracker_id="tower", label=cfg["tower"]["label"], style=discord.ButtonStyle.primary))
-        self.add_item(TrackerButton(tracker_id="conquer", label=cfg["conquer"]["label"], style=discord.ButtonStyle.primary))
-        self.add_item(TrackerButton(tracker_id="od", label=cfg["od"]["label"], style=discord.ButtonStyle.primary))
+        for tracker_id, tracker_cfg in cfg.items():
+            self.add_item(TrackerButton(tracker_id=tracker_id, label=tracker_cfg["label"], style=discord.ButtonStyle.primary))
 
         self.add_back_button()
 
@@ -548,7 +462,7 @@ class ChooseOnButton(discord.ui.Button):
         cog = view.cog
         tracker_cfg = cog._get_tracker_configs()[view.tracker_id]
 
-        worlds = await cog._fetch_worlds_from_villagedata()
+        worlds = cog._fetch_worlds_from_villagedata()
         if not worlds:
             embed = create_embed(title="Tracker aanpassen", description="Er zijn geen geactiveerde werelden gevonden.")
             end_view = EndView(cog=cog, user_id=interaction.user.id)
@@ -770,7 +684,7 @@ class WorldActionButton(discord.ui.Button):
 
         # Simple trackers
         if view.mode == "on":
-            world_ok = await cog._world_is_enabled_villagedata(self.world)
+            world_ok = cog._world_is_enabled_villagedata(self.world)
             if not world_ok:
                 embed = create_embed(
                     title=title,
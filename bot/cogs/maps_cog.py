@@ -4,6 +4,10 @@ from discord import app_commands
 import aiohttp
 from typing import List, Literal
 from io import BytesIO 
+from urllib.parse import quote
+from fuzzy_index import PLAYER, TRIBE
+from world_registry import MAP_API
+from upstream import map_api_url
 import logging
 
 
@@ -13,23 +17,7 @@ logger = logging.getLogger(__name__)
 class MapCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.bot.worlds = []
-
-    async def fetch_worlds(self):
-        """Fetch available worlds from the API and populate self.bot.worlds."""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get('https://dkspeed2.jrsoft.tech/api/worlds') as response:
-                    if response.status == 200:
-                        self.bot.worlds = await response.json()
-                    else:
-                        logger.error(f"Failed to fetch worlds. Status: {response.status}")
-        except Exception as e:
-            logger.error(f"Error fetching worlds: {e}")
-
-    async def cog_load(self):
-        """Run tasks when the cog is loaded."""
-        await self.fetch_worlds()
+        self.worlds = bot.world_registry
 
     @app_commands.command(name="map", description="Generate a map for a specified world and type.")
     @app_commands.describe(
@@ -49,11 +37,11 @@ class MapCog(commands.Cog):
     ):
         await interaction.response.defer()
 
-        if world not in self.bot.worlds:
-            await interaction.followup.send(f"Invalid world. Available worlds: {', '.join(self.bot.worlds)}", ephemeral=True)
+        if not self.worlds.has(world, MAP_API):
+            await interaction.followup.send(f"Invalid world. Available worlds: {', '.join(self.worlds.all(MAP_API))}", ephemeral=True)
             return
 
-        api_url = f"https://dkspeed2.jrsoft.tech/map2/{world}/{type}"
+        api_url = map_api_url(f"map2/{world}/{type}")
         logger.info(f"Calling API URL: {api_url}")
 
         try:
@@ -84,15 +72,33 @@ class MapCog(commands.Cog):
     ):
         await interaction.response.defer()
 
-        if world not in self.bot.worlds:
-            await interaction.followup.send(f"Invalid world. Available worlds: {', '.join(self.bot.worlds)}", ephemeral=True)
+        if not self.worlds.has(world, MAP_API):
+            await interaction.followup.send(f"Invalid world. Available worlds: {', '.join(self.worlds.all(MAP_API))}", ephemeral=True)
             return
 
+        # Resolve names against the world's name index so typos never reach the map API.
+        kind = TRIBE if "ally" in type else PLAYER
+        requested = [name.strip() for name in names.split(",") if name.strip()]
+        index = await self.bot.names.get(world)
+        if index.tree.size:
+            resolved, unknown = [], []
+            for name in requested:
+                match = index.resolve(name, kind)
+                if match:
+                    resolved.append(match[1])
+                    continue
+                suggestions = ", ".join(f"`{s.display}`" for s in index.suggest(name, kind))
+                unknown.append(f"`{name}` not found." + (f" Did you mean: {suggestions}?" if suggestions else ""))
+            if unknown:
+                await interaction.followup.send("\n".join(unknown), ephemeral=True)
+                return
+            requested = resolved
+
         # Format names as query parameters
         param_key = "allies[]" if "ally" in type else "players[]"
-        query_params = "&".join([f"{param_key}={name.strip()}" for name in names.split(",")])
+        query_params = "&".join([f"{param_key}={quote(name)}" for name in requested])
 
-        api_url = f"https://dkspeed2.jrsoft.tech/map2/{world}/{type}?{query_params}"
+        api_url = map_api_url(f"map2/{world}/{type}?{query_params}")
         logger.info(f"Calling API URL: {api_url}")
 
         try:
@@ -118,15 +124,11 @@ class MapCog(commands.Cog):
         """Autocomplete for the 'world' parameter."""
         try:
             logger.debug(f"Autocomplete triggered with input: '{current}'")
-            
-            if not self.bot.worlds:
-                logger.warning("Autocomplete called but no worlds are available.")
-                await self.fetch_worlds()
 
             filtered_worlds = [
                 app_commands.Choice(name=world, value=world)
-                for world in self.bot.worlds if current.lower() in world.lower()
-            ][:25]
+                for world in self.worlds.matching(current, MAP_API)
+            ]
             
             return filtered_worlds
         except Exception as e:
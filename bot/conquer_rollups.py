@@ -0,0 +1,185 @@
+import logging
+from datetime import date
+from typing import Optional
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+# Per conquer: the new tribe gains (or, within its own tribe, counts an internal),
+# the old tribe loses. Barbarian villages have old_owner_id 0; players without a
+# tribe have tribe id 0 or NULL and get no rollup row.
+TRIBE_ROLLUP_SQL = """
+    INSERT INTO conquer_rollup_tribes_v1 AS r (
+        world, tribe_id, day, gains, losses, barbs, internals, points_gained, points_lost
+    )
+    SELECT world, tribe_id, day,
+           SUM(gains), SUM(losses), SUM(barbs), SUM(internals), SUM(points_gained), SUM(points_lost)
+    FROM (
+        SELECT c.world,
+               c.new_tribe AS tribe_id,
+               c.day,
+               (c.new_tribe <> c.old_tribe)::int AS gains,
+               0 AS losses,
+               (c.new_tribe <> c.old_tribe AND c.old_owner_id = 0)::int AS barbs,
+               (c.new_tribe = c.old_tribe)::int AS internals,
+               CASE WHEN c.new_tribe <> c.old_tribe THEN c.points ELSE 0 END AS points_gained,
+               0 AS points_lost
+        FROM conquers c
+        WHERE c.new_tribe <> 0
+        UNION ALL
+        SELECT c.world, c.old_tribe, c.day, 0, 1, 0, 0, 0, c.points
+        FROM conquers c
+        WHERE c.old_tribe <> 0 AND c.old_tribe <> c.new_tribe
+    ) x
+    GROUP BY world, tribe_id, day
+    ON CONFLICT (world, tribe_id, day) DO UPDATE SET
+        gains = r.gains + EXCLUDED.gains,
+        losses = r.losses + EXCLUDED.losses,
+        barbs = r.barbs + EXCLUDED.barbs,
+        internals = r.internals + EXCLUDED.internals,
+        points_gained = r.points_gained + EXCLUDED.points_gained,
+        points_lost = r.points_lost + EXCLUDED.points_lost;
+"""
+
+PAIR_ROLLUP_SQL = """
+    INSERT INTO conquer_rollup_pairs_v1 AS r (world, day, winner_tribe_id, loser_tribe_id, conquers, points)
+    SELECT c.world, c.day, c.new_tribe, c.old_tribe, COUNT(*), SUM(c.points)
+    FROM conquers c
+    WHERE c.new_tribe <> 0 AND c.old_tribe <> 0 AND c.new_tribe <> c.old_tribe
+    GROUP BY c.world, c.day, c.new_tribe, c.old_tribe
+    ON CONFLICT (world, day, winner_tribe_id, loser_tribe_id) DO UPDATE SET
+        conquers = r.conquers + EXCLUDED.conquers,
+        points = r.points + EXCLUDED.points;
+"""
+
+
+def _with_conquers(source: str, sql: str) -> str:
+    """Prefix `sql` with a `conquers` CTE that normalises the rows of `source`."""
+    return f"""
+        WITH conquers AS (
+            SELECT world,
+                   (to_timestamp(unix_timestamp) AT TIME ZONE 'Europe/Amsterdam')::date AS day,
+                   COALESCE(new_owner_tribe_id, 0) AS new_tribe,
+                   COALESCE(old_owner_tribe_id, 0) AS old_tribe,
+                   old_owner_id,
+                   points
+            FROM {source}
+        )
+        {sql}
+    """
+
+
+async def install_conquer_rollups(pool: asyncpg.Pool) -> None:
+    """Maintain per-(world, tribe, day) and per-(world, day, winner, loser) conquer counters.
+
+    A statement-level trigger on conquer_data_v2 folds every inserted batch into
+    the rollups inside the inserting transaction, so stats never need to scan
+    conquer_data_v2. Existing history is folded in once when the rollups are new.
+    """
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext('conquer_rollup_v1'));")
+
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS conquer_rollup_tribes_v1 (
+                    world TEXT NOT NULL,
+                    tribe_id BIGINT NOT NULL,
+                    day DATE NOT NULL,
+                    gains INT NOT NULL DEFAULT 0,
+                    losses INT NOT NULL DEFAULT 0,
+                    barbs INT NOT NULL DEFAULT 0,
+                    internals INT NOT NULL DEFAULT 0,
+                    points_gained BIGINT NOT NULL DEFAULT 0,
+                    points_lost BIGINT NOT NULL DEFAULT 0,
+                    PRIMARY KEY (world, tribe_id, day)
+                );
+            """)
+
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS conquer_rollup_pairs_v1 (
+                    world TEXT NOT NULL,
+                    day DATE NOT NULL,
+                    winner_tribe_id BIGINT NOT NULL,
+                    loser_tribe_id BIGINT NOT NULL,
+                    conquers INT NOT NULL DEFAULT 0,
+                    points BIGINT NOT NULL DEFAULT 0,
+                    PRIMARY KEY (world, day, winner_tribe_id, loser_tribe_id)
+                );
+            """)
+
+            await conn.execute("""
+                CREATE INDEX IF NOT EXISTS conquer_rollup_pairs_v1_tribes
+                ON conquer_rollup_pairs_v1 (world, winner_tribe_id, loser_tribe_id, day);
+            """)
+
+            await conn.execute(f"""
+                CREATE OR REPLACE FUNCTION conquer_rollup_v1() RETURNS trigger AS $$
+                BEGIN
+                    {_with_conquers("new_rows", TRIBE_ROLLUP_SQL)}
+                    {_with_conquers("new_rows", PAIR_ROLLUP_SQL)}
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+            """)
+
+            exists = await conn.fetchval(
+                "SELECT 1 FROM pg_trigger WHERE tgname = 'conquer_data_v2_rollup' AND tgrelid = 'conquer_data_v2'::regclass;"
+            )
+            if exists:
+                return
+
+            await conn.execute("""
+                CREATE TRIGGER conquer_data_v2_rollup
+                AFTER INSERT ON conquer_data_v2
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION conquer_rollup_v1();
+            """)
+
+            # The trigger and the backfill share this transaction, so no conquer is counted twice.
+            await conn.execute("LOCK TABLE conquer_data_v2 IN SHARE MODE;")
+            await conn.execute("TRUNCATE conquer_rollup_tribes_v1, conquer_rollup_pairs_v1;")
+            await conn.execute(_with_conquers("conquer_data_v2", TRIBE_ROLLUP_SQL))
+            await conn.execute(_with_conquers("conquer_data_v2", PAIR_ROLLUP_SQL))
+            logger.info("[ConquerRollups] Trigger installed and history folded in")
+
+
+async def tribe_stats(
+    pool: asyncpg.Pool,
+    world: str,
+    tribe_id: int,
+    since: date,
+    until: Optional[date] = None
+) -> Optional[asyncpg.Record]:
+    """Summed counters of one tribe over [since, until]; reads at most one row per day."""
+    return await pool.fetchrow("""
+        SELECT COALESCE(SUM(gains), 0) AS gains,
+               COALESCE(SUM(losses), 0) AS losses,
+               COALESCE(SUM(barbs), 0) AS barbs,
+               COALESCE(SUM(internals), 0) AS internals,
+               COALESCE(SUM(points_gained), 0) AS points_gained,
+               COALESCE(SUM(points_lost), 0) AS points_lost
+        FROM conquer_rollup_tribes_v1
+        WHERE world = $1 AND tribe_id = $2 AND day >= $3 AND ($4::date IS NULL OR day <= $4);
+    """, world, tribe_id, since, until)
+
+
+async def war_summary(
+    pool: asyncpg.Pool,
+    world: str,
+    tribe_a: int,
+    tribe_b: int,
+    since: date,
+    until: Optional[date] = None
+) -> asyncpg.Record:
+    """Conquers and points taken by A from B and by B from A over [since, until]."""
+    return await pool.fetchrow("""
+        SELECT COALESCE(SUM(conquers) FILTER (WHERE winner_tribe_id = $2), 0) AS a_conquers,
+               COALESCE(SUM(points) FILTER (WHERE winner_tribe_id = $2), 0) AS a_points,
+               COALESCE(SUM(conquers) FILTER (WHERE winner_tribe_id = $3), 0) AS b_conquers,
+               COALESCE(SUM(points) FILTER (WHERE winner_tribe_id = $3), 0) AS b_points
+        FROM conquer_rollup_pairs_v1
+        WHERE world = $1
+          AND ((winner_tribe_id = $2 AND loser_tribe_id = $3) OR (winner_tribe_id = $3 AND loser_tribe_id = $2))
+          AND day >= $4 AND ($5::date IS NULL OR day <= $5);
+    """, world, tribe_a, tribe_b, since, until)
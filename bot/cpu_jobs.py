@@ -0,0 +1,71 @@
+"""CPU-bound jobs run in the CpuPool worker processes.
+
+Jobs are top-level functions so they pickle by reference, and they exchange
+packed int64 arrays as bytes instead of lists of tuples.
+"""
+import gzip
+from array import array
+
+
+def pack(values) -> bytes:
+    return array("q", values).tobytes()
+
+
+def unpack(data: bytes) -> array:
+    values = array("q")
+    values.frombytes(data)
+    return values
+
+
+def parse_kill_file(body: bytes) -> bytes:
+    """Parse a map/kill_*.txt body (`rank,player_id,kills` lines) into packed (player_id, kills) pairs."""
+    pairs = array("q")
+    for line in body.split():
+        _, player_id, kills = line.split(b",")
+        pairs.append(int(player_id))
+        pairs.append(int(kills))
+    return pairs.tobytes()
+
+
+def parse_conquer_file(body: bytes, since: int) -> bytes:
+    """Parse map/conquer.txt(.gz) into packed (village_id, unix_timestamp, new_owner, old_owner) rows from `since` on."""
+    if body[:2] == b"\x1f\x8b":
+        body = gzip.decompress(body)
+
+    rows = array("q")
+    for line in body.split():
+        fields = line.split(b",", 4)
+        if len(fields) < 4:
+            continue
+        try:
+            village_id, unix_timestamp, new_owner, old_owner = (int(f) for f in fields[:4])
+        except ValueError:
+            continue
+        if unix_timestamp >= since:
+            rows.extend((village_id, unix_timestamp, new_owner, old_owner))
+    return rows.tobytes()
+
+
+def match_rules(prev_ids: bytes, prev_points: bytes, ids: bytes, points: bytes, signatures: bytes) -> bytes:
+    """Match every building rule against one snapshot diff in a single pass.
+
+    `signatures` comes from building_rules.pack_signatures. Returns packed
+    (index, previous_points, rule_index, level) rows, `index` pointing into the
+    current snapshot and level -1 when the rule has none.
+    """
+    sig = unpack(signatures)
+    by_delta = {}
+    for i in range(0, len(sig), 5):
+        by_delta.setdefault(sig[i + 1], []).append((sig[i], sig[i + 2], sig[i + 3], sig[i + 4]))
+
+    previous = dict(zip(unpack(prev_ids), unpack(prev_points)))
+    matches = array("q")
+    for index, (village_id, current) in enumerate(zip(unpack(ids), unpack(points))):
+        before = previous.get(village_id)
+        if before is None or before == current:
+            continue
+        for rule_index, min_points, max_points, level in by_delta.get(current - before, ()):
+            if current < min_points or (max_points >= 0 and current > max_points):
+                continue
+            matches.extend((index, before, rule_index, level))
+    return matches.tobytes()
@@ -0,0 +1,58 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CpuPool:
+    """Shared ProcessPoolExecutor for CPU-bound parsing and diffing.
+
+    Jobs live in cpu_jobs and take/return bytes (packed arrays), so pickling a
+    60k-village snapshot costs a memcpy instead of a tuple-per-row walk. Queue
+    depth and per-job latency are recorded in `metrics`.
+    """
+
+    def __init__(self, metrics: Metrics, max_workers: Optional[int] = None):
+        self.metrics = metrics
+        self.max_workers = max_workers or int(os.getenv("CPU_POOL_WORKERS", "2"))
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+
+        self.metrics.set_gauge("cpu_pool.queue_depth", lambda: self.pending)
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            # spawn: forking a process that already runs an event loop and
+            # resolver threads is not safe.
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self.executor
+
+    async def run(self, name: str, func: Callable[..., Any], *args: Any) -> Any:
+        executor = self._ensure_executor()
+        loop = asyncio.get_running_loop()
+
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except Exception:
+            self.metrics.inc(f"cpu_pool.{name}.errors")
+            raise
+        finally:
+            self.pending -= 1
+            self.metrics.histogram(f"cpu_pool.{name}").observe(time.perf_counter() - started)
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+
+async def delete_in_batches(
+    pool: asyncpg.Pool,
+    table: str,
+    where: str,
+    *args,
+    batch_size: int = 5000,
+    lock_timeout: str = "2s",
+    pause: float = 0.1
+) -> int:
+    """Delete rows of `table` (aliased `t` in `where`) in ctid batches; returns the number deleted.
+
+    Every batch is its own short transaction with a bounded lock_timeout, so a
+    cleanup never holds row locks for long or queues behind the ingestion job.
+    A batch that cannot get its locks in time ends the run; the next run
+    continues where this one stopped.
+    """
+    total = 0
+    while True:
+        try:
+            async with pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute(f"SET LOCAL lock_timeout = '{lock_timeout}';")
+                    status = await conn.execute(f"""
+                        DELETE FROM {table}
+                        WHERE ctid = ANY(ARRAY(
+                            SELECT t.ctid
+                            FROM {table} t
+                            WHERE {where}
+                            LIMIT {batch_size}
+                        ));
+                    """, *args)
+        except asyncpg.LockNotAvailableError:
+            logger.warning(f"[Cleanup] Lock timeout while cleaning {table}, stopping after {total} rows")
+            return total
+
+        deleted = int(status.split()[-1])
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+        await asyncio.sleep(pause)
@@ -0,0 +1,279 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import asyncpg
+import discord
+
+from rest_budget import lane_for_source
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL = "tracker_events_v1"
+
+# Minimum seconds between two messages of the same source in one channel.
+SEND_SPACING: Dict[str, float] = {
+    "od": 1.0,
+}
+
+MAX_ATTEMPTS = 8
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 3600
+# A claimed batch is not due for anyone else this long; a drainer stops sending well before.
+CLAIM_SECONDS = 300
+
+# Delivery outcomes.
+SENT = "sent"
+RETRY = "retry"
+DROP = "drop"
+
+
+@dataclass
+class OutboxEvent:
+    channel_id: int
+    embed: discord.Embed
+    source: str
+    # Events with the same key are only ever appended once.
+    dedup_key: Optional[str] = None
+    # conquer_messages_v2 rows to write once the message is delivered.
+    receipt: Optional[List[dict]] = None
+
+
+class EventQueue:
+    """Durable outbox for tracker notifications (tracker_events_v1).
+
+    Detectors append events in bulk, inside or right after the transaction that
+    detected them, so a restart or a failed send no longer loses a notification.
+    The gateway process drains the outbox (see EventDelivery_cog): a batch is
+    claimed with SKIP LOCKED by pushing its next_attempt_at CLAIM_SECONDS ahead
+    and committing, so no transaction stays open while sending. Each event is
+    marked sent right after its send; failed ones are rescheduled with
+    exponential backoff and unsent ones released when the batch ends.
+    """
+
+    def __init__(self, bot, pool: asyncpg.Pool):
+        self.bot = bot
+        self.db = pool
+        self._last_send: Dict[tuple, float] = {}
+
+    async def create_tables(self) -> None:
+        await self.db.execute("""
+            CREATE TABLE IF NOT EXISTS tracker_events_v1 (
+                id BIGSERIAL PRIMARY KEY,
+                channel_id BIGINT NOT NULL,
+                source TEXT NOT NULL,
+                payload JSONB NOT NULL,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            );
+        """)
+
+        await self.db.execute("""
+            ALTER TABLE tracker_events_v1
+            ADD COLUMN IF NOT EXISTS dedup_key TEXT,
+            ADD COLUMN IF NOT EXISTS receipt JSONB,
+            ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'pending',
+            ADD COLUMN IF NOT EXISTS attempts INT NOT NULL DEFAULT 0,
+            ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            ADD COLUMN IF NOT EXISTS last_error TEXT,
+            ADD COLUMN IF NOT EXISTS sent_at TIMESTAMPTZ;
+        """)
+
+        await self.db.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS tracker_events_v1_dedup_key
+            ON tracker_events_v1 (dedup_key);
+        """)
+
+        await self.db.execute("""
+            CREATE INDEX IF NOT EXISTS tracker_events_v1_pending
+            ON tracker_events_v1 (next_attempt_at, id)
+            WHERE status = 'pending';
+        """)
+
+    async def send(
+        self,
+        channel_id: int,
+        embed: discord.Embed,
+        source: str,
+        dedup_key: Optional[str] = None,
+        receipt: Optional[List[dict]] = None
+    ) -> bool:
+        """Append one event; returns False when it was already in the outbox."""
+        return await self.append([OutboxEvent(channel_id, embed, source, dedup_key, receipt)]) > 0
+
+    async def append(self, events: List[OutboxEvent], conn: Optional[asyncpg.Connection] = None) -> int:
+        """Append events with one INSERT; returns how many were new.
+
+        Pass `conn` to make the append part of the caller's transaction; the
+        NOTIFY is then delivered when that transaction commits.
+        """
+        if not events:
+            return 0
+
+        if conn is None:
+            async with self.db.acquire() as conn:
+                async with conn.transaction():
+                    return await self.append(events, conn)
+
+        status = await conn.execute("""
+            INSERT INTO tracker_events_v1 (channel_id, source, payload, dedup_key, receipt)
+            SELECT c, s, p::jsonb, k, r::jsonb
+            FROM unnest($1::BIGINT[], $2::TEXT[], $3::TEXT[], $4::TEXT[], $5::TEXT[]) AS u(c, s, p, k, r)
+            ON CONFLICT (dedup_key) DO NOTHING;
+        """,
+            [e.channel_id for e in events],
+            [e.source for e in events],
+            [json.dumps({"embed": e.embed.to_dict()}) for e in events],
+            [e.dedup_key for e in events],
+            [json.dumps(e.receipt) if e.receipt else None for e in events]
+        )
+        await conn.execute("SELECT pg_notify($1, '');", EVENTS_CHANNEL)
+
+        return int(status.split()[-1])
+
+    async def deliver(self, channel_id: int, embed: discord.Embed, source: str) -> tuple:
+        """Send one embed; returns (SENT | RETRY | DROP, error)."""
+        from main import resolve_channel
+
+        channel = resolve_channel(self.bot, channel_id)
+        if channel is None:
+            return DROP, "channel not found"
+
+        spacing = SEND_SPACING.get(source, 0.0)
+        if spacing:
+            key = (source, channel_id)
+            last_ts = self._last_send.get(key)
+            if last_ts is not None:
+                diff = time.monotonic() - last_ts
+                if diff < spacing:
+                    await asyncio.sleep(spacing - diff)
+            self._last_send[key] = time.monotonic()
+
+        try:
+            async with self.bot.rest_budget.lane(lane_for_source(source)):
+                await channel.send(embed=embed)
+        except (discord.Forbidden, discord.NotFound) as e:
+            logger.warning(f"[{source}] Geen toegang tot kanaal {channel_id} ({e.status}). Bericht niet verstuurd.")
+            return DROP, str(e)
+        except discord.HTTPException as e:
+            if e.status == 429 or e.status >= 500:
+                logger.warning(f"[{source}] HTTP {e.status} bij versturen naar kanaal {channel_id}, later opnieuw.")
+                return RETRY, str(e)
+            logger.warning(f"[{source}] HTTPException bij versturen naar kanaal {channel_id}: {e}")
+            return DROP, str(e)
+        except (OSError, asyncio.TimeoutError) as e:
+            return RETRY, str(e)
+        except Exception as e:
+            # aiohttp.ClientError and friends: whether Discord got it is unknown, so try again.
+            logger.exception(f"[{source}] Onverwachte fout bij versturen naar kanaal {channel_id}, later opnieuw.")
+            return RETRY, repr(e)
+
+        return SENT, None
+
+    async def drain(self, batch_size: int = 50) -> int:
+        """Deliver up to `batch_size` due events; safe to run in several processes."""
+        rows = await self.db.fetch("""
+            UPDATE tracker_events_v1 e
+            SET next_attempt_at = NOW() + make_interval(secs => $2::float8)
+            FROM (
+                SELECT id
+                FROM tracker_events_v1
+                WHERE status = 'pending' AND next_attempt_at <= NOW()
+                ORDER BY id
+                LIMIT $1
+                FOR UPDATE SKIP LOCKED
+            ) claimed
+            WHERE e.id = claimed.id
+            RETURNING e.id, e.channel_id, e.source, e.payload, e.attempts;
+        """, batch_size, float(CLAIM_SECONDS))
+        rows = sorted(rows, key=lambda r: r["id"])
+
+        retry: List[tuple] = []
+        dropped: List[tuple] = []
+        # Stop sending with a margin before the claim runs out and another drainer may take the rest.
+        deadline = time.monotonic() + CLAIM_SECONDS / 2
+        delivered = 0
+
+        try:
+            for row in rows:
+                if time.monotonic() > deadline:
+                    break
+                delivered += 1
+
+                try:
+                    embed = discord.Embed.from_dict(json.loads(row["payload"])["embed"])
+                except Exception as e:
+                    dropped.append((row["id"], f"payload: {e!r}"))
+                    continue
+
+                outcome, error = await self.deliver(row["channel_id"], embed, row["source"])
+
+                if outcome == SENT:
+                    # Right away: a later failure in this batch must not send it again.
+                    await self._mark_sent(self.db, [row["id"]])
+                elif outcome == RETRY and row["attempts"] + 1 < MAX_ATTEMPTS:
+                    retry.append((row["id"], error))
+                else:
+                    dropped.append((row["id"], error))
+        finally:
+            await self._settle(retry, dropped, [row["id"] for row in rows[delivered:]])
+
+        return len(rows)
+
+    async def _settle(self, retry: List[tuple], dropped: List[tuple], unsent: List[int]) -> None:
+        """Reschedule failed events, give up on dropped ones and release the ones never tried."""
+        if retry:
+            await self.db.execute("""
+                UPDATE tracker_events_v1 e
+                SET attempts = e.attempts + 1,
+                    next_attempt_at = NOW() + make_interval(
+                        secs => LEAST($3::float8 * power(2, e.attempts), $4::float8)
+                    ),
+                    last_error = u.error
+                FROM unnest($1::BIGINT[], $2::TEXT[]) AS u(id, error)
+                WHERE e.id = u.id;
+            """, [r[0] for r in retry], [r[1] for r in retry],
+                 float(RETRY_BASE_SECONDS), float(RETRY_MAX_SECONDS))
+
+        if dropped:
+            await self.db.execute("""
+                UPDATE tracker_events_v1 e
+                SET status = 'dead',
+                    attempts = e.attempts + 1,
+                    last_error = u.error
+                FROM unnest($1::BIGINT[], $2::TEXT[]) AS u(id, error)
+                WHERE e.id = u.id;
+            """, [r[0] for r in dropped], [r[1] for r in dropped])
+
+        if unsent:
+            await self.db.execute("""
+                UPDATE tracker_events_v1
+                SET next_attempt_at = NOW()
+                WHERE id = ANY($1::BIGINT[]) AND status = 'pending';
+            """, unsent)
+
+    async def _mark_sent(self, conn, ids: List[int]) -> None:
+        """Mark a batch sent and write its conquer_messages_v2 receipts in one statement."""
+        await conn.execute("""
+            WITH sent AS (
+                UPDATE tracker_events_v1
+                SET status = 'sent', sent_at = NOW()
+                WHERE id = ANY($1::BIGINT[])
+                RETURNING receipt
+            )
+            INSERT INTO conquer_messages_v2 (
+                guild_id, channel_id, world, village_id,
+                unix_timestamp, old_owner_id, new_owner_id
+            )
+            SELECT r.guild_id, r.channel_id, r.world, r.village_id,
+                   r.unix_timestamp, r.old_owner_id, r.new_owner_id
+            FROM sent
+            CROSS JOIN LATERAL jsonb_to_recordset(sent.receipt) AS r(
+                guild_id BIGINT, channel_id BIGINT, world TEXT, village_id BIGINT,
+                unix_timestamp BIGINT, old_owner_id BIGINT, new_owner_id BIGINT
+            )
+            WHERE sent.receipt IS NOT NULL
+            ON CONFLICT DO NOTHING;
+        """, ids)
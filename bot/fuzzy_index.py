@@ -0,0 +1,173 @@
+"""Per-world fuzzy lookup of player names and tribe tags/names.
+
+Names are kept in a BK-tree keyed on Levenshtein distance, so a lookup only
+visits subtrees whose distance band can still contain a match instead of
+scoring every name on the world. Candidates are ranked by edit distance and
+then by Levenshtein ratio.
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote_plus
+
+import asyncpg
+from Levenshtein import distance, ratio
+
+PLAYER = "player"
+TRIBE = "tribe"
+
+# Seconds a cached index is served before it is rebuilt.
+INDEX_MAX_AGE = 600
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    kind: str
+    id: int
+    # Name as shown in-game (tag for tribes matched on their tag).
+    display: str
+    distance: int
+    score: float
+
+
+def normalize(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+def max_distance(query: str) -> int:
+    """Edits allowed for a query: 1 for short names, at most 3."""
+    return min(3, max(1, len(query) // 4))
+
+
+class BKTree:
+    """BK-tree over normalized keys; every key holds the entries sharing it."""
+
+    def __init__(self):
+        # node: (key, entries, children by distance)
+        self.root: Optional[Tuple[str, list, Dict[int, tuple]]] = None
+        self.size = 0
+
+    def add(self, key: str, entry) -> None:
+        self.size += 1
+        if self.root is None:
+            self.root = (key, [entry], {})
+            return
+
+        node = self.root
+        while True:
+            d = distance(key, node[0])
+            if d == 0:
+                node[1].append(entry)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = (key, [entry], {})
+                return
+            node = child
+
+    def search(self, key: str, max_dist: int) -> List[Tuple[int, str, list]]:
+        """Return (distance, key, entries) for every key within `max_dist` edits."""
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node_key, entries, children = stack.pop()
+            d = distance(key, node_key)
+            if d <= max_dist:
+                found.append((d, node_key, entries))
+            for child_d in range(d - max_dist, d + max_dist + 1):
+                child = children.get(child_d)
+                if child is not None:
+                    stack.append(child)
+        return found
+
+
+class NameIndex:
+    """Fuzzy matcher over one world's players and tribes."""
+
+    def __init__(self, players: Iterable[asyncpg.Record], tribes: Iterable[asyncpg.Record]):
+        self.built_at = time.monotonic()
+        self.tree = BKTree()
+        # Exact (normalized) lookups skip the tree.
+        self.exact: Dict[str, list] = {}
+
+        for row in players:
+            if row["name"]:
+                self._add(unquote_plus(row["name"]), (PLAYER, row["player_id"], unquote_plus(row["name"])))
+        for row in tribes:
+            tag = unquote_plus(row["tag"]) if row["tag"] else None
+            if tag:
+                self._add(tag, (TRIBE, row["tribe_id"], tag))
+            if row["name"]:
+                self._add(unquote_plus(row["name"]), (TRIBE, row["tribe_id"], tag or unquote_plus(row["name"])))
+
+    def _add(self, name: str, entry: tuple) -> None:
+        key = normalize(name)
+        self.exact.setdefault(key, []).append(entry)
+        self.tree.add(key, entry)
+
+    def resolve(self, query: str, kind: Optional[str] = None) -> Optional[Tuple[int, str]]:
+        """Case-insensitive exact match as (id, display), or None."""
+        for entry_kind, entry_id, display in self.exact.get(normalize(query), ()):
+            if kind is None or entry_kind == kind:
+                return entry_id, display
+        return None
+
+    def suggest(self, query: str, kind: Optional[str] = None, limit: int = 5) -> List[Suggestion]:
+        key = normalize(query)
+        if not key:
+            return []
+
+        best: Dict[Tuple[str, int], Suggestion] = {}
+        for d, node_key, entries in self.tree.search(key, max_distance(key)):
+            score = ratio(key, node_key)
+            for entry_kind, entry_id, display in entries:
+                if kind is not None and entry_kind != kind:
+                    continue
+                current = best.get((entry_kind, entry_id))
+                if current is None or (d, -score) < (current.distance, -current.score):
+                    best[(entry_kind, entry_id)] = Suggestion(entry_kind, entry_id, display, d, score)
+
+        return sorted(best.values(), key=lambda s: (s.distance, -s.score, s.display.lower()))[:limit]
+
+
+class NameIndexes:
+    """Per-world NameIndex cache, rebuilt from player_data_v3/ally_data_v3 when stale."""
+
+    def __init__(self, pool: asyncpg.Pool, max_age: float = INDEX_MAX_AGE):
+        self.db = pool
+        self.max_age = max_age
+        self._indexes: Dict[str, NameIndex] = {}
+        self._building: Dict[str, asyncio.Lock] = {}
+
+    def _fresh(self, world: str) -> Optional[NameIndex]:
+        index = self._indexes.get(world)
+        if index is not None and time.monotonic() - index.built_at < self.max_age:
+            return index
+        return None
+
+    async def get(self, world: str) -> NameIndex:
+        index = self._fresh(world)
+        if index is not None:
+            return index
+
+        # One build per world at a time; the BK-trees of a large world take seconds, so off the event loop.
+        async with self._building.setdefault(world, asyncio.Lock()):
+            index = self._fresh(world)
+            if index is not None:
+                return index
+            players = await self.db.fetch("SELECT player_id, name FROM player_data_v3 WHERE world = $1;", world)
+            tribes = await self.db.fetch("SELECT tribe_id, tag, name FROM ally_data_v3 WHERE world = $1;", world)
+            index = self._indexes[world] = await asyncio.to_thread(NameIndex, players, tribes)
+            return index
+
+    async def suggest(self, world: str, query: str, kind: Optional[str] = None, limit: int = 5) -> List[Suggestion]:
+        return (await self.get(world)).suggest(query, kind, limit)
+
+
+def format_suggestions(suggestions: List[Suggestion]) -> str:
+    """Suffix for a not-found message listing close names; empty without suggestions."""
+    if not suggestions:
+        return ""
+    names = list(dict.fromkeys(s.display for s in suggestions))
+    return " Bedoelde je: " + ", ".join(f"`{name}`" for name in names) + "?"
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id() -> str:
+    """Heroku's DYNO name when available, otherwise host:pid."""
+    return os.getenv("DYNO") or f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaseManager:
+    """Splits (tracker, world) scans over every running process.
+
+    Each process heartbeats into worker_heartbeats_v1. A scan is owned through a
+    row in tracker_leases_v1 that the owner renews on every heartbeat; when a
+    process dies its lease expires after `ttl` seconds and another one takes
+    over. Ownership is assigned by rendezvous hashing over the live workers, so
+    N processes split the worlds between them and a returning worker gets its
+    share back. A disabled manager (gateway-only process) never owns anything.
+
+    Held leases are trusted locally only until the expiry of their last
+    successful grant or renewal, measured from before that statement ran; after
+    a failed heartbeat `acquire` goes back to the database, which hands the
+    lease to someone else once it has expired there.
+    """
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        worker_id: Optional[str] = None,
+        ttl: int = 90,
+        heartbeat: int = 30,
+        enabled: bool = True
+    ):
+        self.db = pool
+        self.enabled = enabled
+        self.worker_id = worker_id or default_worker_id()
+        self.ttl = ttl
+        self.heartbeat_interval = heartbeat
+        # (tracker, world) -> time.monotonic() until which the lease is certainly ours
+        self.held: Dict[Tuple[str, str], float] = {}
+        self.workers: List[str] = [self.worker_id]
+        self._task: Optional[asyncio.Task] = None
+
+    async def create_tables(self) -> None:
+        await self.db.execute("""
+            CREATE TABLE IF NOT EXISTS worker_heartbeats_v1 (
+                worker_id TEXT PRIMARY KEY,
+                seen_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            );
+        """)
+
+        await self.db.execute("""
+            CREATE TABLE IF NOT EXISTS tracker_leases_v1 (
+                tracker TEXT NOT NULL,
+                world TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                expires_at TIMESTAMPTZ NOT NULL,
+                PRIMARY KEY (tracker, world)
+            );
+        """)
+
+    async def start(self) -> None:
+        await self.create_tables()
+        if not self.enabled:
+            return
+
+        await self.heartbeat()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat_loop())
+        logger.info(f"[Leases] Worker `{self.worker_id}` started")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        if not self.enabled:
+            return
+
+        await self.db.execute("DELETE FROM tracker_leases_v1 WHERE owner = $1;", self.worker_id)
+        await self.db.execute("DELETE FROM worker_heartbeats_v1 WHERE worker_id = $1;", self.worker_id)
+        self.held.clear()
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.heartbeat()
+            except Exception:
+                # The leases may expire before the next renewal; stop trusting them.
+                self.held.clear()
+                logger.exception("[Leases] Heartbeat failed")
+
+    async def heartbeat(self) -> None:
+        """Mark this worker alive, refresh the live worker list and renew held leases."""
+        await self.db.execute("""
+            INSERT INTO worker_heartbeats_v1 (worker_id, seen_at)
+            VALUES ($1, NOW())
+            ON CONFLICT (worker_id) DO UPDATE SET seen_at = EXCLUDED.seen_at;
+        """, self.worker_id)
+
+        rows = await self.db.fetch("""
+            SELECT worker_id
+            FROM worker_heartbeats_v1
+            WHERE seen_at > NOW() - make_interval(secs => $1)
+            ORDER BY worker_id;
+        """, float(self.ttl))
+        self.workers = [r["worker_id"] for r in rows] or [self.worker_id]
+
+        valid_until = time.monotonic() + self.ttl
+        renewed = await self.db.fetch("""
+            UPDATE tracker_leases_v1
+            SET expires_at = NOW() + make_interval(secs => $2)
+            WHERE owner = $1
+            RETURNING tracker, world;
+        """, self.worker_id, float(self.ttl))
+        self.held = {(r["tracker"], r["world"]): valid_until for r in renewed}
+
+    def preferred_worker(self, tracker: str, world: str) -> str:
+        key = f"{tracker}:{world}"
+        return max(self.workers, key=lambda w: zlib.crc32(f"{w}:{key}".encode()))
+
+    async def acquire(self, tracker: str, world: str) -> bool:
+        """Return True when this process should run the (tracker, world) scan."""
+        if not self.enabled:
+            return False
+
+        key = (tracker, world)
+
+        if self.preferred_worker(tracker, world) != self.worker_id:
+            if key in self.held:
+                await self.release(tracker, world)
+            return False
+
+        if self.held.get(key, 0.0) > time.monotonic():
+            return True
+
+        valid_until = time.monotonic() + self.ttl
+        row = await self.db.fetchrow("""
+            INSERT INTO tracker_leases_v1 (tracker, world, owner, expires_at)
+            VALUES ($1, $2, $3, NOW() + make_interval(secs => $4))
+            ON CONFLICT (tracker, world) DO UPDATE
+            SET owner = EXCLUDED.owner,
+                expires_at = EXCLUDED.expires_at
+            WHERE tracker_leases_v1.owner = EXCLUDED.owner
+               OR tracker_leases_v1.expires_at < NOW()
+            RETURNING owner;
+        """, tracker, world, self.worker_id, float(self.ttl))
+
+        if row is None:
+            self.held.pop(key, None)
+            return False
+
+        self.held[key] = valid_until
+        return True
+
+    async def release(self, tracker: str, world: str) -> None:
+        self.held.pop((tracker, world), None)
+        await self.db.execute("""
+            DELETE FROM tracker_leases_v1
+            WHERE tracker = $1 AND world = $2 AND owner = $3;
+        """, tracker, world, self.worker_id)
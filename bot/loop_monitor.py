@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+LAG_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class LoopMonitor:
+    """Measures event-loop scheduling delay and reports what blocks it.
+
+    A sampler task sleeps `interval` seconds and records how late it woke up in
+    the `loop.lag` histogram. A watchdog thread watches the sampler's heartbeat;
+    once the loop has not run for `threshold` seconds it logs the stack of the
+    loop thread, i.e. the code that is blocking it, once per stall.
+    """
+
+    def __init__(self, metrics: Metrics, interval: float = 0.25, threshold: float = 1.0):
+        self.metrics = metrics
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = metrics.histogram("loop.lag", LAG_BUCKETS)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = self._loop.create_task(self._sample())
+
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _sample(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            self.lag.observe(max(0.0, now - expected))
+
+    def _watch(self) -> None:
+        reported = False
+        while not self._stop.wait(self.interval):
+            stalled = time.monotonic() - self._heartbeat
+            if stalled < self.threshold:
+                reported = False
+                continue
+            if reported:
+                continue
+
+            reported = True
+            self.metrics.inc("loop.stalls")
+            logger.warning(
+                f"[LoopMonitor] Event loop blocked for {stalled:.2f}s in {self._running_task()}:\n"
+                f"{self._loop_stack()}"
+            )
+
+    def _running_task(self) -> str:
+        task = asyncio.current_task(self._loop)
+        if task is None:
+            return "a callback"
+        return f"task `{task.get_name()}` ({task.get_coro().__qualname__})"
+
+    def _loop_stack(self) -> str:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return "<no frame>"
+        return "".join(traceback.format_stack(frame))
@@ -1,12 +1,28 @@
 import discord
 from discord.ext import commands
 import os
+import argparse
 import asyncio
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 import logging
 import asyncpg
 from config import default_intents
+from pg_listener import PgListener, install_refresh_trigger
+from update_scheduler import UpdateScheduler
+from leases import LeaseManager
+from event_queue import EventQueue
+from metrics import Metrics
+from cpu_pool import CpuPool
+from loop_monitor import LoopMonitor
+from spatial import SpatialIndexes
+from fuzzy_index import NameIndexes
+from membership import MembershipCache
+from rest_budget import RestBudget
+from world_registry import WorldRegistry
+from cache_registry import CacheRegistry
+from subscriptions import SubscriptionBus
 
 # Logging
 logging.getLogger("discord").setLevel(logging.WARNING)
@@ -16,12 +32,54 @@ load_dotenv()
 
 intents = default_intents()
 
-bot = commands.Bot(
-    command_prefix="*",
-    intents=intents,
-    application_id=int(os.getenv("DISCORD_APPLICATION_ID")),
-    reconnect=True
-)
+# Sharding: DISCORD_SHARDED=1 lets discord.py pick the shard count. SHARD_COUNT and
+# SHARD_IDS (comma separated) split the gateway over several processes.
+SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+SHARD_IDS = [int(i) for i in os.getenv("SHARD_IDS", "").split(",") if i.strip()] or None
+SHARDED = bool(os.getenv("DISCORD_SHARDED") or SHARD_COUNT or SHARD_IDS)
+
+class TrackerBotMixin:
+    """Lets a --worker process run the tracker loops without a gateway connection."""
+
+    worker_mode: bool = False
+
+    def is_ready(self) -> bool:
+        return self.worker_mode or super().is_ready()
+
+    async def wait_until_ready(self) -> None:
+        if self.worker_mode:
+            return
+        await super().wait_until_ready()
+
+class TrackerBot(TrackerBotMixin, commands.Bot):
+    pass
+
+class ShardedTrackerBot(TrackerBotMixin, commands.AutoShardedBot):
+    pass
+
+if SHARDED:
+    bot = ShardedTrackerBot(
+        command_prefix="*",
+        intents=intents,
+        application_id=int(os.getenv("DISCORD_APPLICATION_ID")),
+        shard_count=SHARD_COUNT,
+        shard_ids=SHARD_IDS,
+        reconnect=True
+    )
+else:
+    bot = TrackerBot(
+        command_prefix="*",
+        intents=intents,
+        application_id=int(os.getenv("DISCORD_APPLICATION_ID")),
+        reconnect=True
+    )
+
+# Cogs a --worker process loads: detection only, no commands or UI.
+WORKER_COGS = {
+    "BuildingTracker_cog",
+    "ConquerTracker_cog",
+    "ODTrackerv2_cog",
+}
 
 # ------------------------------------------------------------------
 # EMBED HELPER
@@ -36,35 +94,168 @@ def create_embed(title: str = None, description: str = None) -> discord.Embed:
     return embed
 
 # ------------------------------------------------------------------
+# CHANNEL HELPER
+# ------------------------------------------------------------------
+
+def resolve_channel(client: discord.Client, channel_id: int):
+    """Cached channel, or a REST-only handle when its guild lives on another process's shard."""
+    channel = client.get_channel(channel_id)
+    if channel is None and SHARD_IDS:
+        return client.get_partial_messageable(channel_id)
+    return channel
+
+# ------------------------------------------------------------------
+
+STARTED_AT = time.perf_counter()
+
+def log_phase(phase: str, since: float) -> float:
+    now = time.perf_counter()
+    print(f"Startup: {phase} took {now - since:.2f}s")
+    return now
 
 @bot.event
 async def on_ready():
+    print(f"Startup: ready {time.perf_counter() - STARTED_AT:.2f}s after launch")
+    if bot.worker_mode:
+        return
     try:
         await bot.tree.sync()
         print("Command tree synced.")
     except Exception as e:
         print(f"Slash sync error: {e}")
 
-async def load_cogs():
+async def load_cog(cog: str):
+    started = time.perf_counter()
+    try:
+        await bot.load_extension(cog)
+        print(f"Loaded cog: {cog} ({time.perf_counter() - started:.2f}s)")
+    except Exception as e:
+        print(f"Failed loading {cog}: {e}")
+
+async def load_cogs(only: set = None):
+    """Load every cog concurrently so their cog_load DDL and queries overlap."""
     cogs_path = Path(__file__).parent / "cogs"
-    for file in cogs_path.glob("*.py"):
-        cog = f"cogs.{file.stem}"
-        try:
-            await bot.load_extension(cog)
-            print(f"Loaded cog: {cog}")
-        except Exception as e:
-            print(f"Failed loading {cog}: {e}")
+    await asyncio.gather(*(
+        load_cog(f"cogs.{file.stem}")
+        for file in cogs_path.glob("*.py")
+        if only is None or file.stem in only
+    ))
+
+async def install_triggers():
+    try:
+        await install_refresh_trigger(bot.db, "village_data_v3")
+        await install_refresh_trigger(bot.db, "player_data_v3")
+    except Exception as e:
+        print(f"Refresh trigger install error: {e}")
+
+def register_caches():
+    """Process-wide caches shown by *memory caches; cogs register their own."""
+    caches = bot.caches
+    caches.register("spatial.indexes", bot.spatial._indexes, owner="spatial")
+    caches.register("names.indexes", bot.names._indexes, owner="fuzzy_index")
+    caches.register("membership.worlds", bot.membership._worlds, owner="membership")
+    caches.register("world_registry.worlds", bot.world_registry.worlds, owner="world_registry")
+    caches.register("update_scheduler.states", bot.update_scheduler.states, owner="update_scheduler")
+    caches.register("events.last_send", bot.events._last_send, owner="event_queue")
+    caches.register("subscriptions.tables", bot.subscriptions.tables, owner="subscriptions")
+    # Discord models reference each other and the client, so only their counts are meaningful.
+    caches.register("discord.guilds", lambda: bot.guilds, owner="discord", deep=False)
+    caches.register("discord.users", lambda: bot.users, owner="discord", deep=False)
+    caches.register("discord.messages", lambda: bot.cached_messages, owner="discord", deep=False)
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--worker", action="store_true", help="run only the detection loops and queue notifications")
+    mode.add_argument("--gateway", action="store_true", help="only deliver; leave detection to --worker processes")
+    return parser.parse_args()
 
 async def main():
-    print("Starting bot")
+    global STARTED_AT
+    STARTED_AT = phase_at = time.perf_counter()
+    args = parse_args()
+    bot.worker_mode = args.worker
+    print(f"Starting bot ({'worker' if args.worker else 'gateway' if args.gateway else 'all'})")
 
     bot.db = await asyncpg.create_pool(os.getenv("DATABASE_URL"))
+    phase_at = log_phase("database pool", phase_at)
+
+    bot.pg_listener = PgListener(os.getenv("DATABASE_URL"))
+    bot.update_scheduler = UpdateScheduler()
+    bot.leases = LeaseManager(bot.db, enabled=not args.gateway)
+    bot.events = EventQueue(bot, bot.db)
+    bot.metrics = Metrics()
+    bot.cpu_pool = CpuPool(bot.metrics)
+    bot.rest_budget = RestBudget(bot.metrics)
+    bot.rest_budget.install(bot)
+    bot.spatial = SpatialIndexes(bot.db)
+    bot.names = NameIndexes(bot.db)
+    bot.membership = MembershipCache(bot.db, bot.pg_listener)
+    bot.world_registry = WorldRegistry(bot.db)
+    bot.subscriptions = SubscriptionBus(bot.db, bot.pg_listener)
+    bot.world_registry.follow(bot.subscriptions)
+    bot.caches = CacheRegistry()
+    register_caches()
+    bot.loop_monitor = LoopMonitor(bot.metrics, threshold=float(os.getenv("LOOP_LAG_THRESHOLD", "1.0")))
+    bot.loop_monitor.start()
 
     cogs_dir = Path(__file__).parent / "cogs"
     cogs_dir.mkdir(exist_ok=True)
 
-    await load_cogs()
-    await bot.start(os.getenv("DISCORD_TOKEN"))
+    await asyncio.gather(
+        install_triggers(),
+        bot.pg_listener.start(),
+        bot.leases.start(),
+        bot.events.create_tables(),
+        bot.world_registry.start(),
+        load_cogs(WORKER_COGS if args.worker else None),
+    )
+    phase_at = log_phase("triggers, listener, leases and cogs", phase_at)
+
+    # After the cogs created the subscription tables; their on_ready reads the loaded copy.
+    await bot.subscriptions.start()
+    phase_at = log_phase("subscriptions", phase_at)
+
+    await bot.login(os.getenv("DISCORD_TOKEN"))
+    log_phase("login", phase_at)
+
+    if args.worker:
+        # No gateway: the tracker loops start from their on_ready listeners and
+        # every notification goes to tracker_events_v1.
+        bot.dispatch("ready")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            bot.cpu_pool.close()
+            bot.loop_monitor.close()
+            await bot.world_registry.close()
+            await bot.subscriptions.close()
+            await bot.leases.close()
+        return
+
+    try:
+        await bot.connect(reconnect=True)
+    finally:
+        bot.cpu_pool.close()
+        bot.loop_monitor.close()
+        await bot.world_registry.close()
+        await bot.subscriptions.close()
+        await bot.leases.close()
+
+def install_uvloop() -> None:
+    """Opt-in uvloop (USE_UVLOOP=1); falls back to asyncio's loop when it is not installed."""
+    if os.getenv("USE_UVLOOP") not in ("1", "true", "yes"):
+        return
+
+    try:
+        import uvloop
+    except ImportError:
+        print("USE_UVLOOP is set but uvloop is not installed, using the default event loop")
+        return
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    print("Using uvloop")
 
 if __name__ == "__main__":
+    install_uvloop()
     asyncio.run(main())
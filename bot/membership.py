@@ -0,0 +1,188 @@
+"""Per-world tribe membership cache with a log of membership changes.
+
+Statement-level INSERT and UPDATE triggers on player_data_v3 compare the
+written rows with tribe_membership_last_v1, the last tribe seen per player,
+and record every difference in tribe_membership_changes_v1. Comparing with
+that table instead of the UPDATE's old rows means a refresh that deletes and
+reinserts a world is logged as well. The cache keeps a player -> tribe map
+per world, plus recent changes, and drops a world when its player_data_v3
+refresh is notified. A conquer's tribe is the tribe the player had at the
+conquer time, not the one after the refresh.
+"""
+import bisect
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+import asyncpg
+
+from pg_listener import refresh_channel
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached world is served when no refresh notification arrives.
+MEMBERSHIP_MAX_AGE = 900
+# Changes older than this cannot affect a conquer the HTTP tracker still ingests.
+CHANGE_WINDOW_HOURS = 48
+CHANGE_RETENTION_DAYS = 30
+
+
+async def install_membership_log(pool: asyncpg.Pool) -> None:
+    """Create tribe_membership_changes_v1 and the player_data_v3 triggers that fill it."""
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext('tribe_membership_log_v1'));")
+
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS tribe_membership_changes_v1 (
+                    id BIGSERIAL PRIMARY KEY,
+                    world TEXT NOT NULL,
+                    player_id BIGINT NOT NULL,
+                    old_tribe_id BIGINT,
+                    new_tribe_id BIGINT,
+                    changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                );
+            """)
+
+            await conn.execute("""
+                CREATE INDEX IF NOT EXISTS tribe_membership_changes_v1_world
+                ON tribe_membership_changes_v1 (world, changed_at);
+            """)
+
+            await conn.execute("""
+                CREATE INDEX IF NOT EXISTS tribe_membership_changes_v1_player
+                ON tribe_membership_changes_v1 (world, player_id, changed_at);
+            """)
+
+            if await conn.fetchval("SELECT to_regclass('tribe_membership_last_v1');") is None:
+                await conn.execute("""
+                    CREATE TABLE tribe_membership_last_v1 (
+                        world TEXT NOT NULL,
+                        player_id BIGINT NOT NULL,
+                        tribe_id BIGINT,
+                        PRIMARY KEY (world, player_id)
+                    );
+                """)
+                # Start from the current membership so the next refresh already logs its changes.
+                await conn.execute("""
+                    INSERT INTO tribe_membership_last_v1 (world, player_id, tribe_id)
+                    SELECT world, player_id, tribe_id FROM player_data_v3
+                    ON CONFLICT DO NOTHING;
+                """)
+
+            await conn.execute("""
+                CREATE OR REPLACE FUNCTION tribe_membership_log_v1() RETURNS trigger AS $$
+                BEGIN
+                    INSERT INTO tribe_membership_changes_v1 (world, player_id, old_tribe_id, new_tribe_id)
+                    SELECT n.world, n.player_id, l.tribe_id, n.tribe_id
+                    FROM new_rows n
+                    JOIN tribe_membership_last_v1 l ON l.world = n.world AND l.player_id = n.player_id
+                    WHERE l.tribe_id IS DISTINCT FROM n.tribe_id;
+
+                    INSERT INTO tribe_membership_last_v1 (world, player_id, tribe_id)
+                    SELECT DISTINCT ON (world, player_id) world, player_id, tribe_id FROM new_rows
+                    ON CONFLICT (world, player_id) DO UPDATE SET tribe_id = EXCLUDED.tribe_id
+                    WHERE tribe_membership_last_v1.tribe_id IS DISTINCT FROM EXCLUDED.tribe_id;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+            """)
+
+            for trigger, event in (
+                ("player_data_v3_membership", "UPDATE"),
+                ("player_data_v3_membership_insert", "INSERT"),
+            ):
+                exists = await conn.fetchval(
+                    "SELECT 1 FROM pg_trigger WHERE tgname = $1 AND tgrelid = 'player_data_v3'::regclass;", trigger
+                )
+                if exists:
+                    continue
+
+                await conn.execute(f"""
+                    CREATE TRIGGER {trigger}
+                    AFTER {event} ON player_data_v3
+                    REFERENCING NEW TABLE AS new_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION tribe_membership_log_v1();
+                """)
+                logger.info(f"[Membership] {event} trigger installed")
+
+
+class WorldMembership:
+    """Membership of one world at load time plus the changes before it."""
+
+    def __init__(self, players: List[asyncpg.Record], changes: List[asyncpg.Record]):
+        self.loaded_at = time.monotonic()
+        self.tribe_of: Dict[int, int] = {row["player_id"]: row["tribe_id"] for row in players}
+
+        # player_id -> ([changed_at, ...], [old_tribe_id, ...]) in ascending order
+        self.changes: Dict[int, Tuple[List[int], List[int]]] = {}
+        for row in changes:
+            times, olds = self.changes.setdefault(row["player_id"], ([], []))
+            times.append(row["changed_at"])
+            olds.append(row["old_tribe_id"])
+
+    def tribe_at(self, player_id: int, unix_timestamp: Optional[int] = None) -> Optional[int]:
+        """Tribe of a player at `unix_timestamp` (now when omitted); None for unknown players."""
+        current = self.tribe_of.get(player_id)
+        if unix_timestamp is None or player_id not in self.changes:
+            return current
+
+        times, olds = self.changes[player_id]
+        # The first change recorded after the timestamp still had the old tribe.
+        position = bisect.bisect_right(times, unix_timestamp)
+        if position < len(times):
+            return olds[position]
+        return current
+
+
+class MembershipCache:
+    """Per-world WorldMembership, reloaded after every player_data_v3 refresh."""
+
+    def __init__(self, pool: asyncpg.Pool, listener, max_age: float = MEMBERSHIP_MAX_AGE):
+        self.db = pool
+        self.listener = listener
+        self.max_age = max_age
+        self._worlds: Dict[str, WorldMembership] = {}
+        self._listening: Dict[str, str] = {}
+
+    async def get(self, world: str) -> WorldMembership:
+        membership = self._worlds.get(world)
+        if membership is not None and time.monotonic() - membership.loaded_at < self.max_age:
+            return membership
+
+        channel = refresh_channel("player_data_v3", world)
+        if channel not in self._listening:
+            await self.listener.listen(channel, self._on_refresh)
+            self._listening[channel] = world
+
+        players = await self.db.fetch("""
+            SELECT player_id, tribe_id
+            FROM player_data_v3
+            WHERE world = $1;
+        """, world)
+        changes = await self.db.fetch(f"""
+            SELECT player_id, old_tribe_id, EXTRACT(EPOCH FROM changed_at)::BIGINT AS changed_at
+            FROM tribe_membership_changes_v1
+            WHERE world = $1 AND changed_at > NOW() - INTERVAL '{CHANGE_WINDOW_HOURS} hours'
+            ORDER BY changed_at, id;
+        """, world)
+
+        membership = self._worlds[world] = WorldMembership(players, changes)
+        return membership
+
+    async def tribe_at(self, world: str, player_id: int, unix_timestamp: Optional[int] = None) -> Optional[int]:
+        """WorldMembership.tribe_at, with a direct lookup for players newer than the cache."""
+        membership = await self.get(world)
+        if player_id == 0 or player_id in membership.tribe_of:
+            return membership.tribe_at(player_id, unix_timestamp)
+
+        return await self.db.fetchval("""
+            SELECT tribe_id
+            FROM player_data_v3
+            WHERE world = $1 AND player_id = $2;
+        """, world, player_id)
+
+    async def _on_refresh(self, channel: str, payload: str) -> None:
+        world = self._listening.get(channel)
+        if world is not None:
+            self._worlds.pop(world, None)
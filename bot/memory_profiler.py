@@ -0,0 +1,142 @@
+"""tracemalloc snapshots attributed to cogs, bot modules and libraries.
+
+Tracing is off until an owner starts it (*memory start), since it slows
+every allocation down. Each allocation is attributed to the innermost frame
+in this bot's own code, so memory a cog allocates through discord.py or
+asyncpg still counts for that cog; allocations without a bot frame count
+for the library they came from.
+"""
+import asyncio
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+BOT_ROOT = Path(__file__).resolve().parent
+
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+@dataclass
+class TakenSnapshot:
+    snapshot: tracemalloc.Snapshot
+    taken_at: float
+    by_owner: Dict[str, Tuple[int, int]]
+
+
+def owner_of(filename: str) -> Optional[str]:
+    """`cog:<Name>` or `bot:<module>` for the bot's own files, else None."""
+    if filename.startswith("<"):
+        return None
+    try:
+        relative = Path(filename).resolve().relative_to(BOT_ROOT)
+    except ValueError:
+        return None
+    if relative.parts[0] == "cogs":
+        return f"cog:{relative.stem.removesuffix('_cog')}"
+    return f"bot:{relative.stem}"
+
+
+def library_of(filename: str) -> str:
+    parts = Path(filename).parts
+    for marker in ("site-packages", "dist-packages"):
+        if marker in parts:
+            index = parts.index(marker)
+            if index + 1 < len(parts):
+                return f"lib:{parts[index + 1].split('.')[0]}"
+    return "lib:python"
+
+
+def group_by_owner(snapshot: tracemalloc.Snapshot) -> Dict[str, Tuple[int, int]]:
+    """owner -> (bytes, blocks) over every traced allocation."""
+    owners: Dict[str, Tuple[int, int]] = {}
+    filenames: Dict[str, Optional[str]] = {}
+    for stat in snapshot.statistics("traceback"):
+        owner = None
+        # Frames run oldest to newest; the innermost bot frame is the one that asked for the memory.
+        for frame in reversed(stat.traceback):
+            if frame.filename not in filenames:
+                filenames[frame.filename] = owner_of(frame.filename)
+            owner = filenames[frame.filename]
+            if owner is not None:
+                break
+        if owner is None:
+            owner = library_of(stat.traceback[-1].filename)
+        size, count = owners.get(owner, (0, 0))
+        owners[owner] = (size + stat.size, count + stat.count)
+    return owners
+
+
+def format_bytes(size: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+class MemoryProfiler:
+    """Keeps the first and the latest snapshot of a tracing session and diffs against both."""
+
+    def __init__(self):
+        self.baseline: Optional[TakenSnapshot] = None
+        self.latest: Optional[TakenSnapshot] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 10) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.baseline = self.latest = None
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        self.baseline = self.latest = None
+
+    def _take(self) -> TakenSnapshot:
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        return TakenSnapshot(snapshot, time.monotonic(), group_by_owner(snapshot))
+
+    async def snapshot(self) -> Tuple[TakenSnapshot, Optional[TakenSnapshot]]:
+        """Take a snapshot in a thread; returns it with the one before it."""
+        taken = await asyncio.to_thread(self._take)
+        previous = self.latest
+        if self.baseline is None:
+            self.baseline = taken
+        self.latest = taken
+        return taken, previous
+
+    @staticmethod
+    def owner_diff(new: TakenSnapshot, old: Optional[TakenSnapshot], limit: int = 15) -> List[str]:
+        """Owners by current size, with their growth since `old`."""
+        rows = []
+        for owner, (size, count) in new.by_owner.items():
+            old_size = old.by_owner.get(owner, (0, 0))[0] if old else 0
+            rows.append((owner, size, count, size - old_size))
+        rows.sort(key=lambda r: r[1], reverse=True)
+
+        lines = []
+        for owner, size, count, delta in rows[:limit]:
+            growth = f" ({'+' if delta >= 0 else '-'}{format_bytes(abs(delta))})" if old else ""
+            lines.append(f"{owner:<28} {format_bytes(size):>10} {count:>9} blocks{growth}")
+        return lines
+
+    @staticmethod
+    async def top_growth(new: TakenSnapshot, old: TakenSnapshot, limit: int = 10) -> List[str]:
+        """Source lines that grew most between two snapshots."""
+        stats = await asyncio.to_thread(new.snapshot.compare_to, old.snapshot, "lineno")
+        lines = []
+        for stat in stats[:limit]:
+            if stat.size_diff <= 0:
+                break
+            frame = stat.traceback[0]
+            lines.append(f"+{format_bytes(stat.size_diff):>10} {Path(frame.filename).name}:{frame.lineno}")
+        return lines
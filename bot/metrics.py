@@ -0,0 +1,77 @@
+import bisect
+import math
+from typing import Callable, Dict, Iterable, List, Union
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram; cheap enough to observe on the event loop."""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.bounds: List[float] = sorted(buckets)
+        self.counts: List[int] = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket holding the p-th percentile."""
+        if not self.count:
+            return 0.0
+
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self) -> str:
+        if not self.count:
+            return "n=0"
+        return (
+            f"n={self.count} avg={self.total / self.count * 1000:.1f}ms "
+            f"p50<={self.percentile(50) * 1000:.0f}ms p99<={self.percentile(99) * 1000:.0f}ms "
+            f"max={self.max * 1000:.0f}ms"
+        )
+
+
+class Metrics:
+    """In-process counters, gauges and histograms shown by the *metrics command."""
+
+    def __init__(self):
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, Union[float, Callable[[], float]]] = {}
+        self.histograms: Dict[str, Histogram] = {}
+
+    def inc(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_gauge(self, name: str, value: Union[float, Callable[[], float]]) -> None:
+        """Set a gauge to a value, or to a callable that is read when metrics are shown."""
+        self.gauges[name] = value
+
+    def histogram(self, name: str, buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(buckets)
+        return self.histograms[name]
+
+    def render(self) -> str:
+        lines = []
+        for name in sorted(self.counters):
+            lines.append(f"{name} = {self.counters[name]}")
+        for name in sorted(self.gauges):
+            value = self.gauges[name]
+            lines.append(f"{name} = {value() if callable(value) else value}")
+        for name in sorted(self.histograms):
+            lines.append(f"{name}: {self.histograms[name].summary()}")
+        return "\n".join(lines) or "Geen metrics."
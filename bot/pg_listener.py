@@ -0,0 +1,181 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+Callback = Callable[[str, str], Awaitable[None]]
+
+
+def refresh_channel(table: str, world: str) -> str:
+    """Name of the per-world NOTIFY channel fired when `table` is refreshed."""
+    return f"{table}_{world}"
+
+
+async def install_refresh_trigger(pool: asyncpg.Pool, table: str) -> None:
+    """Let `table` NOTIFY `<table>_<world>` once per world when a refresh commits.
+
+    Statement-level triggers with a transition table fire once per INSERT/UPDATE
+    statement, and Postgres only delivers the notification after COMMIT, so the
+    ingestion job does not need to know about the listeners.
+    """
+    function = f"notify_{table}_refresh"
+
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext($1));", function)
+
+            await conn.execute(f"""
+                CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$
+                DECLARE
+                    w TEXT;
+                BEGIN
+                    FOR w IN SELECT DISTINCT world FROM new_rows LOOP
+                        PERFORM pg_notify('{table}_' || w, w);
+                    END LOOP;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+            """)
+
+            for event in ("insert", "update"):
+                trigger = f"{table}_refresh_{event}"
+                exists = await conn.fetchval(
+                    "SELECT 1 FROM pg_trigger WHERE tgname = $1 AND tgrelid = $2::regclass;",
+                    trigger, table
+                )
+                if exists:
+                    continue
+
+                await conn.execute(f"""
+                    CREATE TRIGGER {trigger}
+                    AFTER {event.upper()} ON {table}
+                    REFERENCING NEW TABLE AS new_rows
+                    FOR EACH STATEMENT EXECUTE FUNCTION {function}();
+                """)
+
+
+class PgListener:
+    """Dedicated connection that turns Postgres notifications into coroutine calls.
+
+    Callbacks receive `(channel, payload)`. Notifications on the same channel are
+    coalesced for `debounce` seconds so a refresh that commits in several
+    statements only wakes the listeners once. Channels listened to with
+    `coalesce=False` get every payload, in order, without delay.
+    """
+
+    def __init__(self, dsn: Optional[str], debounce: float = 2.0):
+        self.dsn = dsn
+        self.debounce = debounce
+        self.conn: Optional[asyncpg.Connection] = None
+        self._callbacks: Dict[str, List[Callback]] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._immediate: Set[str] = set()
+        self._lock = asyncio.Lock()
+        self._closing = False
+
+    @property
+    def connected(self) -> bool:
+        return self.conn is not None and not self.conn.is_closed()
+
+    async def start(self) -> None:
+        self._closing = False
+        await self._connect()
+
+    async def close(self) -> None:
+        self._closing = True
+        for task in self._pending.values():
+            task.cancel()
+        self._pending.clear()
+
+        if self.connected:
+            await self.conn.close()
+        self.conn = None
+
+    async def _connect(self) -> None:
+        async with self._lock:
+            self.conn = await asyncpg.connect(self.dsn)
+            self.conn.add_termination_listener(self._on_terminated)
+            for channel in self._callbacks:
+                await self.conn.add_listener(channel, self._on_notify)
+
+        logger.info(f"[PgListener] Listening on {len(self._callbacks)} channels")
+
+    def _on_terminated(self, conn: asyncpg.Connection) -> None:
+        if self._closing:
+            return
+        logger.warning("[PgListener] Connection lost, reconnecting")
+        asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delay = 1.0
+        while not self._closing:
+            try:
+                await self._connect()
+            except Exception as e:
+                logger.warning(f"[PgListener] Reconnect failed: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60.0)
+                continue
+
+            # Anything committed while we were disconnected was never delivered.
+            for channel in list(self._callbacks):
+                self._notify(channel, "")
+            return
+
+    async def listen(self, channel: str, callback: Callback, coalesce: bool = True) -> None:
+        async with self._lock:
+            if not coalesce:
+                self._immediate.add(channel)
+            callbacks = self._callbacks.setdefault(channel, [])
+            if callback in callbacks:
+                return
+
+            callbacks.append(callback)
+            if len(callbacks) == 1 and self.connected:
+                await self.conn.add_listener(channel, self._on_notify)
+
+    async def unlisten(self, channel: str, callback: Callback) -> None:
+        async with self._lock:
+            callbacks = self._callbacks.get(channel)
+            if not callbacks or callback not in callbacks:
+                return
+
+            callbacks.remove(callback)
+            if callbacks:
+                return
+
+            del self._callbacks[channel]
+            self._immediate.discard(channel)
+            if self.connected:
+                await self.conn.remove_listener(channel, self._on_notify)
+
+    def _on_notify(self, conn: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        self._notify(channel, payload)
+
+    def _notify(self, channel: str, payload: str) -> None:
+        if channel in self._immediate:
+            # Tasks start in creation order; callbacks of these channels must not reorder by awaiting first.
+            asyncio.get_running_loop().create_task(self._deliver(channel, payload))
+        else:
+            self._schedule(channel, payload)
+
+    def _schedule(self, channel: str, payload: str) -> None:
+        task = self._pending.get(channel)
+        if task is not None and not task.done():
+            return
+        self._pending[channel] = asyncio.get_running_loop().create_task(self._dispatch(channel, payload))
+
+    async def _dispatch(self, channel: str, payload: str) -> None:
+        await asyncio.sleep(self.debounce)
+        self._pending.pop(channel, None)
+        await self._deliver(channel, payload)
+
+    async def _deliver(self, channel: str, payload: str) -> None:
+        for callback in list(self._callbacks.get(channel, [])):
+            try:
+                await callback(channel, payload)
+            except Exception:
+                logger.exception(f"[PgListener] Callback for `{channel}` failed")
@@ -0,0 +1,125 @@
+"""Process-wide budget for Discord REST calls, split in priority lanes.
+
+All lanes draw from one token bucket sized below Discord's global limit.
+The bucket only covers this process: with --worker and --gateway processes,
+or several gateways, each has its own, so REST_BUDGET_PER_SECOND has to be
+set to the global limit divided over the processes that send.
+A lane only takes a token while the bucket stays above its reserve, so
+background lanes wait as headroom runs low and the lanes above them keep
+theirs. Interactions take their token without waiting.
+
+429s that discord.py logs are attributed to the lane of the task that made
+the request (via a contextvar) and also empty the bucket, so every
+background lane backs off.
+"""
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+LANES = ("interaction", "conquer", "building", "broadcast")
+
+# Share of the bucket a lane leaves for the lanes above it.
+LANE_RESERVE = {
+    "interaction": 0.0,
+    "conquer": 0.2,
+    "building": 0.4,
+    "broadcast": 0.6,
+}
+
+# Outbox sources (tracker_events_v1.source) -> lane.
+SOURCE_LANES = {
+    "conquer": "conquer",
+    "academy": "building",
+    "tower": "building",
+    "wall": "building",
+    "od": "building",
+}
+
+REST_BUDGET_PER_SECOND = float(os.getenv("REST_BUDGET_PER_SECOND", "40"))
+
+current_lane: ContextVar[str] = ContextVar("rest_lane", default="other")
+
+
+def lane_for_source(source: str) -> str:
+    return SOURCE_LANES.get(source, "building")
+
+
+class RateLimitLogFilter(logging.Filter):
+    """Counts the 429s discord.http logs; never drops a record.
+
+    discord.py logs "... responded with 429" once for every 429 and adds
+    "Global rate limit has been hit" for global ones, so only the first counts.
+    """
+
+    def __init__(self, budget: "RestBudget"):
+        super().__init__()
+        self.budget = budget
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        message = record.getMessage()
+        if "responded with 429" in message:
+            self.budget.record_429(current_lane.get())
+        return True
+
+
+class RestBudget:
+    def __init__(self, metrics, rate: float = REST_BUDGET_PER_SECOND):
+        self.metrics = metrics
+        self.rate = rate
+        self.capacity = rate
+        self.tokens = rate
+        self._updated = time.monotonic()
+
+        metrics.set_gauge("rest.headroom", lambda: round(self.headroom(), 2))
+
+    def install(self, bot) -> None:
+        """Count interactions and attach the 429 filter to discord.py's HTTP logger."""
+        bot.add_listener(self._on_interaction, "on_interaction")
+        logging.getLogger("discord.http").addFilter(RateLimitLogFilter(self))
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def headroom(self) -> float:
+        """Fraction of the bucket that is currently available."""
+        self._refill()
+        return max(self.tokens, 0.0) / self.capacity
+
+    def consume(self, lane: str) -> None:
+        """Take a token without waiting; the bucket may go negative."""
+        self._refill()
+        self.tokens -= 1
+        self.metrics.inc(f"rest.{lane}.requests")
+
+    @asynccontextmanager
+    async def lane(self, lane: str):
+        """Wait until `lane` may spend a token, then run the block as that lane."""
+        started = time.monotonic()
+        floor = self.capacity * LANE_RESERVE[lane]
+        while True:
+            self._refill()
+            if self.tokens - 1 >= floor:
+                break
+            await asyncio.sleep((floor + 1 - self.tokens) / self.rate)
+
+        self.consume(lane)
+        self.metrics.histogram(f"rest.{lane}.wait").observe(time.monotonic() - started)
+
+        token = current_lane.set(lane)
+        try:
+            yield
+        finally:
+            current_lane.reset(token)
+
+    def record_429(self, lane: str) -> None:
+        self.metrics.inc(f"rest.{lane}.429")
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+    async def _on_interaction(self, interaction) -> None:
+        self.consume("interaction")
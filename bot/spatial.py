@@ -0,0 +1,168 @@
+"""Per-world spatial index over village coordinates.
+
+Villages are bucketed in a uniform grid of CELL_SIZE fields, so radius and
+rectangle queries only visit the cells they overlap. Continents (K45 is
+x 500-599, y 400-499) are plain rectangles on the same grid, which is how
+region filters on tracker subscriptions are evaluated.
+"""
+import asyncio
+import math
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import asyncpg
+
+CELL_SIZE = 20
+CONTINENT_SIZE = 100
+MAP_SIZE = 1000
+
+# Seconds a cached index is served before it is rebuilt from village_data_v3.
+INDEX_MAX_AGE = 600
+
+_CONTINENT_RE = re.compile(r"^K(\d)(\d)$")
+_BOX_RE = re.compile(r"^(\d{1,3})\|(\d{1,3})-(\d{1,3})\|(\d{1,3})$")
+
+
+@dataclass(frozen=True)
+class Rect:
+    """Inclusive coordinate box."""
+    x1: int
+    y1: int
+    x2: int
+    y2: int
+
+    def contains(self, x: int, y: int) -> bool:
+        return self.x1 <= x <= self.x2 and self.y1 <= y <= self.y2
+
+
+def continent(x: int, y: int) -> str:
+    return f"K{y // CONTINENT_SIZE}{x // CONTINENT_SIZE}"
+
+
+def continent_rect(name: str) -> Rect:
+    match = _CONTINENT_RE.match(name.upper())
+    if not match:
+        raise ValueError(f"Ongeldig continent `{name}`.")
+    y, x = int(match.group(1)), int(match.group(2))
+    return Rect(x * CONTINENT_SIZE, y * CONTINENT_SIZE, x * CONTINENT_SIZE + CONTINENT_SIZE - 1, y * CONTINENT_SIZE + CONTINENT_SIZE - 1)
+
+
+def parse_regions(text: str) -> Tuple[str, List[Rect]]:
+    """Parse `K45, K46, 400|400-450|450` into (normalized text, rects).
+
+    Raises ValueError with a user-facing message on invalid input.
+    """
+    tokens = [t for t in re.split(r"[,\s]+", text.strip().upper()) if t]
+    if not tokens:
+        raise ValueError("Geen regio opgegeven.")
+
+    rects = []
+    for token in tokens:
+        if token.startswith("K"):
+            rects.append(continent_rect(token))
+            continue
+        match = _BOX_RE.match(token)
+        if not match:
+            raise ValueError(f"Ongeldige regio `{token}`. Gebruik bv. `K45` of `400|400-450|450`.")
+        x1, y1, x2, y2 = (int(g) for g in match.groups())
+        rects.append(Rect(min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)))
+
+    return ",".join(tokens), rects
+
+
+def parse_coords(text: str) -> Tuple[int, int]:
+    match = re.match(r"^\s*(\d{1,3})\|(\d{1,3})\s*$", text)
+    if not match:
+        raise ValueError(f"Ongeldige coördinaten `{text}`. Gebruik bv. `500|500`.")
+    return int(match.group(1)), int(match.group(2))
+
+
+class SpatialIndex:
+    """Uniform grid over one village snapshot; query results are indexes into `villages`."""
+
+    def __init__(self, villages: Sequence[asyncpg.Record]):
+        self.villages = villages
+        self.built_at = time.monotonic()
+        self.cells: Dict[Tuple[int, int], List[int]] = {}
+        for index, village in enumerate(villages):
+            key = (village["x"] // CELL_SIZE, village["y"] // CELL_SIZE)
+            self.cells.setdefault(key, []).append(index)
+
+    def _cells_in(self, rect: Rect):
+        for cx in range(max(rect.x1, 0) // CELL_SIZE, min(rect.x2, MAP_SIZE - 1) // CELL_SIZE + 1):
+            for cy in range(max(rect.y1, 0) // CELL_SIZE, min(rect.y2, MAP_SIZE - 1) // CELL_SIZE + 1):
+                cell = self.cells.get((cx, cy))
+                if cell:
+                    yield cell
+
+    def in_rect(self, rect: Rect) -> List[int]:
+        villages = self.villages
+        return [
+            index
+            for cell in self._cells_in(rect)
+            for index in cell
+            if rect.contains(villages[index]["x"], villages[index]["y"])
+        ]
+
+    def in_regions(self, rects: Sequence[Rect]) -> Set[int]:
+        found: Set[int] = set()
+        for rect in rects:
+            found.update(self.in_rect(rect))
+        return found
+
+    def in_radius(self, x: int, y: int, radius: float) -> List[Tuple[int, float]]:
+        """Return (index, distance) pairs within `radius` fields, nearest first."""
+        box = Rect(math.floor(x - radius), math.floor(y - radius), math.ceil(x + radius), math.ceil(y + radius))
+        found = []
+        for index in self.in_rect(box):
+            village = self.villages[index]
+            distance = math.hypot(village["x"] - x, village["y"] - y)
+            if distance <= radius:
+                found.append((index, distance))
+        found.sort(key=lambda item: item[1])
+        return found
+
+
+class SpatialIndexes:
+    """Per-world SpatialIndex cache shared by the trackers and commands."""
+
+    def __init__(self, pool: asyncpg.Pool, max_age: float = INDEX_MAX_AGE):
+        self.db = pool
+        self.max_age = max_age
+        self._indexes: Dict[str, SpatialIndex] = {}
+        self._building: Dict[str, asyncio.Lock] = {}
+
+    async def put(self, world: str, villages: Sequence[asyncpg.Record]) -> SpatialIndex:
+        """Index a snapshot the caller already fetched (same columns as `get`); built in a thread."""
+        index = await asyncio.to_thread(SpatialIndex, villages)
+        self._indexes[world] = index
+        return index
+
+    def _fresh(self, world: str) -> Optional[SpatialIndex]:
+        index = self._indexes.get(world)
+        if index is not None and time.monotonic() - index.built_at < self.max_age:
+            return index
+        return None
+
+    async def get(self, world: str) -> Optional[SpatialIndex]:
+        index = self._fresh(world)
+        if index is not None:
+            return index
+
+        # Callers racing on a cold world wait for the first build instead of fetching again.
+        async with self._building.setdefault(world, asyncio.Lock()):
+            index = self._fresh(world)
+            if index is not None:
+                return index
+
+            villages = await self.db.fetch("""
+                SELECT village_id, name, x, y, player_id, points
+                FROM village_data_v3
+                WHERE world = $1;
+            """, world)
+            if not villages:
+                self._indexes.pop(world, None)
+                return None
+            return await self.put(world, villages)
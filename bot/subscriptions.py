@@ -0,0 +1,306 @@
+"""Tracker subscriptions held in memory, kept current over NOTIFY.
+
+Statement-level triggers on every subscription table bump a per-table version
+in subscription_versions_v1 and publish the changed rows on
+`tracker_subscriptions_v1`:
+
+    {"v": 1, "table": "...", "version": 42, "removed": [...], "added": [...]}
+
+Every process applies these in order to its copy. A payload that skips a
+version, has no rows (too large for NOTIFY, or a TRUNCATE) or has an unknown
+format makes the process reload that one table, and a periodic version check
+catches notifications lost while the listener was disconnected. Writers only
+touch the tables; direct SQL changes propagate the same way.
+"""
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import asyncpg
+
+from building_rules import RULES
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIPTIONS_CHANNEL = "tracker_subscriptions_v1"
+PAYLOAD_VERSION = 1
+# NOTIFY payloads must stay under 8000 bytes; larger changes only announce their version.
+MAX_PAYLOAD_BYTES = 7500
+VERIFY_SECONDS = 300
+
+# Subscription table -> primary key columns.
+SUBSCRIPTION_TABLES: Dict[str, Tuple[str, ...]] = {
+    "conquer_settings_v2": ("guild_id", "channel_id", "world", "tribe_id"),
+    "odtracker_configs_v2": ("world",),
+    "odtracker_enabled_tribes_v2": ("guild_id", "channel_id", "world", "tribe_tag"),
+    **{rule.table: ("guild_id", "channel_id", "world") for rule in RULES},
+}
+
+# Called with the table and the worlds whose subscriptions changed.
+ChangeCallback = Callable[[str, Set[str]], Awaitable[None]]
+
+
+async def install_subscription_triggers(pool: asyncpg.Pool, tables) -> None:
+    """Publish every change to `tables` on SUBSCRIPTIONS_CHANNEL; skips tables that do not exist yet."""
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext('publish_subscription_change_v1'));")
+
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS subscription_versions_v1 (
+                    table_name TEXT PRIMARY KEY,
+                    version BIGINT NOT NULL
+                );
+            """)
+
+            await conn.execute(f"""
+                CREATE OR REPLACE FUNCTION publish_subscription_change_v1() RETURNS trigger AS $$
+                DECLARE
+                    removed JSONB := '[]'::jsonb;
+                    added JSONB := '[]'::jsonb;
+                    ver BIGINT;
+                    payload TEXT;
+                BEGIN
+                    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                        SELECT COALESCE(jsonb_agg(to_jsonb(o)), '[]'::jsonb) INTO removed FROM old_rows o;
+                    END IF;
+                    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                        SELECT COALESCE(jsonb_agg(to_jsonb(n)), '[]'::jsonb) INTO added FROM new_rows n;
+                    END IF;
+                    -- ON CONFLICT DO NOTHING and empty DELETEs still fire statement triggers.
+                    IF TG_OP <> 'TRUNCATE' AND removed = '[]'::jsonb AND added = '[]'::jsonb THEN
+                        RETURN NULL;
+                    END IF;
+
+                    -- The row lock is held until commit, so versions commit (and notify) in order.
+                    INSERT INTO subscription_versions_v1 (table_name, version)
+                    VALUES (TG_TABLE_NAME, 1)
+                    ON CONFLICT (table_name) DO UPDATE SET version = subscription_versions_v1.version + 1
+                    RETURNING version INTO ver;
+
+                    payload := jsonb_build_object(
+                        'v', {PAYLOAD_VERSION}, 'table', TG_TABLE_NAME, 'version', ver,
+                        'removed', removed, 'added', added
+                    )::text;
+                    IF TG_OP = 'TRUNCATE' OR octet_length(payload) > {MAX_PAYLOAD_BYTES} THEN
+                        payload := jsonb_build_object('v', {PAYLOAD_VERSION}, 'table', TG_TABLE_NAME, 'version', ver)::text;
+                    END IF;
+
+                    PERFORM pg_notify('{SUBSCRIPTIONS_CHANNEL}', payload);
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+            """)
+
+            for table in tables:
+                if await conn.fetchval("SELECT to_regclass($1);", table) is None:
+                    logger.warning(f"[Subscriptions] {table} does not exist; not published")
+                    continue
+
+                for event, referencing in (
+                    ("insert", "REFERENCING NEW TABLE AS new_rows"),
+                    ("update", "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+                    ("delete", "REFERENCING OLD TABLE AS old_rows"),
+                    ("truncate", ""),
+                ):
+                    trigger = f"{table}_publish_{event}"
+                    exists = await conn.fetchval(
+                        "SELECT 1 FROM pg_trigger WHERE tgname = $1 AND tgrelid = $2::regclass;",
+                        trigger, table
+                    )
+                    if exists:
+                        continue
+
+                    await conn.execute(f"""
+                        CREATE TRIGGER {trigger}
+                        AFTER {event.upper()} ON {table}
+                        {referencing}
+                        FOR EACH STATEMENT EXECUTE FUNCTION publish_subscription_change_v1();
+                    """)
+
+
+@dataclass
+class SubscriptionTable:
+    name: str
+    key: Tuple[str, ...]
+    version: int = 0
+    loaded: bool = False
+    rows: Dict[tuple, dict] = field(default_factory=dict)
+    by_world: Dict[str, Dict[tuple, dict]] = field(default_factory=dict)
+
+    def key_of(self, row: dict) -> tuple:
+        return tuple(row[column] for column in self.key)
+
+    def add(self, row: dict) -> None:
+        key = self.key_of(row)
+        self.rows[key] = row
+        self.by_world.setdefault(row["world"], {})[key] = row
+
+    def remove(self, row: dict) -> None:
+        key = self.key_of(row)
+        self.rows.pop(key, None)
+        world_rows = self.by_world.get(row["world"])
+        if world_rows is not None:
+            world_rows.pop(key, None)
+            if not world_rows:
+                del self.by_world[row["world"]]
+
+    def replace(self, rows: List[dict], version: int) -> None:
+        self.rows.clear()
+        self.by_world.clear()
+        for row in rows:
+            self.add(row)
+        self.version = version
+        self.loaded = True
+
+
+class SubscriptionBus:
+    """In-memory copy of every subscription table, updated from NOTIFY."""
+
+    def __init__(self, pool: asyncpg.Pool, listener, verify_interval: float = VERIFY_SECONDS):
+        self.db = pool
+        self.listener = listener
+        self.verify_interval = verify_interval
+        self.tables = {name: SubscriptionTable(name, key) for name, key in SUBSCRIPTION_TABLES.items()}
+        self._callbacks: Dict[str, List[ChangeCallback]] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+
+    # ---------------------- Queries ---------------------- #
+
+    def rows(self, table: str, world: Optional[str] = None) -> List[dict]:
+        state = self.tables[table]
+        if world is None:
+            return list(state.rows.values())
+        return list(state.by_world.get(world, {}).values())
+
+    def worlds(self, table: str) -> Set[str]:
+        return set(self.tables[table].by_world)
+
+    def subscribe(self, callback: ChangeCallback, *tables: str) -> None:
+        for table in tables:
+            callbacks = self._callbacks.setdefault(table, [])
+            if callback not in callbacks:
+                callbacks.append(callback)
+
+    def unsubscribe(self, callback: ChangeCallback) -> None:
+        for callbacks in self._callbacks.values():
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    # ---------------------- Lifecycle ---------------------- #
+
+    async def start(self) -> None:
+        """Install the triggers, then load every table; call once the cogs created their tables."""
+        await install_subscription_triggers(self.db, self.tables)
+        # Listen before loading so nothing committed in between is missed; older versions are skipped.
+        await self.listener.listen(SUBSCRIPTIONS_CHANNEL, self._on_notify, coalesce=False)
+
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._consume()), loop.create_task(self._verify_loop())]
+        for table in self.tables:
+            await self._queue.put(("reload", table))
+        await self._queue.join()
+        logger.info(f"[Subscriptions] Loaded {sum(len(t.rows) for t in self.tables.values())} subscriptions")
+
+    async def sync(self) -> None:
+        """Wait until everything committed so far has been applied."""
+        await self._queue.put(("verify", None))
+        await self._queue.join()
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        await self.listener.unlisten(SUBSCRIPTIONS_CHANNEL, self._on_notify)
+
+    async def _on_notify(self, channel: str, payload: str) -> None:
+        # An empty payload comes from a listener reconnect: something may have been missed.
+        await self._queue.put(("payload", payload) if payload else ("verify", None))
+
+    async def _verify_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.verify_interval)
+            await self._queue.put(("verify", None))
+
+    async def _consume(self) -> None:
+        """Applies changes one at a time, so a reload never interleaves with an incremental update."""
+        while True:
+            kind, value = await self._queue.get()
+            try:
+                if kind == "payload":
+                    await self._apply(value)
+                elif kind == "reload":
+                    await self._reload(value)
+                else:
+                    await self._verify()
+            except Exception:
+                logger.exception(f"[Subscriptions] Applying {kind} failed")
+            finally:
+                self._queue.task_done()
+
+    # ---------------------- Changes ---------------------- #
+
+    async def _apply(self, payload: str) -> None:
+        message = json.loads(payload)
+        table = message.get("table")
+        state = self.tables.get(table)
+        if state is None:
+            return
+        if message.get("v") != PAYLOAD_VERSION:
+            await self._reload(table)
+            return
+
+        version = message["version"]
+        if version <= state.version:
+            return
+        if version != state.version + 1 or "added" not in message:
+            await self._reload(table)
+            return
+
+        worlds = set()
+        for row in message["removed"]:
+            state.remove(row)
+            worlds.add(row["world"])
+        for row in message["added"]:
+            state.add(row)
+            worlds.add(row["world"])
+        state.version = version
+
+        await self._notify(table, worlds)
+
+    async def _reload(self, table: str) -> None:
+        state = self.tables[table]
+        try:
+            async with self.db.acquire() as conn:
+                # One snapshot for the rows and the version they correspond to.
+                async with conn.transaction(isolation="repeatable_read", readonly=True):
+                    version = await conn.fetchval(
+                        "SELECT version FROM subscription_versions_v1 WHERE table_name = $1;", table
+                    ) or 0
+                    rows = await conn.fetch(f"SELECT * FROM {table};")
+        except asyncpg.UndefinedTableError:
+            return
+
+        before = set(state.by_world)
+        state.replace([dict(row) for row in rows], version)
+        await self._notify(table, before | set(state.by_world))
+
+    async def _verify(self) -> None:
+        versions = {
+            row["table_name"]: row["version"]
+            for row in await self.db.fetch("SELECT table_name, version FROM subscription_versions_v1;")
+        }
+        for table, state in self.tables.items():
+            if not state.loaded or versions.get(table, 0) != state.version:
+                logger.info(f"[Subscriptions] {table} is behind, reloading")
+                await self._reload(table)
+
+    async def _notify(self, table: str, worlds: Set[str]) -> None:
+        for callback in list(self._callbacks.get(table, [])):
+            try:
+                await callback(table, worlds)
+            except Exception:
+                logger.exception(f"[Subscriptions] Callback for {table} failed")
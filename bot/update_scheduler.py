@@ -0,0 +1,131 @@
+import random
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Deque, Dict, Optional, Tuple
+
+# Caps 2 ** misses: past this the backoff is at max_interval anyway, and an
+# ended world keeps missing forever, which would overflow the float.
+MAX_BACKOFF_EXPONENT = 16
+
+
+def parse_http_date(value: Optional[str]) -> Optional[float]:
+    """Convert an HTTP date header (e.g. Last-Modified) to a unix timestamp."""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class EndpointPolicy:
+    min_interval: float
+    max_interval: float
+    grace: float = 5.0
+    jitter: float = 0.1
+
+
+@dataclass
+class EndpointState:
+    last_modified: Optional[float] = None
+    last_change: Optional[float] = None
+    intervals: Deque[float] = field(default_factory=lambda: deque(maxlen=12))
+    misses: int = 0
+    next_due: float = 0.0
+
+
+class UpdateScheduler:
+    """Learns when upstream data changes per (world, endpoint) and polls just after.
+
+    Cogs call `is_due` before hitting an endpoint and `record` afterwards. Once two
+    changes have been seen the median interval is used to predict the next
+    regeneration; until then, and whenever a prediction turns out to be early,
+    the poll interval doubles from `min_interval` up to `max_interval`.
+    """
+
+    def __init__(self):
+        self.policies: Dict[str, EndpointPolicy] = {}
+        self.states: Dict[Tuple[str, str], EndpointState] = {}
+
+    def register(self, endpoint: str, min_interval: float, max_interval: float, grace: float = 5.0, jitter: float = 0.1) -> None:
+        self.policies[endpoint] = EndpointPolicy(min_interval, max_interval, grace, jitter)
+
+    def _state(self, world: str, endpoint: str) -> EndpointState:
+        return self.states.setdefault((world, endpoint), EndpointState())
+
+    def is_due(self, world: str, endpoint: str, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return now >= self._state(world, endpoint).next_due
+
+    def request_headers(self, world: str, endpoint: str) -> Dict[str, str]:
+        """Conditional request headers based on the last seen Last-Modified."""
+        state = self._state(world, endpoint)
+        if state.last_modified is None:
+            return {}
+        return {"If-Modified-Since": formatdate(state.last_modified, usegmt=True)}
+
+    def period(self, world: str, endpoint: str) -> Optional[float]:
+        state = self._state(world, endpoint)
+        if len(state.intervals) < 2:
+            return None
+        return statistics.median(state.intervals)
+
+    def predict_next(self, world: str, endpoint: str, now: Optional[float] = None) -> Optional[float]:
+        """Predicted time of the next upstream change, or None without enough history."""
+        now = time.time() if now is None else now
+        state = self._state(world, endpoint)
+        period = self.period(world, endpoint)
+        if period is None or state.last_change is None:
+            return None
+
+        predicted = state.last_change + period
+        if predicted <= now:
+            predicted += period * ((now - predicted) // period + 1)
+        return predicted
+
+    def record(
+        self,
+        world: str,
+        endpoint: str,
+        changed: bool,
+        last_modified: Optional[float] = None,
+        now: Optional[float] = None
+    ) -> float:
+        """Record the outcome of a poll and return when the next one is due."""
+        now = time.time() if now is None else now
+        policy = self.policies.get(endpoint) or EndpointPolicy(60.0, 60.0)
+        state = self._state(world, endpoint)
+
+        if changed:
+            change_ts = last_modified if last_modified is not None else now
+            if state.last_change is not None and change_ts > state.last_change:
+                state.intervals.append(change_ts - state.last_change)
+            state.last_change = change_ts
+            state.last_modified = last_modified
+            state.misses = 0
+        else:
+            state.misses += 1
+
+        backoff = min(policy.min_interval * (2 ** min(state.misses, MAX_BACKOFF_EXPONENT)), policy.max_interval)
+        predicted = self.predict_next(world, endpoint, now)
+
+        if predicted is None:
+            delay = backoff
+        elif changed:
+            delay = predicted - now + policy.grace
+        else:
+            # Upstream is late: retry soon, but never later than the next prediction.
+            delay = min(
+                policy.min_interval * (2 ** min(state.misses - 1, MAX_BACKOFF_EXPONENT)),
+                predicted - now + policy.grace
+            )
+
+        delay = min(max(delay, policy.grace), policy.max_interval)
+        delay *= 1 + random.uniform(0, policy.jitter)
+
+        state.next_due = now + delay
+        return state.next_due
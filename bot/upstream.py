@@ -0,0 +1,24 @@
+"""Base URLs of the upstream data sources.
+
+Every tracker builds its data URLs here instead of hardcoding the live
+hosts, so a run can be pointed at tools/stub_server.py and replay recorded
+responses offline:
+
+    TW_BASE_URL=http://127.0.0.1:8765/{world}
+    MAP_API_BASE_URL=http://127.0.0.1:8765/map-api
+
+Links shown to users (game.php, public reports) always stay on the live hosts.
+"""
+import os
+
+TW_BASE_URL = os.getenv("TW_BASE_URL", "https://{world}.tribalwars.nl")
+MAP_API_BASE_URL = os.getenv("MAP_API_BASE_URL", "https://dkspeed2.jrsoft.tech")
+
+
+def world_url(world: str, path: str) -> str:
+    """URL of `path` (e.g. "map/kill_att.txt") on a world's game server."""
+    return f"{TW_BASE_URL.format(world=world).rstrip('/')}/{path.lstrip('/')}"
+
+
+def map_api_url(path: str) -> str:
+    return f"{MAP_API_BASE_URL.rstrip('/')}/{path.lstrip('/')}"
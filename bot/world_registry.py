@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+import aiohttp
+import asyncpg
+
+from upstream import map_api_url, world_url
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_REFRESH_SECONDS = 600
+# World settings hardly ever change; get_config is re-read this rarely.
+CONFIG_MAX_AGE = 6 * 3600
+CONFIG_CONCURRENCY = 4
+
+# Capabilities and the source that grants them.
+MAP_API = "map_api"            # dkspeed2 map API
+PLAYER_DATA = "player_data"    # playerdata_worlds
+VILLAGE_DATA = "village_data"  # villagedata_worlds
+OD_TRACKED = "od_tracked"      # odtracker_configs_v2, via the subscription bus
+
+DB_SOURCES = {
+    PLAYER_DATA: "SELECT world FROM playerdata_worlds;",
+    VILLAGE_DATA: "SELECT world FROM villagedata_worlds;",
+}
+
+
+@dataclass
+class WorldInfo:
+    world: str
+    capabilities: Set[str] = field(default_factory=set)
+    # From interface.php?func=get_config; None until it has been read.
+    speed: Optional[float] = None
+    unit_speed: Optional[float] = None
+    # "active" once get_config answered, "closed" when the world no longer serves it.
+    status: str = "unknown"
+    config_at: float = 0.0
+
+
+def parse_world_config(body: bytes) -> Dict[str, float]:
+    """Read speed and unit_speed from a get_config XML document."""
+    root = ET.fromstring(body)
+    config = {}
+    for key in ("speed", "unit_speed"):
+        node = root.find(key)
+        if node is not None and node.text:
+            config[key] = float(node.text)
+    return config
+
+
+class WorldRegistry:
+    """Every known world with its capabilities and settings, held in memory.
+
+    Cogs query it synchronously; a background task re-reads the world tables
+    and the map API every REGISTRY_REFRESH_SECONDS and get_config per world
+    every CONFIG_MAX_AGE. Writers of a source table call `set_capability`
+    so their own process does not wait for the next refresh; OD_TRACKED
+    follows the subscription bus instead.
+    """
+
+    def __init__(self, pool: asyncpg.Pool, interval: float = REGISTRY_REFRESH_SECONDS):
+        self.db = pool
+        self.interval = interval
+        self.worlds: Dict[str, WorldInfo] = {}
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ---------------------- Queries ---------------------- #
+
+    def get(self, world: str) -> Optional[WorldInfo]:
+        return self.worlds.get(world)
+
+    def has(self, world: str, capability: str) -> bool:
+        info = self.worlds.get(world)
+        return info is not None and capability in info.capabilities
+
+    def all(self, capability: Optional[str] = None) -> List[str]:
+        """Sorted worlds with `capability`, leaving out closed worlds."""
+        return sorted(
+            w for w, info in self.worlds.items()
+            if info.status != "closed" and (capability is None or capability in info.capabilities)
+        )
+
+    def matching(self, current: str, capability: Optional[str] = None, limit: int = 25) -> List[str]:
+        """Autocomplete helper: worlds containing `current`."""
+        current = current.lower()
+        return [w for w in self.all(capability) if current in w.lower()][:limit]
+
+    def set_capability(self, world: str, capability: str, enabled: bool) -> None:
+        if enabled:
+            self.worlds.setdefault(world, WorldInfo(world)).capabilities.add(capability)
+        elif world in self.worlds:
+            self.worlds[world].capabilities.discard(capability)
+
+    def follow(self, subscriptions) -> None:
+        """Keep OD_TRACKED equal to the worlds in odtracker_configs_v2, in every process."""
+        async def on_change(table: str, worlds: Set[str]) -> None:
+            self._replace_capability(OD_TRACKED, subscriptions.worlds(table))
+
+        subscriptions.subscribe(on_change, "odtracker_configs_v2")
+
+    # ---------------------- Refresh ---------------------- #
+
+    async def start(self) -> None:
+        """Load the DB sources now; the map API and configs follow in the background."""
+        await self.refresh_tables()
+        self._task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("[WorldRegistry] Refresh failed")
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self) -> None:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=20))
+
+        await self.refresh_tables()
+        await self.refresh_map_api()
+        await self.refresh_configs()
+
+    def _replace_capability(self, capability: str, worlds: Set[str]) -> None:
+        for world in worlds:
+            self.worlds.setdefault(world, WorldInfo(world)).capabilities.add(capability)
+        for world, info in self.worlds.items():
+            if world not in worlds:
+                info.capabilities.discard(capability)
+
+    async def refresh_tables(self) -> None:
+        for capability, query in DB_SOURCES.items():
+            try:
+                rows = await self.db.fetch(query)
+            except asyncpg.UndefinedTableError:
+                # Created by the cog that owns it; picked up on the next refresh.
+                continue
+            self._replace_capability(capability, {r["world"] for r in rows if r["world"]})
+
+    async def refresh_map_api(self) -> None:
+        try:
+            async with self.session.get(map_api_url("api/worlds")) as response:
+                if response.status != 200:
+                    logger.error(f"[WorldRegistry] Map API worlds: HTTP {response.status}")
+                    return
+                worlds = await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"[WorldRegistry] Map API worlds: {e}")
+            return
+
+        self._replace_capability(MAP_API, {w for w in worlds if isinstance(w, str)})
+
+    async def refresh_configs(self) -> None:
+        now = time.time()
+        stale = [
+            info for info in self.worlds.values()
+            if info.capabilities - {MAP_API} and now - info.config_at >= CONFIG_MAX_AGE
+        ]
+        semaphore = asyncio.Semaphore(CONFIG_CONCURRENCY)
+
+        async def fetch(info: WorldInfo) -> None:
+            async with semaphore:
+                await self.refresh_config(info)
+
+        await asyncio.gather(*(fetch(info) for info in stale))
+
+    async def refresh_config(self, info: WorldInfo) -> None:
+        url = world_url(info.world, "interface.php?func=get_config")
+        try:
+            async with self.session.get(url) as response:
+                if response.status != 200:
+                    info.status = "closed" if response.status in (403, 404) else info.status
+                    info.config_at = time.time()
+                    return
+                config = parse_world_config(await response.read())
+        except (aiohttp.ClientError, asyncio.TimeoutError, ET.ParseError, ValueError) as e:
+            logger.warning(f"[WorldRegistry] get_config {info.world}: {e}")
+            return
+
+        info.speed = config.get("speed")
+        info.unit_speed = config.get("unit_speed")
+        info.status = "active"
+        info.config_at = time.time()
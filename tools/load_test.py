@@ -0,0 +1,463 @@
+"""Load test for tracker notifications with thousands of subscribed channels.
+
+Fills conquer_settings_v2, odtracker_enabled_tribes_v2 and the building rule
+tables with synthetic guilds and channels for one world, waits until the
+subscription bus has picked them up, then drives bursts
+of conquers, OD increases and building matches through the real cog code
+(ConquerTracker.route_conquer, ODTracker.increase_events,
+BuildingTracker.notify_matches) into tracker_events_v1. Drainers run
+EventQueue.drain against a fake Discord transport that records every send
+and answers 429 once a channel or the global limit is exceeded, so the REST
+budget and the outbox retries behave as they do live.
+
+Reports detection time per burst, end-to-end throughput, outbox depth and
+per-event queue-to-send latency percentiles.
+
+Run it against a scratch copy of the database that has world data
+(village_data_v3, player_data_v3, ally_data_v3) for --world, never against
+production: a running bot would pick up the synthetic subscriptions. All
+synthetic rows use ids from SYNTHETIC_ID_BASE up and are removed afterwards
+unless --keep is given. config.py has to be importable, as for the bot.
+
+    python tools/load_test.py --database-url postgres://localhost/twbot_copy \\
+        --world nl99 --channels 2000 --bursts 3 --conquers 200 --od 500 --buildings 300
+
+--smoke runs a few channels through one small burst and exits 1 unless
+they were subscribed and every queued event was sent.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "bot"))
+os.environ.setdefault("DISCORD_APPLICATION_ID", "0")
+
+import asyncpg
+import discord
+
+from building_rules import RULES
+from cache_registry import CacheRegistry
+from cpu_jobs import pack, unpack
+from event_queue import EventQueue
+from metrics import Metrics
+from pg_listener import PgListener
+from rest_budget import RestBudget
+from spatial import SpatialIndex
+from subscriptions import SubscriptionBus
+from update_scheduler import UpdateScheduler
+from cogs.BuildingTracker_cog import BuildingTracker
+from cogs.ConquerTracker_cog import ConquerTracker, NotificationBatch
+from cogs.ODTrackerv2_cog import KILL_TYPES, ODTracker
+
+logger = logging.getLogger("load_test")
+
+# Synthetic guild and channel ids start here; real snowflakes stay far below it.
+SYNTHETIC_ID_BASE = 9_000_000_000_000_000_000
+
+# Discord allows about 5 messages per 5 seconds in one channel.
+CHANNEL_LIMIT = 5
+CHANNEL_WINDOW = 5.0
+
+# Outbox source of the event a drainer task is delivering.
+delivering_source: ContextVar[str] = ContextVar("delivering_source", default="unknown")
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class FakeTransport:
+    """Stands in for Discord: records sends and answers 429 like the real limits."""
+
+    def __init__(self, latency: float, jitter: float, global_rate: float, seed: int):
+        self.latency = latency
+        self.jitter = jitter
+        self.global_rate = global_rate
+        self.random = random.Random(seed)
+        self.sent: Dict[str, int] = {}
+        self.rate_limited = 0
+        self.latencies: Dict[str, List[float]] = {}
+        self.first_send: Optional[float] = None
+        self.last_send: Optional[float] = None
+        self._channel_sends: Dict[int, List[float]] = {}
+        self._global_tokens = global_rate
+        self._global_updated = time.monotonic()
+
+    def _rate_limited(self, channel_id: int) -> bool:
+        now = time.monotonic()
+        self._global_tokens = min(self.global_rate, self._global_tokens + (now - self._global_updated) * self.global_rate)
+        self._global_updated = now
+        if self._global_tokens < 1:
+            return True
+
+        recent = [t for t in self._channel_sends.get(channel_id, ()) if now - t < CHANNEL_WINDOW]
+        self._channel_sends[channel_id] = recent
+        if len(recent) >= CHANNEL_LIMIT:
+            return True
+
+        self._global_tokens -= 1
+        recent.append(now)
+        return False
+
+    async def send(self, channel_id: int, embed: discord.Embed, source: str) -> None:
+        await asyncio.sleep((self.latency + self.random.uniform(0, self.jitter)) / 1000)
+
+        if self._rate_limited(channel_id):
+            self.rate_limited += 1
+            # Logged like discord.http does, so RestBudget's filter counts it for the current lane.
+            logging.getLogger("discord.http").warning(
+                f"We are being rate limited. POST /channels/{channel_id}/messages responded with 429."
+            )
+            raise discord.HTTPException(SimpleNamespace(status=429, reason="Too Many Requests"), "rate limited")
+
+        now = time.time()
+        self.sent[source] = self.sent.get(source, 0) + 1
+        if embed.timestamp is not None:
+            self.latencies.setdefault(source, []).append(now - embed.timestamp.timestamp())
+        self.first_send = self.first_send or now
+        self.last_send = now
+
+
+class FakeChannel:
+    def __init__(self, transport: FakeTransport, channel_id: int):
+        self.transport = transport
+        self.id = channel_id
+
+    async def send(self, embed: discord.Embed) -> None:
+        await self.transport.send(self.id, embed, delivering_source.get())
+
+
+class StampingEventQueue(EventQueue):
+    """EventQueue that stamps the queue time into each embed, to measure queue-to-send latency."""
+
+    async def append(self, events, conn=None) -> int:
+        now = datetime.now(timezone.utc)
+        for event in events:
+            if event.embed.timestamp is None:
+                event.embed.timestamp = now
+        return await super().append(events, conn)
+
+    async def deliver(self, channel_id: int, embed: discord.Embed, source: str) -> tuple:
+        delivering_source.set(source)
+        return await super().deliver(channel_id, embed, source)
+
+
+class HarnessBot:
+    """The attributes the trackers and the outbox use, without a gateway connection."""
+
+    def __init__(self, pool: asyncpg.Pool, dsn: str, transport: FakeTransport):
+        self.db = pool
+        self.transport = transport
+        self.metrics = Metrics()
+        self.caches = CacheRegistry()
+        self.pg_listener = PgListener(dsn)
+        self.update_scheduler = UpdateScheduler()
+        self.subscriptions = SubscriptionBus(pool, self.pg_listener)
+        self.events = StampingEventQueue(self, pool)
+        self.rest_budget = RestBudget(self.metrics)
+        self.rest_budget.install(self)
+
+    def add_listener(self, func, name: str) -> None:
+        pass
+
+    def is_ready(self) -> bool:
+        # Keeps the trackers' refresh listeners from starting real scans during the run.
+        return False
+
+    def get_channel(self, channel_id: int) -> FakeChannel:
+        return FakeChannel(self.transport, channel_id)
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace, bot: HarnessBot):
+        self.args = args
+        self.bot = bot
+        self.db = bot.db
+        self.random = random.Random(args.seed)
+        self.conquer = ConquerTracker(bot)
+        self.od = ODTracker(bot)
+        self.buildings = BuildingTracker(bot)
+        self.detection: Dict[str, List[float]] = {}
+        self.depth: List[tuple] = []
+        self.done = asyncio.Event()
+
+    # ---------------------- Setup ---------------------- #
+
+    async def setup(self) -> None:
+        await self.bot.pg_listener.start()
+        await self.bot.events.create_tables()
+        await self.conquer.create_tables()
+        await self.od.cog_load()
+        await self.buildings.cog_load()
+        await self.bot.subscriptions.start()
+        await self.cleanup()
+
+        world = self.args.world
+        self.tribes = await self.db.fetch("""
+            SELECT tribe_id, tag FROM ally_data_v3 WHERE world = $1 ORDER BY tribe_id LIMIT $2;
+        """, world, self.args.tribes)
+        self.villages = await self.db.fetch("""
+            SELECT village_id, name, x, y, player_id, points FROM village_data_v3 WHERE world = $1;
+        """, world)
+        self.players = await self.db.fetch("""
+            SELECT player_id, tribe_id FROM player_data_v3
+            WHERE world = $1 AND tribe_id = ANY($2::BIGINT[]);
+        """, world, [t["tribe_id"] for t in self.tribes])
+        if not self.tribes or not self.villages or not self.players:
+            raise SystemExit(f"No ally, village or player data for world {world}")
+
+        channels, conquer_rows, od_rows, building_rows = self.synthetic_subscriptions(world)
+        async with self.db.acquire() as conn:
+            await conn.copy_records_to_table(
+                "conquer_settings_v2", records=conquer_rows,
+                columns=("guild_id", "channel_id", "world", "tribe_id", "starting_unix_timestamp", "digest")
+            )
+            await conn.copy_records_to_table(
+                "odtracker_enabled_tribes_v2", records=od_rows,
+                columns=("guild_id", "channel_id", "world", "tribe_tag", "min_threshold")
+            )
+            for rule in RULES:
+                await conn.copy_records_to_table(rule.table, records=building_rows, columns=("guild_id", "channel_id", "world"))
+
+        # The trackers route from the subscription bus; the COPYs are too large for NOTIFY and arrive as reloads.
+        await self.bot.subscriptions.sync()
+
+        print(
+            f"Subscribed {len(channels)} channels in {-(-len(channels) // self.args.channels_per_guild)} guilds "
+            f"over {len(self.tribes)} tribes of {world}"
+        )
+
+    def synthetic_subscriptions(self, world: str) -> tuple:
+        """Channel ids plus the conquer, OD and building rows that subscribe them."""
+        channels, conquer_rows, od_rows, building_rows = [], [], [], []
+        for i in range(self.args.channels):
+            guild_id = SYNTHETIC_ID_BASE + i // self.args.channels_per_guild
+            channel_id = SYNTHETIC_ID_BASE + i
+            tribe = self.random.choice(self.tribes)
+            conquer_rows.append((guild_id, channel_id, world, tribe["tribe_id"], 0, self.random.random() < self.args.digest_share))
+            od_rows.append((guild_id, channel_id, world, tribe["tag"], self.random.choice((0, 0, 1000, 10000))))
+            building_rows.append((guild_id, channel_id, world))
+            channels.append(channel_id)
+        return channels, conquer_rows, od_rows, building_rows
+
+    async def cleanup(self) -> None:
+        tables = ["conquer_settings_v2", "odtracker_enabled_tribes_v2", "conquer_messages_v2"] + [r.table for r in RULES]
+        async with self.db.acquire() as conn:
+            for table in tables:
+                await conn.execute(f"DELETE FROM {table} WHERE guild_id >= $1;", SYNTHETIC_ID_BASE)
+            await conn.execute("DELETE FROM tracker_events_v1 WHERE channel_id >= $1;", SYNTHETIC_ID_BASE)
+
+    # ---------------------- Bursts ---------------------- #
+
+    async def conquer_burst(self, burst: int) -> None:
+        world = self.args.world
+        tracking_channels = self.bot.subscriptions.rows("conquer_settings_v2", world)
+
+        # Unix seconds, as in conquer.txt; one per conquer keeps the outbox dedup keys apart within a run.
+        base_ts = int(time.time()) + burst * self.args.conquers
+        batch = NotificationBatch()
+        for i in range(self.args.conquers):
+            village = self.random.choice(self.villages)
+            new_owner = self.random.choice(self.players)
+            old_owner = self.random.choice(self.players) if self.random.random() < 0.7 else None
+            await self.conquer.route_conquer(
+                world, tracking_channels, batch,
+                village["village_id"], base_ts + i,
+                new_owner["player_id"], new_owner["tribe_id"],
+                old_owner["player_id"] if old_owner else 0, old_owner["tribe_id"] if old_owner else 0
+            )
+        await self.conquer.flush_notifications(world, batch)
+
+    async def od_burst(self, burst: int) -> None:
+        async with self.db.acquire() as conn, conn.transaction():
+            events = []
+            for _ in range(self.args.od):
+                player = self.random.choice(self.players)
+                key = self.random.choice(list(KILL_TYPES))
+                old = self.random.randint(0, 1_000_000)
+                delta = self.random.randint(1, 50_000)
+                increases = {key: {"delta": delta, "old": old, "new": old + delta}}
+                events.extend(await self.od.increase_events(conn, self.args.world, player["player_id"], increases))
+            await self.bot.events.append(events, conn)
+
+    async def building_burst(self, burst: int) -> None:
+        index = SpatialIndex(self.villages)
+        matches = []
+        for _ in range(self.args.buildings):
+            rule_index = self.random.randrange(len(RULES))
+            rule = RULES[rule_index]
+            village_index = self.random.randrange(len(self.villages))
+            level = self.random.choice([level for level in rule.deltas.values()])
+            matches.extend((village_index, self.villages[village_index]["points"], rule_index, -1 if level is None else level))
+        await self.buildings.notify_matches(self.args.world, index, unpack(pack(matches)))
+
+    async def run_bursts(self) -> None:
+        drivers = {
+            "conquer": (self.conquer_burst, self.args.conquers),
+            "od": (self.od_burst, self.args.od),
+            "buildings": (self.building_burst, self.args.buildings),
+        }
+        for burst in range(self.args.bursts):
+            for name, (driver, size) in drivers.items():
+                if not size:
+                    continue
+                started = time.perf_counter()
+                await driver(burst)
+                self.detection.setdefault(name, []).append(time.perf_counter() - started)
+            await asyncio.sleep(self.args.burst_interval)
+
+    # ---------------------- Delivery ---------------------- #
+
+    async def pending(self) -> int:
+        return await self.db.fetchval("""
+            SELECT COUNT(*) FROM tracker_events_v1 WHERE status = 'pending' AND channel_id >= $1;
+        """, SYNTHETIC_ID_BASE)
+
+    async def drainer(self) -> None:
+        while not self.done.is_set():
+            try:
+                if await self.bot.events.drain(self.args.batch_size) == 0:
+                    await asyncio.sleep(0.05)
+            except Exception as e:
+                logger.error(f"Drain failed: {e}")
+                await asyncio.sleep(1)
+
+    async def sample_depth(self, started: float) -> None:
+        while not self.done.is_set():
+            self.depth.append((time.perf_counter() - started, await self.pending()))
+            await asyncio.sleep(self.args.sample_interval)
+
+    async def run(self) -> None:
+        started = time.perf_counter()
+        drainers = [asyncio.create_task(self.drainer()) for _ in range(self.args.drainers)]
+        sampler = asyncio.create_task(self.sample_depth(started))
+
+        await self.run_bursts()
+        bursts_done = time.perf_counter()
+
+        deadline = bursts_done + self.args.timeout
+        while await self.pending() and time.perf_counter() < deadline:
+            await asyncio.sleep(0.5)
+
+        self.done.set()
+        await asyncio.gather(*drainers, sampler)
+        self.report(time.perf_counter() - started, bursts_done - started)
+
+    async def smoke_failures(self) -> List[str]:
+        """What a --smoke run expects: every channel subscribed, events queued and all of them sent."""
+        failures = []
+        subscribed = len(self.bot.subscriptions.rows("conquer_settings_v2", self.args.world))
+        if subscribed < self.args.channels:
+            failures.append(f"{subscribed} of {self.args.channels} conquer subscriptions reached the bus")
+        if not sum(self.bot.transport.sent.values()):
+            failures.append("no message was sent")
+        pending = await self.pending()
+        if pending:
+            failures.append(f"{pending} events still pending")
+        return failures
+
+    # ---------------------- Report ---------------------- #
+
+    def report(self, elapsed: float, burst_time: float) -> None:
+        transport = self.bot.transport
+        total_sent = sum(transport.sent.values())
+        send_window = (transport.last_send - transport.first_send) if transport.first_send else 0.0
+
+        print(f"\n=== {self.args.channels} channels, {self.args.bursts} bursts, {elapsed:.1f}s ({burst_time:.1f}s detecting) ===")
+        for name, times in self.detection.items():
+            print(f"detect {name:<9} p50={percentile(times, 50) * 1000:.0f}ms max={max(times) * 1000:.0f}ms")
+
+        print(f"sent {total_sent} messages, {transport.rate_limited} answered 429")
+        if send_window:
+            print(f"throughput {total_sent / send_window:.1f} msg/s over {send_window:.1f}s")
+        for source in sorted(transport.latencies):
+            values = transport.latencies[source]
+            print(
+                f"latency {source:<8} n={len(values)} p50={percentile(values, 50):.2f}s "
+                f"p95={percentile(values, 95):.2f}s p99={percentile(values, 99):.2f}s max={max(values):.2f}s"
+            )
+
+        if self.depth:
+            peak_at, peak = max(self.depth, key=lambda sample: sample[1])
+            print(f"queue depth peak {peak} at {peak_at:.1f}s, final {self.depth[-1][1]}")
+
+        print("\n" + self.bot.metrics.render())
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("LOADTEST_DATABASE_URL"), required=not os.getenv("LOADTEST_DATABASE_URL"))
+    parser.add_argument("--world", required=True, help="world whose village, player and ally data is used")
+    parser.add_argument("--channels", type=int, default=2000)
+    parser.add_argument("--channels-per-guild", type=int, default=4)
+    parser.add_argument("--tribes", type=int, default=20, help="tracked tribes the channels are spread over")
+    parser.add_argument("--digest-share", type=float, default=0.1, help="fraction of conquer subscriptions in digest mode")
+    parser.add_argument("--bursts", type=int, default=3)
+    parser.add_argument("--burst-interval", type=float, default=5.0)
+    parser.add_argument("--conquers", type=int, default=200, help="conquers per burst")
+    parser.add_argument("--od", type=int, default=500, help="OD increases per burst")
+    parser.add_argument("--buildings", type=int, default=300, help="building matches per burst")
+    parser.add_argument("--drainers", type=int, default=1, help="concurrent outbox drainers, as with several gateway processes")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=80.0, help="fake Discord latency per send in ms")
+    parser.add_argument("--jitter", type=float, default=40.0)
+    parser.add_argument("--global-rate", type=float, default=50.0, help="fake Discord global limit per second")
+    parser.add_argument("--timeout", type=float, default=600.0, help="seconds to wait for the outbox to empty after the bursts")
+    parser.add_argument("--sample-interval", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep", action="store_true", help="leave the synthetic rows in place")
+    parser.add_argument("--smoke", action="store_true", help="tiny run that exits 1 unless every step worked; run it before committing harness changes")
+    args = parser.parse_args()
+    if args.smoke:
+        args.channels, args.channels_per_guild, args.tribes = 20, 4, 3
+        args.bursts, args.burst_interval, args.conquers, args.od, args.buildings = 1, 0.0, 10, 10, 10
+        args.timeout = 60.0
+    return args
+
+
+async def main() -> None:
+    logging.basicConfig(level=logging.WARNING)
+    args = parse_args()
+
+    pool = await asyncpg.create_pool(args.database_url, max_size=max(10, args.drainers + 4))
+    transport = FakeTransport(args.latency, args.jitter, args.global_rate, args.seed)
+    bot = HarnessBot(pool, args.database_url, transport)
+    test = LoadTest(args, bot)
+
+    failures = []
+    try:
+        await test.setup()
+        await test.run()
+        if args.smoke:
+            failures = await test.smoke_failures()
+    finally:
+        if not args.keep:
+            await test.cleanup()
+        await test.od.cog_unload()
+        await test.buildings.cog_unload()
+        await bot.subscriptions.close()
+        await bot.pg_listener.close()
+        await pool.close()
+
+    if args.smoke:
+        for failure in failures:
+            print(f"SMOKE FAIL: {failure}")
+        if failures:
+            sys.exit(1)
+        print("SMOKE OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
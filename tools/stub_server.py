@@ -0,0 +1,216 @@
+"""Local stand-in for the game servers and the map API.
+
+Serves recorded responses from a fixtures directory, with configurable
+latency, error rate and payload size, so trackers and benchmarks run
+offline and repeatably. Point the bot at it with:
+
+    TW_BASE_URL=http://127.0.0.1:8765/{world}
+    MAP_API_BASE_URL=http://127.0.0.1:8765/map-api
+
+Fixtures live at <fixtures>/<world or map-api>/<path>; interface.php calls
+are stored per func (interface.php.get_conquer_extended). A `.meta.json`
+next to a fixture holds its status and content type. With --record, misses
+are fetched from the live hosts and saved. With --synthetic N, missing
+kill_*.txt, conquer files and get_conquer_extended responses are generated
+for N players instead, and get_config answers with a speed 1 world so the
+world registry keeps every world open.
+
+    python tools/stub_server.py --latency 50 --error-rate 0.01
+    python tools/stub_server.py --record
+    python tools/stub_server.py --synthetic 20000 --regen-seconds 60
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import mimetypes
+import random
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional, Tuple
+
+import aiohttp
+from aiohttp import web
+
+logger = logging.getLogger("stub_server")
+
+LIVE_WORLD_URL = "https://{world}.tribalwars.nl"
+LIVE_MAP_API_URL = "https://dkspeed2.jrsoft.tech"
+MAP_API_PREFIX = "map-api"
+KILL_FILES = {"kill_att.txt", "kill_def.txt", "kill_sup.txt", "kill_all.txt"}
+SYNTHETIC_CONFIG = b"""<?xml version="1.0" encoding="UTF-8" ?>
+<config>
+    <speed>1</speed>
+    <unit_speed>1</unit_speed>
+</config>
+"""
+
+
+def fixture_path(root: Path, prefix: str, path: str, func: Optional[str]) -> Path:
+    name = f"{path}.{func}" if func else path
+    return root / prefix / name
+
+
+class StubServer:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.root = Path(args.fixtures)
+        self.random = random.Random(args.seed)
+        self.started = time.time()
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    # ---------------------- Fixtures ---------------------- #
+
+    def load(self, file: Path) -> Optional[Tuple[int, str, bytes]]:
+        if not file.is_file():
+            return None
+        status, content_type = 200, mimetypes.guess_type(file.name)[0] or "text/plain"
+        meta = file.with_name(file.name + ".meta.json")
+        if meta.is_file():
+            data = json.loads(meta.read_text())
+            status, content_type = data.get("status", status), data.get("content_type", content_type)
+        return status, content_type, file.read_bytes()
+
+    def save(self, file: Path, status: int, content_type: str, body: bytes) -> None:
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_bytes(body)
+        file.with_name(file.name + ".meta.json").write_text(json.dumps({"status": status, "content_type": content_type}))
+
+    async def record(self, prefix: str, request: web.Request, file: Path) -> Optional[Tuple[int, str, bytes]]:
+        if self.session is None:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60))
+        base = LIVE_MAP_API_URL if prefix == MAP_API_PREFIX else LIVE_WORLD_URL.format(world=prefix)
+        url = f"{base}/{request.match_info['path']}"
+        async with self.session.get(url, params=request.query) as response:
+            body = await response.read()
+            content_type = response.content_type
+            status = response.status
+        self.save(file, status, content_type, body)
+        logger.info(f"Recorded {url} -> {file} ({status}, {len(body)} bytes)")
+        return status, content_type, body
+
+    # ---------------------- Synthetic data ---------------------- #
+
+    def generation(self) -> int:
+        return int((time.time() - self.started) // self.args.regen_seconds)
+
+    def last_modified(self) -> float:
+        return self.started + self.generation() * self.args.regen_seconds
+
+    def synthetic_kills(self, name: str) -> bytes:
+        rng = random.Random(f"{self.args.seed}:{name}")
+        generation = self.generation()
+        lines = []
+        for player_id in range(1, self.args.synthetic + 1):
+            base = rng.randint(0, 500_000)
+            # A tenth of the players gains kills every generation.
+            kills = base + (generation * rng.randint(1, 5_000) if player_id % 10 == 0 else 0)
+            lines.append((kills, player_id))
+        lines.sort(reverse=True)
+        return "\n".join(f"{rank},{pid},{kills}" for rank, (kills, pid) in enumerate(lines, 1)).encode()
+
+    def synthetic_conquers(self, since: int, until: int) -> bytes:
+        """Deterministic conquers: one every `conquer_interval` seconds since the server started."""
+        interval = self.args.conquer_interval
+        first = max(since, int(self.started) - 86400 * 7)
+        first += -first % interval
+        lines = []
+        for ts in range(first, until, interval):
+            rng = random.Random(f"{self.args.seed}:{ts}")
+            players = self.args.synthetic
+            lines.append(f"{rng.randint(1, players * 5)},{ts},{rng.randint(1, players)},{rng.randint(0, players)}")
+        return "\n".join(lines).encode()
+
+    def synthetic(self, path: str, func: Optional[str], request: web.Request) -> Optional[Tuple[int, str, bytes]]:
+        if not self.args.synthetic:
+            return None
+        name = path.rsplit("/", 1)[-1]
+        if name in KILL_FILES:
+            return 200, "text/plain", self.synthetic_kills(name)
+        if func == "get_config":
+            return 200, "text/xml", SYNTHETIC_CONFIG
+        if func == "get_conquer_extended":
+            return 200, "text/plain", self.synthetic_conquers(int(request.query.get("since", 0)), int(time.time()))
+        if name == "conquer.txt.gz":
+            return 200, "application/gzip", gzip.compress(self.synthetic_conquers(0, int(time.time())))
+        return None
+
+    # ---------------------- Serving ---------------------- #
+
+    def shape(self, func: Optional[str], request: web.Request, body: bytes) -> bytes:
+        if func == "get_conquer_extended" and "since" in request.query:
+            # Recorded conquers are served like the live interface: only those after `since`.
+            since = int(request.query["since"])
+            body = b"\n".join(line for line in body.split() if int(line.split(b",", 2)[1]) >= since)
+        if self.args.scale > 1 and body[:2] != b"\x1f\x8b":
+            body = b"\n".join([body] * self.args.scale)
+        return body
+
+    async def handle(self, request: web.Request) -> web.Response:
+        prefix = request.match_info["prefix"]
+        path = request.match_info["path"]
+        func = request.query.get("func") if path.endswith("interface.php") else None
+
+        delay = self.args.latency + self.random.uniform(0, self.args.jitter)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+        if self.random.random() < self.args.error_rate:
+            return web.Response(status=self.args.error_status, text="stub error")
+
+        file = fixture_path(self.root, prefix, path, func)
+        found = self.load(file) or self.synthetic(path, func, request)
+        if found is None and self.args.record:
+            found = await self.record(prefix, request, file)
+        if found is None:
+            return web.Response(status=404, text=f"no fixture for {file}")
+
+        status, content_type, body = found
+        headers = {}
+        if self.args.synthetic and not file.is_file():
+            modified = self.last_modified()
+            headers["Last-Modified"] = formatdate(modified, usegmt=True)
+            since = request.headers.get("If-Modified-Since")
+            if since and parsedate_to_datetime(since).timestamp() >= int(modified):
+                return web.Response(status=304, headers=headers)
+
+        return web.Response(status=status, body=self.shape(func, request, body), content_type=content_type, headers=headers)
+
+    async def close(self, app: web.Application) -> None:
+        if self.session is not None:
+            await self.session.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", default=str(Path(__file__).parent / "fixtures"))
+    parser.add_argument("--latency", type=float, default=0.0, help="added latency per request in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency up to this many ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--scale", type=int, default=1, help="repeat every text payload this many times")
+    parser.add_argument("--record", action="store_true", help="fetch and save missing fixtures from the live hosts")
+    parser.add_argument("--synthetic", type=int, default=0, help="generate kill and conquer files for this many players")
+    parser.add_argument("--regen-seconds", type=int, default=3600, help="synthetic kill files change this often")
+    parser.add_argument("--conquer-interval", type=int, default=5, help="seconds between synthetic conquers")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    server = StubServer(args)
+
+    app = web.Application()
+    app.router.add_get("/{prefix}/{path:.*}", server.handle)
+    app.on_cleanup.append(server.close)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()